@@ -1,13 +1,27 @@
 import time
 import json
-import re
-from decimal import Decimal, InvalidOperation
-from urllib.parse import urljoin
+import argparse
+import asyncio
+from contextlib import nullcontext
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
-from django.db.models import Q
+from asgiref.sync import sync_to_async
+from bs4 import BeautifulSoup, ElementFilter
 from load_django import *
-from parser_app.models import Product
+from parser_app.frontier import Frontier
+from parser_app import recrawl
+from page_cache import PageCache
+from discovery import discover_product_urls, iter_product_urls
+from rate_limit import AdaptiveRateLimiter
+from metrics import METRICS
+from fetch_policy import OK, RETRY, CircuitBreaker, DeadLetters, FetchPolicy, classify
+from scraper import (NOT_MODIFIED, AsyncProductPipeline, HttpBackend, ProductPipeline, crawl, finished_callback,
+                     normalize_product, parse_price, parse_reviews)
+from scraper import MIN_SPECS, REQUIRED_FIELDS, run_hybrid
+from scraper import fields
 
 # ------------------ HTTP заголовки для requests ------------------
 # Імітуємо браузер, щоб сайт не блокував запити
@@ -28,230 +42,660 @@ HEADERS = {
     'TE': 'Trailers',
 }
 
+# Заголовки для обходу з кешем сторінок: без no-cache, бо запити умовні
+# (If-None-Match / If-Modified-Since) і сервер може відповісти 304
+CACHED_HEADERS = {k: v for k, v in HEADERS.items() if k not in ('Cache-Control', 'Pragma')}
 
-# ------------------ Утиліти ------------------
-def _parse_price(text):
+class ProductScope(ElementFilter):
     """
-    Витягує числове значення з рядка та перетворює його у Decimal.
-    Повертає None, якщо перетворення неможливе.
+    Фільтр для швидкого режиму: у дерево потрапляють лише блоки, з яких
+    extract_product бере дані (разом з усім їх вмістом). Решта сторінки
+    (меню, футер, скрипти, рекомендації) пропускається ще на етапі парсингу.
     """
-    if not text:
-        return None
-    m = re.search(r'[\d\s,\.]+', text)
-    if not m:
-        return None
-    raw = m.group().strip()
-    raw = raw.replace(' ', '').replace(',', '.')
-    try:
-        return Decimal(raw)
-    except InvalidOperation:
-        try:
-            return Decimal(str(float(raw)))
-        except Exception:
-            return None
 
+    TAGS = {"h1"}
+    IDS = {"br-pr-1", "product_code"}
+    CLASSES = {"br-pr-chr-item", "br-pr-price", "br-pr-del-type", "product-title"}
+    TAG_CLASSES = {("img", "dots-image"), ("a", "scroll-to-element")}
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        if name in self.TAGS:
+            return True
+        attrs = attrs or {}
+        if attrs.get("id") in self.IDS:
+            return True
+        classes = attrs.get("class") or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        for cls in classes:
+            if cls in self.CLASSES or (name, cls) in self.TAG_CLASSES:
+                return True
+        return False
+
+    def allow_string_creation(self, string):
+        return False
 
-def _unique_preserve_order(seq):
+
+PRODUCT_SCOPE = ProductScope()
+
+
+def make_soup(html, fast=False):
     """
-    Повертає список без дублікатів, зберігаючи порядок.
+    fast=False — повне дерево через html.parser (як раніше);
+    fast=True — lxml і лише блоки товару (ProductScope).
     """
-    seen = set()
-    out = []
-    for x in seq:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
+    if fast:
+        return BeautifulSoup(html, "lxml", parse_only=PRODUCT_SCOPE)
+    return BeautifulSoup(html, "html.parser")
 
 
 # ------------------ Основний парсер ------------------
-def parse_single_product(url, headers=HEADERS, timeout=12):
+def parse_single_product(url, headers=HEADERS, timeout=12, fast=False, cache=None, policy=None):
     """
     Парсить сторінку товару Brain.com.ua та повертає словник з даними.
+    fast=True — швидкий розбір через lxml (див. make_soup).
+    cache — PageCache; якщо сторінка не змінилась, повертається NOT_MODIFIED.
+    policy — FetchPolicy (див. fetch_html).
     """
-    product = {}
-    try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        print(f"[ERROR] Не вдалось завантажити {url}: {e}")
+    html = fetch_html(url, headers=headers, timeout=timeout, cache=cache, policy=policy)
+    if html is None or html is NOT_MODIFIED:
+        return html
+    with METRICS.time("extract"):
+        return extract_product(html, url, fast=fast)
+
+
+def fetch_html(url, headers=HEADERS, timeout=12, cache=None, policy=None):
+    """
+    Завантажує HTML сторінки. Повертає текст, NOT_MODIFIED (з cache) або None.
+    policy — FetchPolicy: частота запитів, повтори таймаутів і 5xx,
+    circuit breaker та dead-letter файл. Без policy — одна спроба.
+    """
+    if cache is not None:
+        base_headers = CACHED_HEADERS if headers is HEADERS else headers
+        headers = {**base_headers, **cache.conditional_headers(url)}
+    retries = policy.retries if policy is not None else 0
+    for attempt in range(retries + 1):
+        if policy is not None:
+            policy.before(url)
+        started = time.monotonic()
+        resp = status = error = None
+        with policy.attempt(url) if policy is not None else nullcontext():
+            try:
+                resp = requests.get(url, headers=headers, timeout=timeout)
+                status = resp.status_code
+            except requests.RequestException as e:
+                error = e
+            if policy is not None:
+                outcome = policy.after(url, time.monotonic() - started, status, error,
+                                       resp.headers.get('Retry-After') if resp is not None else None)
+            else:
+                outcome = classify(status, error)
+        if outcome == OK:
+            break
+
+        reason = error or f"HTTP {status}"
+        if outcome == RETRY and attempt < retries:
+            print(f"[RETRY] {url}: {reason}, спроба {attempt + 2} з {retries + 1}")
+            time.sleep(policy.retry_delay(attempt, status))
+            continue
+        print(f"[ERROR] Не вдалось завантажити {url}: {reason}")
+        if policy is not None:
+            policy.give_up(url, error, status, attempt + 1)
         return None
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+    if cache is not None:
+        if resp.status_code == 304:
+            cache.not_modified(url)
+            return NOT_MODIFIED
+        if not cache.store(url, resp.text, resp.headers.get('ETag'), resp.headers.get('Last-Modified')):
+            return NOT_MODIFIED
+    return resp.text
+
+
+def extract_product(html, url, fast=False):
+    """
+    Витягує дані товару з HTML сторінки. Не виконує мережевих запитів,
+    тому використовується і синхронним, і асинхронним режимом.
+    """
+    product = {}
+    soup = make_soup(html, fast=fast)
 
     # Посилання на джерело
     product['link'] = url
 
     # Назва товару
-    try:
-        title = soup.select_one("h1") or soup.select_one(".product-title")
-        product["title"] = title.get_text(strip=True) if title else None
-        product["full_name"] = product["title"]
-    except AttributeError:
-        product["title"] = None
-        product["full_name"] = None
-
-    # Характеристики як словник (ключ → значення)
-    characteristics = {}
-    try:
-        for span in soup.select(".br-pr-chr-item span"):
-            try:
-                next_span = span.find_next_sibling("span")
-                if next_span:
-                    key = span.get_text(strip=True)
-                    value = next_span.get_text(strip=True)
-                    characteristics[key] = value
-            except AttributeError:
-                continue
-    except Exception:
-        characteristics = {}
+    title = None
+    for selector in fields.TITLE_CSS:
+        title = soup.select_one(selector)
+        if title:
+            break
+    product["title"] = title.get_text(strip=True) if title else None
+    product["full_name"] = product["title"]
+
+    # Характеристики: пласкі пари ключ → значення та повна таблиця specifications
+    characteristics, specifications = extract_characteristics(soup)
 
     # Основні параметри товару
-    product["color"] = characteristics.get("Колір") or characteristics.get("Цвет")
-    product["memory"] = characteristics.get("Вбудована пам'ять") or characteristics.get("Встроенная память")
-    product["article"] = characteristics.get("Артикул")
-    product["diagonal"] = characteristics.get("Діагональ екрану") or characteristics.get("Диагональ экрана")
-    product["resolution"] = characteristics.get("Роздільна здатність екрану") or characteristics.get(
-        "Разрешение дисплея")
+    for field, labels in fields.CHARACTERISTIC_LABELS.items():
+        product[field] = next((characteristics[label] for label in labels if characteristics.get(label)), None)
 
     # Продавець
-    v_sel = soup.select_one(".br-pr-del-type .delivery-target strong")
+    v_sel = soup.select_one(fields.VENDOR_CSS)
     product["vendor"] = v_sel.get_text(strip=True) if v_sel else None
 
-    # Ціна
-    p_sel = soup.select_one(".br-pr-price.main-price-block .br-pr-np > div > span")
-    product["price"] = _parse_price(p_sel.get_text(strip=True)) if p_sel else None
-
-    # Акційна ціна (якщо є)
-    d_sel = soup.select_one(".br-pr-price.main-price-block .br-pr-np-hz > div > span")
-    discount_price = _parse_price(d_sel.get_text(strip=True)) if d_sel else None
-    product["discount_price"] = discount_price if discount_price else product["price"]
+    # Ціна та акційна ціна (якщо є)
+    p_sel = soup.select_one(fields.PRICE_CSS)
+    product["price"] = parse_price(p_sel.get_text(strip=True)) if p_sel else None
+    d_sel = soup.select_one(fields.DISCOUNT_PRICE_CSS)
+    product["discount_price"] = parse_price(d_sel.get_text(strip=True)) if d_sel else None
 
     # Фото
     photos = []
-    for img in soup.select("img.dots-image"):
-        src = img.get("data-big-picture-src") or img.get("src")
+    for img in soup.select(fields.PHOTOS_CSS):
+        src = next((img.get(attr) for attr in fields.HTTP_PHOTO_ATTRIBUTES if img.get(attr)), None)
         if src:
-            src = src.strip()
-            if src.startswith("//"):
-                src = "https:" + src
-            elif src.startswith("/"):
-                src = urljoin(url, src)
-            elif not src.startswith("http"):
-                src = urljoin(url, src)
             photos.append(src)
-    product["photos"] = _unique_preserve_order(photos)
+    product["photos"] = photos
 
     # Код товару
-    code_sel = soup.select_one("#product_code .br-pr-code-val")
+    code_sel = soup.select_one(fields.CODE_CSS)
     product["code"] = code_sel.get_text(strip=True) if code_sel else None
 
     # Кількість відгуків
-    try:
-        rev_sel = soup.select_one("a.scroll-to-element span")
-        product["reviews_count"] = int(rev_sel.get_text(strip=True)) if rev_sel else None
-    except (AttributeError, ValueError):
-        product["reviews_count"] = None
+    rev_sel = soup.select_one(fields.REVIEWS_CSS)
+    product["reviews_count"] = parse_reviews(rev_sel.get_text(strip=True)) if rev_sel else None
 
     # Усі характеристики (словник)
+    product["specifications"] = specifications
+
+    return normalize_product(product)
+
+
+def extract_characteristics(soup):
+    """
+    Один прохід по блоках .br-pr-chr-item. Повертає два словники:
+    - characteristics: кожен span → текст наступного сусіднього span
+      (з нього беруться color, memory, article, diagonal, resolution);
+    - specifications: для кожного рядка "div > div" перший span — ключ,
+      його сусідній span — значення (тексти посилань через кому, якщо є).
+    Результат такий самий, як у попередніх двох окремих обходах:
+    span'и перебираються в порядку документа, і span є ключем рядка,
+    якщо він перший span у цьому рядку.
+    """
+    characteristics = {}
     specifications = {}
+    seen = set()
     try:
-        for item in soup.select(".br-pr-chr-item"):
-            for row in item.select("div > div"):
-                key_span = row.find("span")
-                value_span = key_span.find_next_sibling("span") if key_span else None
-                if key_span and value_span:
-                    key = key_span.get_text(strip=True)
-                    value = ", ".join(a.get_text(strip=True) for a in value_span.find_all("a"))
+        for item in soup.select(fields.CHR_ITEM_CSS):
+            claimed_rows = set()
+            for span in item.find_all("span"):
+                next_span = span.find_next_sibling("span")
+                key = None
+                if next_span:
+                    key = span.get_text(strip=True)
+                    if id(span) not in seen:
+                        characteristics[key] = next_span.get_text(strip=True)
+                seen.add(id(span))
+
+                # Рядки (div з батьком div всередині item), для яких цей span перший
+                is_row_key = False
+                for parent in span.parents:
+                    if parent is item:
+                        break
+                    if (parent.name == "div" and parent.parent is not None
+                            and parent.parent.name == "div" and id(parent) not in claimed_rows):
+                        claimed_rows.add(id(parent))
+                        is_row_key = True
+                if is_row_key and next_span:
+                    value = ", ".join(a.get_text(strip=True) for a in next_span.find_all("a"))
                     if not value:
-                        value = value_span.get_text(strip=True)
+                        value = next_span.get_text(strip=True)
                     specifications[key] = value
     except Exception:
-        specifications = {}
-    product["specifications"] = specifications
+        return {}, {}
+    return characteristics, specifications
 
-    return product
 
-
-# ------------------ Збереження в БД ------------------
-def save_to_db(product_data):
+# ------------------ Асинхронний режим ------------------
+async def fetch_html_async(session, url, policy, timeout=12, cache=None):
     """
-    Зберігає дані продукту в БД через Django ORM.
-    Логіка:
-    - Якщо продукт з таким кодом існує і дані не змінились → нічого не робимо.
-    - Якщо продукт з таким кодом існує, але дані змінились → оновлюємо.
-    - Якщо продукту з таким кодом немає → створюємо новий.
+    Асинхронний аналог fetch_html через спільну aiohttp-сесію.
+    Повертає HTML, NOT_MODIFIED (з cache) або None.
     """
+    loop = asyncio.get_running_loop()
+    headers = await loop.run_in_executor(None, cache.conditional_headers, url) if cache is not None else None
+    for attempt in range(policy.retries + 1):
+        await policy.abefore(url)
+        started = time.monotonic()
+        html = status = error = retry_after = None
+        with policy.attempt(url):
+            try:
+                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    status = resp.status
+                    retry_after = resp.headers.get('Retry-After')
+                    if status < 300:
+                        html = await resp.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            outcome = policy.after(url, time.monotonic() - started, status, error, retry_after)
+        if outcome == OK:
+            break
+
+        reason = error or f"HTTP {status}"
+        if outcome == RETRY and attempt < policy.retries:
+            print(f"[RETRY] {url}: {reason}, спроба {attempt + 2} з {policy.retries + 1}")
+            await asyncio.sleep(policy.retry_delay(attempt, status))
+            continue
+        print(f"[ERROR] Не вдалось завантажити {url}: {reason}")
+        policy.give_up(url, error, status, attempt + 1)
+        return None
 
-    model_fields = [f for f in Product._meta.get_fields()
-                    if getattr(f, 'concrete', False) and not getattr(f, 'auto_created', False)]
-    field_names = {f.name: f for f in model_fields}
+    if cache is not None:
+        # Кеш — SQLite-файл: звертаємось до нього з пулу потоків, а не з циклу подій
+        if status == 304:
+            await loop.run_in_executor(None, cache.not_modified, url)
+            return NOT_MODIFIED
+        if not await loop.run_in_executor(None, cache.store, url, html, resp.headers.get('ETag'),
+                                          resp.headers.get('Last-Modified')):
+            return NOT_MODIFIED
+    return html
 
-    save_kwargs = {}
-    for field_name, field_obj in field_names.items():
-        if field_obj.primary_key:
-            continue
-        value = product_data.get(field_name)
-        if value is not None:
-            save_kwargs[field_name] = value
 
-    try:
-        code = save_kwargs.get('code')
-        if code:
-            obj = Product.objects.filter(code=code).first()
-            if obj:
-                # Якщо всі поля збігаються → нічого не робимо
-                duplicate = all(getattr(obj, k) == v for k, v in save_kwargs.items())
-                if duplicate:
-                    print(f"[DB] Продукт (code={code}) вже існує — не створюємо дубліката")
-                    return obj
-                else:
-                    # Оновлюємо поля
-                    for k, v in save_kwargs.items():
-                        setattr(obj, k, v)
-                    obj.save()
-                    print(f"[DB] Оновлено Product (code={code}) id={obj.pk}")
-                    return obj
+async def parse_single_product_async(session, url, policy, timeout=12, fast=False, cache=None):
+    """
+    Асинхронний аналог parse_single_product. Розбір HTML виконується у
+    пулі потоків, щоб не блокувати цикл подій під час завантажень.
+    """
+    html = await fetch_html_async(session, url, policy, timeout=timeout, cache=cache)
+    if html is None or html is NOT_MODIFIED:
+        return html
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, METRICS.timed("extract", extract_product), html, url, fast)
+
+
+async def crawl_async(urls, on_product=None, concurrency=16, rate=8.0, timeout=12,
+                      headers=HEADERS, report_every=50, fast=False, cache=None, on_finished=None,
+                      max_rate=32.0, limiter=None, policy=None, on_unchanged=None):
+    """
+    Обходить urls (звичайний або асинхронний ітератор) конкурентно через
+    один пул keep-alive з'єднань.
+    - concurrency: максимум одночасних запитів (і розмір пулу з'єднань);
+    - rate / max_rate: початкова та максимальна частота запитів на хост
+      (AdaptiveRateLimiter підлаштовує її під відповіді сайту; rate=0 — без обмеження);
+    - limiter: готовий AdaptiveRateLimiter замість rate / max_rate;
+    - policy: FetchPolicy (повтори, circuit breaker, dead-letter); за замовчуванням —
+      3 повтори і breaker на хост з limiter;
+    - on_product: async-callback(data, url) для кожного розібраного товару.
+      Успіх URL підтверджує він сам, коли товар записано в БД (наприклад,
+      AsyncProductPipeline з тим самим on_finished); якщо він повертає False,
+      URL вважається переданим далі (у браузер — див. scraper.hybrid);
+    - cache: PageCache для умовних запитів (незмінені сторінки пропускаються);
+      змінена сторінка потрапляє в кеш через cache.finished — його треба
+      передати в on_finished і в пайплайн on_product (див. run_async);
+    - on_unchanged: async-callback(url) для незмінених сторінок, що сам їх
+      підтверджує (наприклад, AsyncProductPipeline.unchanged — оновлює розклад
+      повторного обходу); без нього такі URL одразу йдуть в on_finished;
+    - on_finished: callback(url, ok, error=None) для помилок і незмінених
+      сторінок, а без on_product — і для успішних (наприклад, Frontier.finished).
+    Повертає статистику обходу: pages, unchanged, failed, deferred, elapsed, pages_per_sec.
+    """
+    if cache is not None and headers is HEADERS:
+        headers = CACHED_HEADERS
+    if policy is None:
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(rate=rate, max_rate=max_rate)
+        policy = FetchPolicy(limiter=limiter, breaker=CircuitBreaker())
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"pages": 0, "unchanged": 0, "failed": 0, "deferred": 0}
+    started = time.monotonic()
+
+    def report():
+        elapsed = time.monotonic() - started
+        speed = stats["pages"] / elapsed if elapsed else 0.0
+        deferred = f", {stats['deferred']} передано далі" if stats["deferred"] else ""
+        print(f"[STAT] {stats['pages']} сторінок, {stats['unchanged']} без змін, {stats['failed']} помилок{deferred}, "
+              f"{elapsed:.1f} с, {speed:.2f} стор/с")
+
+    async def worker(session):
+        while True:
+            url = await queue.get()
+            try:
+                if url is None:
+                    return
+                data = await parse_single_product_async(session, url, policy, timeout=timeout,
+                                                        fast=fast, cache=cache)
+                if data is NOT_MODIFIED:
+                    stats["unchanged"] += 1
+                    METRICS.inc("pages", result="unchanged")
+                    if on_unchanged is not None:
+                        await on_unchanged(url)
+                    elif on_finished is not None:
+                        on_finished(url, True)
+                    continue
+                if not data:
+                    stats["failed"] += 1
+                    METRICS.inc("pages", result="failed")
+                    if on_finished is not None:
+                        on_finished(url, False, "no data")
+                    continue
+                if on_product is None:
+                    if on_finished is not None:
+                        on_finished(url, True)
+                elif await on_product(data, url) is False:
+                    stats["deferred"] += 1
+                    METRICS.inc("pages", result="deferred")
+                    continue
+                stats["pages"] += 1
+                METRICS.inc("pages", result="ok")
+                if report_every and stats["pages"] % report_every == 0:
+                    report()
+            except Exception as e:
+                stats["failed"] += 1
+                METRICS.inc("pages", result="failed")
+                print(f"[ERROR] Помилка при обробці {url}: {e}")
+                if on_finished is not None:
+                    on_finished(url, False, e)
+            finally:
+                queue.task_done()
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency,
+                                     ttl_dns_cache=300, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        try:
+            if hasattr(urls, "__aiter__"):
+                async for url in urls:
+                    await queue.put(url)
             else:
-                # Новий продукт
-                obj = Product.objects.create(**save_kwargs)
-                print(f"[DB] Створено Product (code={code}) id={obj.pk}")
-                return obj
-        else:
-            # Якщо немає коду, створюємо без нього
-            obj = Product.objects.create(**save_kwargs)
-            print(f"[DB] Створено Product id={obj.pk}")
-            return obj
+                for url in urls:
+                    await queue.put(url)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+
+    report()
+    policy.report()
+    elapsed = time.monotonic() - started
+    stats["elapsed"] = elapsed
+    stats["pages_per_sec"] = stats["pages"] / elapsed if elapsed else 0.0
+    return stats
+
+
+# ------------------ Бенчмарк парсерів ------------------
+# Збережені сторінки товарів з еталонами <сторінка>.json: спільні для --bench,
+# --golden і тесту parser_app.tests.ExtractProductGoldenTests
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+def save_fixtures(urls, fixtures_dir, headers=HEADERS, timeout=12):
+    """Зберігає HTML сторінок товарів у fixtures_dir для бенчмарку."""
+    fixtures_dir = Path(fixtures_dir)
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    for url in urls:
+        resp = requests.get(url, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        path = fixtures_dir / Path(urlsplit(url).path).name
+        path.write_text(resp.text, encoding="utf-8")
+        print(f"[FIXTURE] {path}")
 
-    except Exception as e:
-        print(f"[ERROR] Помилка збереження в БД: {e}")
-        return None
+
+def benchmark_parsers(fixtures_dir=FIXTURES_DIR, repeat=5):
+    """
+    Порівнює процесорний час extract_product у звичайному та швидкому режимі
+    на збережених сторінках і перевіряє, що результат побайтово однаковий.
+    Повертає True, якщо результати збіглися для всіх сторінок.
+    """
+    paths = sorted(Path(fixtures_dir).glob("*.html"))
+    totals = {False: 0.0, True: 0.0}
+    all_same = True
+    for path in paths:
+        html = path.read_text(encoding="utf-8")
+        url = f"https://brain.com.ua/ukr/{path.name}"
+        timings = {}
+        dumps = {}
+        for fast in (False, True):
+            runs = []
+            for _ in range(repeat):
+                started = time.process_time()
+                data = extract_product(html, url, fast=fast)
+                runs.append(time.process_time() - started)
+            timings[fast] = min(runs)
+            totals[fast] += timings[fast]
+            dumps[fast] = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        same = dumps[False] == dumps[True]
+        all_same = all_same and same
+        print(f"[BENCH] {path.name}: html.parser {timings[False] * 1000:.1f} мс, "
+              f"lxml {timings[True] * 1000:.1f} мс, однаковий результат: {'так' if same else 'НІ'}")
+
+    if paths:
+        slow = totals[False] / len(paths) * 1000
+        fast = totals[True] / len(paths) * 1000
+        print(f"[BENCH] Середнє на сторінку ({len(paths)} стор.): html.parser {slow:.1f} мс, "
+              f"lxml {fast:.1f} мс, x{slow / fast if fast else 0:.1f}")
+    return all_same
+
+
+def check_golden(fixtures_dir=FIXTURES_DIR, update=False):
+    """
+    Звіряє extract_product (в обох режимах) зі збереженими еталонами
+    <сторінка>.json поруч зі сторінками у fixtures_dir.
+    update=True — перезаписати еталони поточним результатом звичайного режиму.
+    Повертає True, якщо всі сторінки збіглися з еталонами.
+    """
+    ok = True
+    for path in sorted(Path(fixtures_dir).glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+        url = f"https://brain.com.ua/ukr/{path.name}"
+        golden_path = path.with_suffix(".json")
+        current = json.dumps(extract_product(html, url), ensure_ascii=False, indent=2, sort_keys=True, default=str)
+        if update:
+            golden_path.write_text(current, encoding="utf-8")
+            print(f"[GOLDEN] Оновлено {golden_path}")
+            continue
+        if not golden_path.exists():
+            print(f"[GOLDEN] Немає еталону для {path.name}")
+            ok = False
+            continue
+        golden = golden_path.read_text(encoding="utf-8")
+        fast = json.dumps(extract_product(html, url, fast=True), ensure_ascii=False, indent=2,
+                          sort_keys=True, default=str)
+        for mode, result in (("html.parser", current), ("lxml", fast)):
+            if result != golden:
+                ok = False
+                print(f"[GOLDEN] РОЗБІЖНІСТЬ {path.name} ({mode})")
+    print(f"[GOLDEN] {'OK' if ok else 'Є розбіжності'}")
+    return ok
 
 
 # ------------------ MAIN ------------------
+def run_sync(urls, batch_size, fast=False, cache=None, frontier=None, policy=None):
+    # Замість фіксованої паузи між товарами частоту підбирає limiter у policy
+    if policy is None:
+        policy = FetchPolicy(limiter=AdaptiveRateLimiter(rate=1.0, max_rate=4.0), breaker=CircuitBreaker())
+    # Сторінка потрапляє в кеш, як і URL у frontier позначається завершеним, лише після запису товару
+    on_finished = finished_callback(frontier.finished if frontier is not None else None,
+                                    cache.finished if cache is not None else None)
+    with HttpBackend(policy=policy, fast=fast, cache=cache) as backend, \
+            ProductPipeline(batch_size=batch_size, on_finished=on_finished) as pipeline:
+        crawl(urls, backend, pipeline)
+    policy.report()
+    if frontier is not None:
+        frontier.flush()
+        frontier.report()
+
+
+async def run_async(urls, concurrency, batch_size, fast=False, cache=None, frontier=None, policy=None):
+    on_finished = finished_callback(frontier.finished if frontier is not None else None,
+                                    cache.finished if cache is not None else None)
+    pipeline = AsyncProductPipeline(batch_size=batch_size, on_finished=on_finished)
+
+    async def on_product(data, url):
+        print(f"[OK] {url}")
+        await pipeline.process(data, url)
+
+    try:
+        await crawl_async(urls, on_product=on_product, concurrency=concurrency, policy=policy,
+                          fast=fast, cache=cache, on_finished=on_finished, on_unchanged=pipeline.unchanged)
+    finally:
+        # Навіть після помилки обходу дописуємо чергу запису і підтверджуємо її URL
+        await pipeline.close()
+        if frontier is not None:
+            await frontier.aflush()
+            await sync_to_async(frontier.report)()
+
+
 if __name__ == "__main__":
     PRODUCT_URLS = [
         "https://brain.com.ua/ukr/Mobilniy_telefon_Apple_iPhone_16_Pro_Max_256GB_Black_Titanium-p1145443.html",
     ]
 
-    for url in PRODUCT_URLS:
-        print(f"\nПарсинг: {url}")
-        try:
-            data = parse_single_product(url)
-            if not data:
-                print("[WARN] Дані не отримані")
-                continue
-
-            # Вивід у консоль
-            print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
-
-            # Збереження у БД
-            save_to_db(data)
-
-            # Невелика пауза, щоб не перевантажувати сайт
-            time.sleep(1.0)
-        except Exception as e:
-            print(f"[ERROR] Помилка при обробці {url}: {e}")
-            continue
-
+    arg_parser = argparse.ArgumentParser(description="Парсер товарів brain.com.ua (requests + bs4)")
+    arg_parser.add_argument("--async", dest="use_async", action="store_true",
+                            help="конкурентний обхід через aiohttp замість послідовного")
+    arg_parser.add_argument("--concurrency", type=int, default=16,
+                            help="кількість одночасних запитів в async-режимі")
+    arg_parser.add_argument("--rate", type=float,
+                            help="початкова частота запитів за секунду на хост, далі підлаштовується "
+                                 "під відповіді сайту (за замовчуванням 1 — послідовно, 8 — в async-режимі; "
+                                 "0 — без ліміту)")
+    arg_parser.add_argument("--max-rate", type=float,
+                            help="максимальна частота запитів за секунду на хост "
+                                 "(за замовчуванням 4 — послідовно, 32 — в async-режимі)")
+    arg_parser.add_argument("--retries", type=int, default=3,
+                            help="скільки разів повторювати таймаути, помилки з'єднання та 5xx (404 не повторюється)")
+    arg_parser.add_argument("--dead-letters", metavar="PATH",
+                            help="файл (JSON Lines), куди записуються URL, які не вдалось завантажити")
+    arg_parser.add_argument("--replay-dead-letters", metavar="PATH",
+                            help="замість PRODUCT_URLS обійти URL з dead-letter файлу (файл перейменовується на *.replayed)")
+    arg_parser.add_argument("--recrawl", type=int, metavar="N",
+                            help="замість PRODUCT_URLS обійти до N товарів, яким настав час повторного обходу "
+                                 "(частіше ті, в яких змінюється ціна)")
+    arg_parser.add_argument("--fallback", choices=("playwright", "selenium"),
+                            help="гібридний режим (async): неповні товари дообробляються браузером")
+    arg_parser.add_argument("--browser-workers", type=int, default=2,
+                            help="разом з --fallback: кількість сторінок Playwright / процесів Selenium")
+    arg_parser.add_argument("--min-specs", type=int, default=MIN_SPECS,
+                            help="разом з --fallback: менше характеристик — товар передається браузеру")
+    arg_parser.add_argument("--required-fields", nargs="+", default=list(REQUIRED_FIELDS), metavar="FIELD",
+                            help="разом з --fallback: поля, без яких товар передається браузеру")
+    arg_parser.add_argument("--batch-size", type=int, default=500,
+                            help="скільки товарів записувати в БД за один раз")
+    arg_parser.add_argument("--fast-parse", action="store_true",
+                            help="розбирати HTML через lxml і лише блоки товару")
+    arg_parser.add_argument("--save-fixtures", metavar="DIR",
+                            help="зберегти HTML сторінок PRODUCT_URLS у DIR і завершити")
+    arg_parser.add_argument("--bench", metavar="DIR", nargs="?", const=FIXTURES_DIR,
+                            help="порівняти html.parser і lxml на збережених сторінках з DIR "
+                                 "(за замовчуванням modules/fixtures) і завершити")
+    arg_parser.add_argument("--golden", metavar="DIR", nargs="?", const=FIXTURES_DIR,
+                            help="звірити результат парсингу збережених сторінок з еталонами DIR/*.json "
+                                 "(за замовчуванням modules/fixtures) і завершити")
+    arg_parser.add_argument("--update-golden", action="store_true",
+                            help="разом з --golden: перезаписати еталони поточним результатом")
+    arg_parser.add_argument("--cache", metavar="PATH",
+                            help="файл кешу сторінок (SQLite): умовні запити, незмінені сторінки пропускаються")
+    arg_parser.add_argument("--cache-ttl-days", type=float, default=7,
+                            help="скільки днів зберігати сторінку в кеші")
+    arg_parser.add_argument("--cache-max-mb", type=int, default=2048,
+                            help="максимальний розмір кешу в МБ")
+    arg_parser.add_argument("--discover", nargs="+", metavar="URL",
+                            help="замість PRODUCT_URLS знаходити товари в категоріях / sitemap (*.xml, *.xml.gz)")
+    arg_parser.add_argument("--discover-concurrency", type=int, default=4,
+                            help="скільки сторінок категорій / sitemap завантажувати одночасно")
+    arg_parser.add_argument("--frontier", action="store_true",
+                            help="додати URL у чергу обходу в БД і парсити з неї (обхід можна продовжити після зупинки)")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="продовжити обхід з черги в БД без додавання нових URL; URL, взяті "
+                                 "перерваним запуском, одразу повертаються в чергу — не запускайте "
+                                 "з --resume, поки з цією чергою працює інший обхід")
+    arg_parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                            help="віддавати метрики обходу (час етапів, статуси, кеш, записи в БД) "
+                                 "на http://127.0.0.1:PORT/metrics у форматі Prometheus")
+    arg_parser.add_argument("--metrics-json", metavar="PATH",
+                            help="дописувати summary метрик з перцентилями у PATH (JSON Lines) "
+                                 "раз на --metrics-interval секунд і в кінці обходу")
+    arg_parser.add_argument("--metrics-interval", type=float, default=60,
+                            help="як часто писати --metrics-json, секунд")
+    args = arg_parser.parse_args()
+    METRICS.start(port=args.metrics_port, json_path=args.metrics_json, interval=args.metrics_interval)
+
+    if args.fallback:
+        # HTTP-частина гібридного режиму завжди асинхронна
+        args.use_async = True
+    if args.rate is None:
+        args.rate = 8.0 if args.use_async else 1.0
+    if args.max_rate is None:
+        args.max_rate = 32.0 if args.use_async else 4.0
+    policy = FetchPolicy(
+        limiter=AdaptiveRateLimiter(rate=args.rate, max_rate=args.max_rate),
+        retries=args.retries,
+        breaker=CircuitBreaker(),
+        dead_letters=DeadLetters(args.dead_letters) if args.dead_letters else None,
+    )
+    if args.replay_dead_letters:
+        PRODUCT_URLS = DeadLetters(args.replay_dead_letters).take()
+        print(f"[RETRY] Повторний обхід {len(PRODUCT_URLS)} URL з {args.replay_dead_letters}")
+    if args.recrawl:
+        PRODUCT_URLS = recrawl.claim_due(args.recrawl)
+
+    cache = None
+    if args.cache:
+        cache = PageCache(args.cache, ttl=args.cache_ttl_days * 24 * 3600, max_bytes=args.cache_max_mb * 1024 ** 2)
+
+    hybrid_options = dict(
+        fallback=args.fallback, browser_workers=args.browser_workers, required=args.required_fields,
+        min_specs=args.min_specs, concurrency=args.concurrency, batch_size=args.batch_size,
+        fast=args.fast_parse, cache=cache, policy=policy, retries=args.retries, dead_letters=args.dead_letters,
+    )
+
+    if args.save_fixtures:
+        save_fixtures(PRODUCT_URLS, args.save_fixtures)
+    elif args.golden:
+        if not check_golden(args.golden, update=args.update_golden):
+            raise SystemExit(1)
+    elif args.bench:
+        benchmark_parsers(args.bench)
+    elif args.frontier or args.resume:
+        frontier = Frontier()
+        # Після аварії URL попереднього запуску не чекають закінчення lease
+        frontier.release_stale(lease=timedelta(0) if args.resume else None)
+        if not args.resume:
+            seeds = PRODUCT_URLS
+            if args.discover:
+                seeds = iter_product_urls(args.discover, concurrency=args.discover_concurrency, headers=HEADERS)
+            print(f"[FRONTIER] Додано в чергу: {frontier.add(seeds, requeue=bool(args.recrawl))}")
+        if args.fallback:
+            asyncio.run(run_hybrid(frontier, frontier=frontier, **hybrid_options))
+        elif args.use_async:
+            asyncio.run(run_async(frontier, args.concurrency, args.batch_size,
+                                  fast=args.fast_parse, cache=cache, frontier=frontier, policy=policy))
+        else:
+            run_sync(frontier, args.batch_size, fast=args.fast_parse, cache=cache, frontier=frontier,
+                     policy=policy)
+    elif args.use_async:
+        urls = PRODUCT_URLS
+        if args.discover:
+            urls = discover_product_urls(args.discover, concurrency=args.discover_concurrency, headers=HEADERS)
+        if args.fallback:
+            asyncio.run(run_hybrid(urls, **hybrid_options))
+        else:
+            asyncio.run(run_async(urls, args.concurrency, args.batch_size,
+                                  fast=args.fast_parse, cache=cache, policy=policy))
+    else:
+        urls = PRODUCT_URLS
+        if args.discover:
+            urls = iter_product_urls(args.discover, concurrency=args.discover_concurrency, headers=HEADERS)
+        run_sync(urls, args.batch_size, fast=args.fast_parse, cache=cache, policy=policy)
+
+    if args.recrawl:
+        recrawl.report()
+
+    if cache is not None:
+        cache.evict()
+        cache.report()
+        cache.close()
+
+    METRICS.stop()
     print("\nГотово.")
@@ -1,50 +1,34 @@
 import time
 import json
-import re
-from decimal import Decimal, InvalidOperation
-from urllib.parse import urljoin
+import queue
+import argparse
+import threading
+import multiprocessing
+from datetime import timedelta
+from contextlib import nullcontext
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from load_django import *
-from parser_app.models import Product
-
-
-# ------------------ Утиліти ------------------
-def _parse_price(text):
-    """Витягує число з рядка і повертає Decimal або None."""
-    if not text:
-        return None
-    m = re.search(r'[\d\s,\.]+', text)
-    if not m:
-        return None
-    raw = m.group().strip()
-    raw = raw.replace(' ', '').replace(',', '.')
-    try:
-        return Decimal(raw)
-    except InvalidOperation:
-        try:
-            return Decimal(str(float(raw)))
-        except Exception:
-            return None
-
-
-def _unique_preserve_order(seq):
-    seen = set()
-    out = []
-    for x in seq:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
+from parser_app.frontier import Frontier
+from discovery import iter_product_urls
+from fetch_policy import DeadLetters, browser_policy
+from metrics import METRICS
+from browser_profiles import FULL, LEAN, PROFILES, BLOCKED_URL_PATTERNS, TRANSFER_STATS_JS, ProfileReport
+from scraper import ProductPipeline, normalize_product, parse_price, parse_reviews
+from scraper import fields
 
 
 # ------------------ Selenium Driver Setup ------------------
-def create_driver():
-    """Створює та налаштовує Selenium WebDriver."""
+def create_driver(profile=FULL):
+    """
+    Створює та налаштовує Selenium WebDriver.
+    profile=LEAN — headless, без зображень/медіа/шрифтів і сторонніх сервісів,
+    driver.get повертається одразу після DOMContentLoaded.
+    """
     chrome_options = Options()
 
     chrome_options.add_argument('--disable-blink-features=AutomationControlled')
@@ -59,11 +43,18 @@ def create_driver():
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
 
-    # Для headless режиму:
-    # chrome_options.add_argument('--headless')
+    if profile == LEAN:
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        # Не чекаємо на завантаження всіх ресурсів — потрібні лише вузли DOM
+        chrome_options.page_load_strategy = 'eager'
 
     driver = webdriver.Chrome(options=chrome_options)
 
+    if profile == LEAN:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+
     driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
         'source': '''
             Object.defineProperty(navigator, 'webdriver', {
@@ -89,67 +80,158 @@ def get_text_or_none(driver, by, locator):
 def get_price_or_none(driver, locator):
     """Повертає число-ціну або None"""
     txt = get_text_or_none(driver, By.XPATH, locator)
-    return _parse_price(txt) if txt else None
+    return parse_price(txt) if txt else None
 
 
-def get_photos(driver, url):
-    """Збирає всі фото товару"""
+def get_photos(driver):
+    """Збирає адреси всіх фото товару (нормалізує їх normalize_product)"""
     photos = []
     try:
-        img_elements = driver.find_elements(By.XPATH, "//img[@class='zoomImg']")
-        for img in img_elements:
-            src = img.get_attribute('data-big-picture-src') or \
-                  img.get_attribute('data-src') or \
-                  img.get_attribute('src')
+        for img in driver.find_elements(By.XPATH, fields.PHOTOS_XPATH):
+            src = next(filter(None, (img.get_attribute(attr) for attr in fields.PHOTO_ATTRIBUTES)), None)
             if src:
-                src = src.strip()
-                if src.startswith('//'):
-                    src = 'https:' + src
-                elif src.startswith('/'):
-                    src = urljoin(url, src)
-                elif not src.startswith('http'):
-                    src = urljoin(url, src)
                 photos.append(src)
     except Exception:
         pass
-    return _unique_preserve_order(photos)
+    return photos
+
+
+# ==================== WAITS ====================
+
+# Інтервал опитування DOM та верхня межа очікування для одного кроку
+WAIT_POLL = 0.05
+STEP_TIMEOUT = 3
+
+# Кількість видимих рядків характеристик (приховані рядки Selenium читає як порожні)
+VISIBLE_CHR_ROWS_JS = """
+return Array.from(document.querySelectorAll('.br-pr-chr-item div > div'))
+    .filter((el) => el.offsetParent !== null).length;
+"""
+
+
+def wait_until(driver, condition, timeout=STEP_TIMEOUT):
+    """
+    Опитує condition(driver) кожні WAIT_POLL секунд, доки він не поверне
+    істинне значення, але не довше timeout. Повертає результат або None.
+    """
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(condition)
+    except TimeoutException:
+        return None
+
+
+def visible_chr_rows(driver):
+    return driver.execute_script(VISIBLE_CHR_ROWS_JS) or 0
+
+
+class PhaseTimer:
+    """Вимірює тривалість послідовних етапів обробки сторінки."""
+
+    def __init__(self):
+        self.phases = {}
+        self._started = self._last = time.perf_counter()
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases[name] = now - self._last
+        self._last = now
+
+    def log(self, url):
+        parts = " | ".join(f"{name} {seconds:.2f} с" for name, seconds in self.phases.items())
+        print(f"[TIME] {parts} | всього {self._last - self._started:.2f} с — {url}")
+
+    def record(self, metrics, phases):
+        """Додає в metrics етапи phases — {етап метрик: [етапи таймера, ...]}."""
+        for phase, names in phases.items():
+            metrics.observe(phase, sum(self.phases.get(name, 0.0) for name in names))
 
 
 # ==================== PARSER ====================
 
-def parse_single_product(url, driver, timeout=12):
+def load_page(url, driver, timeout=12, policy=None):
+    """
+    Відкриває url і чекає на основний контент (<h1>). Повертає True при успіху.
+    policy — FetchPolicy: таймаути та збої браузера повторюються, після
+    вичерпання спроб URL записується в dead-letter. Паузу перед першою
+    спробою робить викликач (policy.before), щоб вона не входила в час сторінки.
+    HTTP-статус Selenium не бачить, тому 404 тут не відрізнити від таймауту.
+    """
+    retries = policy.retries if policy is not None else 0
+    for attempt in range(retries + 1):
+        if attempt:
+            policy.before(url)
+        started = time.perf_counter()
+        with policy.attempt(url) if policy is not None else nullcontext():
+            try:
+                driver.get(url)
+                WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
+                    EC.presence_of_element_located((By.XPATH, "//h1"))
+                )
+            except (TimeoutException, WebDriverException) as e:
+                error = e
+                if policy is not None:
+                    policy.after(url, error=error)
+            else:
+                if policy is not None:
+                    policy.after(url, time.perf_counter() - started)
+                return True
+
+        reason = "таймаут" if isinstance(error, TimeoutException) else error
+        if policy is not None:
+            if attempt < retries and _driver_alive(driver):
+                print(f"[RETRY] {url}: {reason}, спроба {attempt + 2} з {retries + 1}")
+                time.sleep(policy.retry_delay(attempt))
+                continue
+            policy.give_up(url, error, attempts=attempt + 1)
+        if isinstance(error, TimeoutException):
+            print(f"[ERROR] Таймаут при завантаженні {url}")
+        else:
+            print(f"[ERROR] Не вдалось завантажити {url}: {error}")
+        return False
+    return False
+
+
+def parse_single_product(url, driver, timeout=12, policy=None):
+    """policy — FetchPolicy для завантаження сторінки (див. load_page)."""
     product = {}
+    timer = PhaseTimer()
 
-    try:
-        driver.get(url)
+    if not load_page(url, driver, timeout=timeout, policy=policy):
+        return None
+    timer.mark("load")
 
-        # Чекаємо на завантаження основного контенту
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.XPATH, "//h1"))
-        )
-        time.sleep(2)
+    try:
+        # Блок ціни (може бути відсутній, якщо товару немає в наявності)
+        wait_until(driver, EC.presence_of_element_located((By.CSS_SELECTOR, ".br-pr-np")))
+        timer.mark("price")
 
         # Перехід до секції "Характеристики"
         try:
             char_link = driver.find_element(By.XPATH, "//a[@href='#br-characteristics']")
             driver.execute_script("arguments[0].click();", char_link)
-            time.sleep(1)
+            wait_until(driver, EC.presence_of_element_located((By.CSS_SELECTOR, ".br-pr-chr-item")))
         except Exception:
             pass
+        timer.mark("characteristics")
 
         # Розгортаємо всі характеристики
         try:
-            show_all_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.CLASS_NAME, "br-prs-button"))
+            show_all_button = wait_until(
+                driver, EC.element_to_be_clickable((By.CLASS_NAME, "br-prs-button"))
             )
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", show_all_button)
-            time.sleep(0.5)
-            driver.execute_script("arguments[0].click();", show_all_button)
-            time.sleep(2)
-        except TimeoutException:
-            pass
+            if show_all_button is not None:
+                rows_before = visible_chr_rows(driver)
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", show_all_button)
+                driver.execute_script("arguments[0].click();", show_all_button)
+                # Готово, коли з'явились нові рядки або кнопка зникла
+                wait_until(
+                    driver,
+                    lambda d: visible_chr_rows(d) > rows_before
+                    or EC.invisibility_of_element(show_all_button)(d),
+                )
         except Exception:
             pass
+        timer.mark("expand")
 
     except TimeoutException:
         print(f"[ERROR] Таймаут при завантаженні {url}")
@@ -161,56 +243,43 @@ def parse_single_product(url, driver, timeout=12):
     product["link"] = url
 
     # ==================== Назва товару ====================
-    product["title"] = get_text_or_none(driver, By.XPATH, "//div[@id='br-pr-1']/h1")
+    product["title"] = get_text_or_none(driver, By.XPATH, fields.TITLE_XPATH)
     product["full_name"] = product["title"]
 
     # ==================== Основні характеристики (mapping) ====================
-    field_map = {
-        "color": "//div[@class='br-pr-chr-item']//div[./span[normalize-space(text())='Колір']]/span[2]",
-        "memory": "//span[contains(text(), 'Вбудована пам')]/following-sibling::span[1]",
-        "article": "//span[normalize-space(text())='Артикул']/following-sibling::span[1]",
-        "diagonal": "//span[normalize-space(text())='Діагональ екрану']/following-sibling::span[1]",
-        "resolution": "//span[normalize-space(text())='Роздільна здатність екрану']/following-sibling::span[1]",
-    }
-
-    for key, xpath in field_map.items():
+    for key, xpath in fields.FIELD_MAP.items():
         product[key] = get_text_or_none(driver, By.XPATH, xpath)
 
     # ==================== Продавець ====================
-    product["vendor"] = get_text_or_none(driver, By.XPATH, "//div[@class='delivery-target']//strong")
-
-    # ==================== Ціна ====================
-    product["price"] = get_price_or_none(driver, "//div[@class='br-pr-np']//div/span[1]")
+    product["vendor"] = get_text_or_none(driver, By.XPATH, fields.VENDOR_XPATH)
 
-    # ==================== Акційна ціна ====================
-    product["discount_price"] = get_price_or_none(driver, "//div[@class='br-pr-np-hz']//div/span[1]") \
-                                or product["price"]
+    # ==================== Ціна та акційна ціна ====================
+    product["price"] = get_price_or_none(driver, fields.PRICE_XPATH)
+    product["discount_price"] = get_price_or_none(driver, fields.DISCOUNT_PRICE_XPATH)
 
     # ==================== Фото ====================
-    product["photos"] = get_photos(driver, url)
+    product["photos"] = get_photos(driver)
 
     # ==================== Код товару ====================
     try:
-        code_el = driver.find_element(
-            By.XPATH, "//div[@id='product_code']//span[contains(@class,'br-pr-code-val')]"
-        )
-        product["code"] = code_el.get_attribute("textContent").strip()
+        code_el = driver.find_element(By.XPATH, fields.CODE_XPATH)
+        product["code"] = code_el.get_attribute("textContent")
     except NoSuchElementException:
         product["code"] = None
 
     # ==================== Кількість відгуків ====================
     try:
-        reviews_el = driver.find_element(By.XPATH, "//a[@href='#reviews-list']/span")
-        product["reviews_count"] = int(reviews_el.text.strip())
-    except (NoSuchElementException, ValueError):
+        reviews_el = driver.find_element(By.XPATH, fields.REVIEWS_XPATH)
+        product["reviews_count"] = parse_reviews(reviews_el.text)
+    except NoSuchElementException:
         product["reviews_count"] = None
 
     # ==================== Усі характеристики ====================
     specifications = {}
     try:
-        char_blocks = driver.find_elements(By.XPATH, "//div[contains(@class, 'br-pr-chr-item')]")
+        char_blocks = driver.find_elements(By.XPATH, fields.CHR_BLOCKS_XPATH)
         for block in char_blocks:
-            rows = block.find_elements(By.XPATH, ".//div/div")
+            rows = block.find_elements(By.XPATH, fields.CHR_ROWS_XPATH)
             for row in rows:
                 spans = row.find_elements(By.XPATH, ".//span")
                 if len(spans) >= 2:
@@ -221,98 +290,279 @@ def parse_single_product(url, driver, timeout=12):
                     if links:
                         value = ", ".join(a.text.strip() for a in links if a.text.strip())
                     else:
-                        value = spans[1].text.strip()
-                    if value:
-                        specifications[key] = value
+                        value = spans[1].text
+                    specifications[key] = value
     except Exception:
         pass
 
     product["specifications"] = specifications
+    timer.mark("extract")
+    timer.log(url)
+    # load уже враховано як fetch у policy.after
+    timer.record(METRICS, {"render": ("price", "characteristics", "expand"), "extract": ("extract",)})
 
-    return product
+    return normalize_product(product)
 
 
-# ------------------ Збереження в БД ------------------
-def save_to_db(product_data):
-    """
-    Зберігає дані продукту в БД через Django ORM.
-    Логіка:
-    - Якщо продукт з таким кодом існує і дані не змінились → нічого не робимо.
-    - Якщо продукт з таким кодом існує, але дані змінились → оновлюємо.
-    - Якщо продукту з таким кодом немає → створюємо новий.
-    """
-
-    model_fields = [f for f in Product._meta.get_fields()
-                    if getattr(f, 'concrete', False) and not getattr(f, 'auto_created', False)]
-    field_names = {f.name: f for f in model_fields}
-
-    save_kwargs = {}
-    for field_name, field_obj in field_names.items():
-        if field_obj.primary_key:
-            continue
-        value = product_data.get(field_name)
-        if value is not None:
-            save_kwargs[field_name] = value
-
+# ------------------ MAIN ------------------
+def page_transfer_stats(driver):
+    """Байти та кількість запитів для поточної сторінки (Performance API)."""
     try:
-        code = save_kwargs.get('code')
-        if code:
-            obj = Product.objects.filter(code=code).first()
-            if obj:
-                duplicate = True
-                for k, v in save_kwargs.items():
-                    if getattr(obj, k) != v:
-                        duplicate = False
-                        break
-
-                if duplicate:
-                    print(f"[DB] Продукт (code={code}) вже існує — не створюємо дубліката")
-                    return obj
-                else:
-                    for k, v in save_kwargs.items():
-                        setattr(obj, k, v)
-                    obj.save()
-                    print(f"[DB] Оновлено Product (code={code}) id={obj.pk}")
-                    return obj
-            else:
-                obj = Product.objects.create(**save_kwargs)
-                print(f"[DB] Створено Product (code={code}) id={obj.pk}")
-                return obj
-        else:
-            obj = Product.objects.create(**save_kwargs)
-            print(f"[DB] Створено Product id={obj.pk}")
-            return obj
-
-    except Exception as e:
-        print(f"[ERROR] Помилка збереження в БД: {e}")
+        return driver.execute_script(f"return ({TRANSFER_STATS_JS})();")
+    except Exception:
         return None
 
 
-# ------------------ MAIN ------------------
-if __name__ == "__main__":
-
-    PRODUCT_URLS = [
-        "https://brain.com.ua/ukr/Mobilniy_telefon_Apple_iPhone_15_128GB_Black-p1044347.html",
-    ]
-
-    driver = create_driver()
+def run(urls, profile=FULL, report=None, save=True, frontier=None, policy=None):
+    driver = create_driver(profile)
+    # Успіх URL фіксується у frontier лише після запису пачки з товаром
+    pipeline = ProductPipeline(save=save, on_finished=frontier.finished if frontier is not None else None)
+    if policy is None:
+        policy = browser_policy()
 
     try:
-        for url in PRODUCT_URLS:
+        for url in urls:
             print(f"\nПарсинг: {url}")
             try:
-                data = parse_single_product(url, driver)
+                policy.before(url)
+                started = time.perf_counter()
+                data = parse_single_product(url, driver, policy=policy)
+                if report is not None:
+                    report.record(profile, url, time.perf_counter() - started, page_transfer_stats(driver))
                 if not data:
                     print("[WARN] Дані не отримані")
+                    METRICS.inc("pages", result="failed")
+                    pipeline.finished(url, False, "no data")
                     continue
 
                 print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
-                save_to_db(data)
-                time.sleep(2.0)
+                pipeline.process(data, url)
+                METRICS.inc("pages", result="ok")
             except Exception as e:
                 print(f"[ERROR] Помилка при обробці {url}: {e}")
+                METRICS.inc("pages", result="failed")
+                pipeline.finished(url, False, e)
                 continue
     finally:
         driver.quit()
+        policy.report()
+        pipeline.close()
+        if frontier is not None:
+            frontier.flush()
+            frontier.report()
+
+
+# ------------------ Пул процесів ------------------
+def _driver_alive(driver):
+    """Перевіряє, що сесія браузера ще відповідає."""
+    try:
+        driver.execute_script("return 1;")
+        return True
+    except WebDriverException:
+        return False
+
+
+def _pool_worker(profile, url_queue, result_queue, restart_after, rate, max_rate, retries, dead_letters):
+    """
+    Процес-воркер: тримає власний драйвер і власну FetchPolicy (rate / max_rate —
+    його частка загальної частоти), бере URL з url_queue і кладе
+    (url, data, метрики сторінки — METRICS.drain()) у result_queue. Драйвер перезапускається після restart_after
+    сторінок або якщо браузер перестав відповідати. З БД не працює —
+    запис робить батьківський процес.
+    """
+    driver = None
+    pages = 0
+    policy = browser_policy(rate, max_rate, retries, dead_letters)
+    try:
+        while True:
+            url = url_queue.get()
+            if url is None:
+                break
+            if driver is not None and restart_after and pages >= restart_after:
+                driver.quit()
+                driver = None
+            if driver is None:
+                driver = create_driver(profile)
+                pages = 0
+
+            print(f"\nПарсинг: {url}")
+            data = None
+            policy.before(url)
+            try:
+                data = parse_single_product(url, driver, policy=policy)
+                pages += 1
+            except Exception as e:
+                print(f"[ERROR] Помилка при обробці {url}: {e}")
+            if data is None and not _driver_alive(driver):
+                print("[WARN] Браузер не відповідає — перезапуск драйвера")
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                driver = None
+
+            result_queue.put((url, data, METRICS.drain()))
+    finally:
+        if driver is not None:
+            driver.quit()
+        policy.report()
+        result_queue.put(None)
+
+
+def run_pool(urls, workers, profile=FULL, restart_after=100, rate=None, max_rate=None, batch_size=500,
+             frontier=None, retries=3, dead_letters=None, on_finished=None):
+    """
+    Паралельний парсинг: workers процесів, кожен зі своїм Chrome.
+    rate / max_rate — початкова та максимальна загальна частота переходів
+    на хост (за замовчуванням 0.5 і 2 на воркер); ділиться між воркерами порівну.
+    retries / dead_letters — див. browser_policy.
+    Розібрані товари повертаються в батьківський процес і записуються в БД пачками;
+    результат кожного URL фіксується у frontier (якщо передано) — успіх лише
+    після запису пачки з товаром; on_finished — додатковий callback(url, ok, error=None).
+    """
+    rate = (rate if rate is not None else 0.5 * workers) / workers
+    max_rate = (max_rate if max_rate is not None else 2.0 * workers) / workers
+    ctx = multiprocessing.get_context("spawn")
+    # Обмежена черга: URL беруться з urls не швидше, ніж воркери їх обробляють
+    url_queue = ctx.Queue(maxsize=workers * 2)
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(target=_pool_worker, args=(profile, url_queue, result_queue, restart_after, rate, max_rate,
+                                                 retries, dead_letters))
+        for _ in range(workers)
+    ]
+    for proc in processes:
+        proc.start()
+
+    # URL подаються з окремого потоку: urls може бути генератором (discovery),
+    # і результати воркерів мають оброблятись паралельно з подачею
+    def feed():
+        for url in urls:
+            url_queue.put(url)
+        for _ in processes:
+            url_queue.put(None)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    def finished(url, ok, error=None):
+        if frontier is not None:
+            frontier.finished(url, ok, error)
+        if on_finished is not None:
+            on_finished(url, ok, error)
+
+    pipeline = ProductPipeline(batch_size=batch_size, on_finished=finished)
+    stopped = 0
+    failed = 0
+    try:
+        while stopped < len(processes):
+            try:
+                message = result_queue.get(timeout=5)
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in processes):
+                    print("[ERROR] Усі воркери завершились аварійно")
+                    break
+                continue
+            if message is None:
+                stopped += 1
+                continue
+            url, data, metrics = message
+            METRICS.merge(metrics)
+            if not data:
+                failed += 1
+                METRICS.inc("pages", result="failed")
+                print(f"[WARN] Дані не отримані: {url}")
+                finished(url, False, "no data")
+                continue
+            pipeline.process(data, url)
+            METRICS.inc("pages", result="ok")
+    finally:
+        pipeline.flush()
+        if frontier is not None:
+            frontier.flush()
+            frontier.report()
+        for proc in processes:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+        print(f"[DB] Разом: {pipeline.totals}, помилок: {failed}, не записано: {pipeline.failed}")
+
+
+if __name__ == "__main__":
+
+    PRODUCT_URLS = [
+        "https://brain.com.ua/ukr/Mobilniy_telefon_Apple_iPhone_15_128GB_Black-p1044347.html",
+    ]
 
+    arg_parser = argparse.ArgumentParser(description="Парсер товарів brain.com.ua (Selenium)")
+    arg_parser.add_argument("--profile", choices=PROFILES + ("compare",), default=FULL,
+                            help="full — як раніше; lean — headless без зображень, шрифтів і сторонніх запитів; "
+                                 "compare — пройти URL в обох профілях без запису в БД і порівняти")
+    arg_parser.add_argument("--workers", type=int, default=1,
+                            help="кількість процесів, кожен зі своїм Chrome (1 — послідовно в цьому процесі)")
+    arg_parser.add_argument("--restart-after", type=int, default=100,
+                            help="перезапускати драйвер воркера після N сторінок (0 — ніколи)")
+    arg_parser.add_argument("--discover", nargs="+", metavar="URL",
+                            help="замість PRODUCT_URLS знаходити товари в категоріях / sitemap (*.xml, *.xml.gz)")
+    arg_parser.add_argument("--rate", type=float,
+                            help="початкова частота переходів за секунду на хост (разом для всіх воркерів), "
+                                 "далі підлаштовується під час завантаження сторінок; за замовчуванням 0.5 на воркер")
+    arg_parser.add_argument("--max-rate", type=float,
+                            help="максимальна частота переходів за секунду на хост; за замовчуванням 2 на воркер")
+    arg_parser.add_argument("--retries", type=int, default=3,
+                            help="скільки разів повторювати таймаути та збої браузера при завантаженні сторінки")
+    arg_parser.add_argument("--dead-letters", metavar="PATH",
+                            help="файл (JSON Lines), куди записуються URL, які не вдалось завантажити")
+    arg_parser.add_argument("--replay-dead-letters", metavar="PATH",
+                            help="замість PRODUCT_URLS обійти URL з dead-letter файлу (файл перейменовується на *.replayed)")
+    arg_parser.add_argument("--frontier", action="store_true",
+                            help="додати URL у чергу обходу в БД і парсити з неї (обхід можна продовжити після зупинки)")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="продовжити обхід з черги в БД без додавання нових URL; URL, взяті "
+                                 "перерваним запуском, одразу повертаються в чергу — не запускайте "
+                                 "з --resume, поки з цією чергою працює інший обхід")
+    arg_parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                            help="віддавати метрики обходу (час етапів, статуси, записи в БД) "
+                                 "на http://127.0.0.1:PORT/metrics у форматі Prometheus")
+    arg_parser.add_argument("--metrics-json", metavar="PATH",
+                            help="дописувати summary метрик з перцентилями у PATH (JSON Lines) "
+                                 "раз на --metrics-interval секунд і в кінці обходу")
+    arg_parser.add_argument("--metrics-interval", type=float, default=60,
+                            help="як часто писати --metrics-json, секунд")
+    args = arg_parser.parse_args()
+    METRICS.start(port=args.metrics_port, json_path=args.metrics_json, interval=args.metrics_interval)
+
+    if args.discover:
+        PRODUCT_URLS = iter_product_urls(args.discover)
+    elif args.replay_dead_letters:
+        PRODUCT_URLS = DeadLetters(args.replay_dead_letters).take()
+        print(f"[RETRY] Повторний обхід {len(PRODUCT_URLS)} URL з {args.replay_dead_letters}")
+
+    frontier = None
+    if (args.frontier or args.resume) and args.profile != "compare":
+        frontier = Frontier()
+        # Після аварії URL попереднього запуску не чекають закінчення lease
+        frontier.release_stale(lease=timedelta(0) if args.resume else None)
+        if not args.resume:
+            print(f"[FRONTIER] Додано в чергу: {frontier.add(PRODUCT_URLS)}")
+        PRODUCT_URLS = frontier
+
+    report = ProfileReport()
+    if args.profile == "compare":
+        # Список проходиться двічі, тож генератор discovery матеріалізуємо
+        PRODUCT_URLS = list(PRODUCT_URLS)
+        for profile in PROFILES:
+            run(PRODUCT_URLS, profile=profile, report=report, save=False)
+    elif args.workers > 1:
+        run_pool(PRODUCT_URLS, args.workers, profile=args.profile, restart_after=args.restart_after,
+                 rate=args.rate, max_rate=args.max_rate, frontier=frontier,
+                 retries=args.retries, dead_letters=args.dead_letters)
+    else:
+        policy = browser_policy(rate=0.5 if args.rate is None else args.rate,
+                                max_rate=2.0 if args.max_rate is None else args.max_rate,
+                                retries=args.retries, dead_letters=args.dead_letters)
+        run(PRODUCT_URLS, profile=args.profile, report=report, frontier=frontier, policy=policy)
+    report.summary()
+
+    METRICS.stop()
     print("\nГотово.")
@@ -1,49 +1,22 @@
 from __future__ import annotations
+import os
 import time
 import json
-import re
-from decimal import Decimal, InvalidOperation
-from urllib.parse import urljoin
+import argparse
 import asyncio
+from contextlib import nullcontext
+from datetime import timedelta
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from asgiref.sync import sync_to_async
 from load_django import *
-from parser_app.models import Product
-
-
-# ------------------ Утиліти ------------------
-def _parse_price(text):
-    """Витягує число з рядка і повертає Decimal або None."""
-    if not text:
-        return None
-    m = re.search(r'[\d\s,\.]+', text)
-    if not m:
-        return None
-    raw = m.group().strip()
-    raw = raw.replace(' ', '').replace(',', '.')
-    try:
-        return Decimal(raw)
-    except InvalidOperation:
-        try:
-            return Decimal(str(float(raw)))
-        except Exception:
-            return None
-
-
-def _unique_preserve_order(seq):
-    seen = set()
-    out = []
-    for x in seq:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
-
-
-def clean_text(text: str | None) -> str | None:
-    if not text:
-        return None
-    return " ".join(text.split())
+from parser_app.frontier import Frontier
+from discovery import discover_product_urls, iter_product_urls
+from fetch_policy import OK, RETRY, DeadLetters, browser_policy, classify
+from metrics import METRICS
+from browser_profiles import (FULL, LEAN, PROFILES, BLOCKED_RESOURCE_TYPES, TRANSFER_STATS_JS,
+                              ProfileReport, is_third_party)
+from scraper import AsyncProductPipeline, normalize_product, parse_price, parse_reviews, strip_or_none
+from scraper import fields
 
 
 # ==================== HELPERS ====================
@@ -64,43 +37,99 @@ async def get_text_or_none(page, xpath):
 async def get_price_or_none(page, xpath):
     """Повертає число-ціну або None"""
     txt = await get_text_or_none(page, xpath)
-    return _parse_price(txt) if txt else None
+    return parse_price(txt) if txt else None
 
 
-async def get_photos(page, url):
-    """Збирає всі фото товару"""
+async def get_photos(page):
+    """Збирає адреси всіх фото товару (нормалізує їх normalize_product)"""
     photos = []
     try:
-        img_elements = await page.locator("xpath=//img[@class='zoomImg']").all()
-        for img in img_elements:
-            src = (await img.get_attribute('data-big-picture-src') or
-                   await img.get_attribute('data-src') or
-                   await img.get_attribute('src'))
-            if src:
-                src = src.strip()
-                if src.startswith('//'):
-                    src = 'https:' + src
-                elif src.startswith('/'):
-                    src = urljoin(url, src)
-                elif not src.startswith('http'):
-                    src = urljoin(url, src)
-                photos.append(src)
+        for img in await page.locator(f"xpath={fields.PHOTOS_XPATH}").all():
+            for attr in fields.PHOTO_ATTRIBUTES:
+                src = await img.get_attribute(attr)
+                if src:
+                    photos.append(src)
+                    break
     except Exception:
         pass
-    return _unique_preserve_order(photos)
+    return photos
 
 
 # ==================== PARSER ====================
 
-async def parse_single_product(url, page, timeout=12000):
-    """timeout в мілісекундах для Playwright"""
-    product = {}
+async def parse_single_product(url, page, timeout=12000, fast=False, policy=None):
+    """
+    timeout в мілісекундах для Playwright.
+    fast=True — витягувати дані одним page.evaluate (extract_product_fast).
+    policy — FetchPolicy (див. load_page).
+    """
+    if not await open_product_page(url, page, timeout=timeout, policy=policy):
+        return None
+    with METRICS.time("extract"):
+        if fast:
+            return await extract_product_fast(page, url)
+        return await extract_product(page, url)
 
-    try:
-        await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
 
-        # Чекаємо на завантаження основного контенту
-        await page.wait_for_selector("xpath=//h1", timeout=timeout)
+async def load_page(url, page, timeout=12000, policy=None):
+    """
+    Переходить на url і чекає на основний контент (<h1>). Повертає True при успіху.
+    policy — FetchPolicy: таймаути, збої та 5xx / 429 повторюються, 404 — ні;
+    після вичерпання спроб URL записується в dead-letter. Паузу перед першою
+    спробою робить викликач (policy.abefore), щоб вона не входила в час сторінки.
+    """
+    retries = policy.retries if policy is not None else 0
+    for attempt in range(retries + 1):
+        if attempt:
+            await policy.abefore(url)
+        started = time.perf_counter()
+        status = error = retry_after = None
+        with policy.attempt(url) if policy is not None else nullcontext():
+            try:
+                response = await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
+                if response is not None:
+                    status = response.status
+                    retry_after = await response.header_value("retry-after")
+                if status is None or status < 400:
+                    # Чекаємо на завантаження основного контенту
+                    await page.wait_for_selector("xpath=//h1", timeout=timeout)
+            except Exception as e:
+                error = e
+            if policy is not None:
+                outcome = policy.after(url, time.perf_counter() - started, status, error, retry_after)
+            else:
+                outcome = classify(status, error)
+        if outcome == OK:
+            return True
+
+        if isinstance(error, PlaywrightTimeoutError):
+            reason = "таймаут"
+        else:
+            reason = error or f"HTTP {status}"
+        if outcome == RETRY and attempt < retries:
+            print(f"[RETRY] {url}: {reason}, спроба {attempt + 2} з {retries + 1}")
+            await asyncio.sleep(policy.retry_delay(attempt, status))
+            continue
+        if policy is not None:
+            policy.give_up(url, error, status, attempt + 1)
+        if isinstance(error, PlaywrightTimeoutError):
+            print(f"[ERROR] Таймаут при завантаженні {url}")
+        else:
+            print(f"[ERROR] Не вдалось завантажити {url}: {reason}")
+        return False
+    return False
+
+
+async def open_product_page(url, page, timeout=12000, policy=None):
+    """
+    Відкриває сторінку товару і розгортає характеристики. Повертає True при успіху.
+    Час розгортання (після завантаження) пишеться в METRICS як render.
+    """
+    if not await load_page(url, page, timeout=timeout, policy=policy):
+        return False
+
+    started = time.perf_counter()
+    try:
         await asyncio.sleep(0.1)
 
         # Перехід до секції "Характеристики"
@@ -127,212 +156,529 @@ async def parse_single_product(url, page, timeout=12000):
 
     except PlaywrightTimeoutError:
         print(f"[ERROR] Таймаут при завантаженні {url}")
-        return None
+        return False
     except Exception as e:
         print(f"[ERROR] Не вдалось завантажити {url}: {e}")
-        return None
+        return False
+    finally:
+        METRICS.observe("render", time.perf_counter() - started)
+
+    return True
+
 
+async def extract_product(page, url):
+    """Витягує дані з уже відкритої сторінки окремими запитами локаторів."""
+    product = {}
     product["link"] = url
 
     # ==================== Назва товару ====================
-    product["title"] = await get_text_or_none(page, "//div[@id='br-pr-1']/h1")
+    product["title"] = await get_text_or_none(page, fields.TITLE_XPATH)
     product["full_name"] = product["title"]
 
     # ==================== Основні характеристики (mapping) ====================
-    field_map = {
-        "color": "//div[@class='br-pr-chr-item']//div[./span[normalize-space(text())='Колір']]/span[2]",
-        "memory": "//span[contains(text(), 'Вбудована пам')]/following-sibling::span[1]",
-        "article": "//span[normalize-space(text())='Артикул']/following-sibling::span[1]",
-        "diagonal": "//span[normalize-space(text())='Діагональ екрану']/following-sibling::span[1]",
-        "resolution": "//span[normalize-space(text())='Роздільна здатність екрану']/following-sibling::span[1]",
-    }
-
-    for key, xpath in field_map.items():
+    for key, xpath in fields.FIELD_MAP.items():
         product[key] = await get_text_or_none(page, xpath)
 
     # ==================== Продавець ====================
-    raw_vendor = await get_text_or_none(page, "//div[@class='delivery-target']//strong")
-    product["vendor"] = clean_text(raw_vendor)
-
-    # ==================== Ціна ====================
-    product["price"] = await get_price_or_none(page, "//div[@class='br-pr-np']//div/span[1]")
+    product["vendor"] = await get_text_or_none(page, fields.VENDOR_XPATH)
 
-    # ==================== Акційна ціна ====================
-    discount = await get_price_or_none(page, "//div[@class='br-pr-np-hz']//div/span[1]")
-    product["discount_price"] = discount or product["price"]
+    # ==================== Ціна та акційна ціна ====================
+    product["price"] = await get_price_or_none(page, fields.PRICE_XPATH)
+    product["discount_price"] = await get_price_or_none(page, fields.DISCOUNT_PRICE_XPATH)
 
     # ==================== Фото ====================
-    product["photos"] = await get_photos(page, url)
+    product["photos"] = await get_photos(page)
 
     # ==================== Код товару ====================
-    try:
-        code_el = page.locator("xpath=//div[@id='product_code']//span[contains(@class,'br-pr-code-val')]").first
-        count = await code_el.count()
-        if count > 0:
-            text = await code_el.text_content()
-            product["code"] = text.strip() if text else None
-        else:
-            product["code"] = None
-    except Exception:
-        product["code"] = None
+    product["code"] = await get_text_or_none(page, fields.CODE_XPATH)
 
     # ==================== Кількість відгуків ====================
-    try:
-        reviews_el = page.locator("xpath=//a[@href='#reviews-list']/span").first
-        count = await reviews_el.count()
-        if count > 0:
-            text = await reviews_el.text_content()
-            product["reviews_count"] = int(text.strip()) if text else None
-        else:
-            product["reviews_count"] = None
-    except (ValueError, Exception):
-        product["reviews_count"] = None
+    product["reviews_count"] = parse_reviews(await get_text_or_none(page, fields.REVIEWS_XPATH))
 
     # ==================== Усі характеристики ====================
     specifications = {}
     try:
-        char_blocks = await page.locator("xpath=//div[contains(@class, 'br-pr-chr-item')]").all()
+        char_blocks = await page.locator(f"xpath={fields.CHR_BLOCKS_XPATH}").all()
         for block in char_blocks:
-            rows = await block.locator("xpath=.//div/div").all()
+            rows = await block.locator(f"xpath={fields.CHR_ROWS_XPATH}").all()
             for row in rows:
                 spans = await row.locator("xpath=.//span").all()
                 if len(spans) >= 2:
-                    key_text = await spans[0].text_content()
-                    key = key_text.strip() if key_text else ""
+                    key = strip_or_none(await spans[0].text_content())
                     if not key:
                         continue
                     links = await spans[1].locator("xpath=.//a").all()
                     if links:
                         values = []
                         for a in links:
-                            link_text = await a.text_content()
-                            if link_text and link_text.strip():
-                                values.append(link_text.strip())
+                            link_text = strip_or_none(await a.text_content())
+                            if link_text:
+                                values.append(link_text)
                         value = ", ".join(values)
                     else:
-                        val_text = await spans[1].text_content()
-                        value = val_text.strip() if val_text else ""
-                    if value:
-                        specifications[key] = value
+                        value = await spans[1].text_content()
+                    specifications[key] = value
     except Exception:
         pass
 
     product["specifications"] = specifications
 
-    return product
+    return normalize_product(product)
+
+
+# Збирає "сирі" тексти та атрибути за тими ж XPath, що й extract_product,
+# за один виклик у браузері. Обробка (ціни, URL фото, пробіли) — normalize_product
+# на боці Python, тож результат збігається з extract_product.
+EXTRACT_JS = """
+(args) => {
+    const first = (xpath) => {
+        const node = document.evaluate(
+            xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+        return node ? node.textContent : null;
+    };
+    const all = (xpath, context) => {
+        const snapshot = document.evaluate(
+            xpath, context || document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+        );
+        const nodes = [];
+        for (let i = 0; i < snapshot.snapshotLength; i++) {
+            nodes.push(snapshot.snapshotItem(i));
+        }
+        return nodes;
+    };
+
+    const fields = {};
+    for (const [key, xpath] of Object.entries(args.fieldMap)) {
+        fields[key] = first(xpath);
+    }
 
+    const photos = all(args.photos).map(
+        (img) => args.photoAttributes.map((attr) => img.getAttribute(attr)).find((src) => src) || null
+    );
+
+    const specifications = [];
+    for (const block of all(args.chrBlocks)) {
+        for (const row of all(args.chrRows, block)) {
+            const spans = all(".//span", row);
+            if (spans.length < 2) {
+                continue;
+            }
+            const links = all(".//a", spans[1]).map((a) => a.textContent);
+            specifications.push([spans[0].textContent, links.length ? links : null, spans[1].textContent]);
+        }
+    }
 
-# ------------------ Збереження в БД ------------------
-@sync_to_async
-def save_to_db(product_data):
+    return {
+        title: first(args.title),
+        fields: fields,
+        vendor: first(args.vendor),
+        price: first(args.price),
+        discount_price: first(args.discountPrice),
+        photos: photos,
+        code: first(args.code),
+        reviews: first(args.reviews),
+        specifications: specifications,
+    };
+}
+"""
+
+
+# Аргументи EXTRACT_JS: XPath полів зі спільного scraper.fields
+EXTRACT_ARGS = {
+    "fieldMap": fields.FIELD_MAP,
+    "title": fields.TITLE_XPATH,
+    "vendor": fields.VENDOR_XPATH,
+    "price": fields.PRICE_XPATH,
+    "discountPrice": fields.DISCOUNT_PRICE_XPATH,
+    "photos": fields.PHOTOS_XPATH,
+    "photoAttributes": list(fields.PHOTO_ATTRIBUTES),
+    "code": fields.CODE_XPATH,
+    "reviews": fields.REVIEWS_XPATH,
+    "chrBlocks": fields.CHR_BLOCKS_XPATH,
+    "chrRows": fields.CHR_ROWS_XPATH,
+}
+
+
+async def extract_product_fast(page, url):
     """
-    Зберігає дані продукту в БД через Django ORM.
-    Логіка:
-    - Якщо продукт з таким кодом існує і дані не змінились → нічого не робимо.
-    - Якщо продукт з таким кодом існує, але дані змінились → оновлюємо.
-    - Якщо продукту з таким кодом немає → створюємо новий.
+    Те саме, що extract_product, але одним page.evaluate замість сотень
+    окремих запитів до браузера. Якщо evaluate не вдався — повертається
+    до extract_product.
     """
+    try:
+        raw = await page.evaluate(EXTRACT_JS, EXTRACT_ARGS)
+    except Exception as e:
+        print(f"[WARN] page.evaluate не вдався для {url}: {e}")
+        return await extract_product(page, url)
+
+    product = {}
+    product["link"] = url
+    product["title"] = strip_or_none(raw["title"])
+    product["full_name"] = product["title"]
+
+    for key in fields.FIELD_MAP:
+        product[key] = strip_or_none(raw["fields"].get(key))
 
-    model_fields = [f for f in Product._meta.get_fields()
-                    if getattr(f, 'concrete', False) and not getattr(f, 'auto_created', False)]
-    field_names = {f.name: f for f in model_fields}
+    product["vendor"] = raw["vendor"]
+    product["price"] = parse_price(strip_or_none(raw["price"]))
+    product["discount_price"] = parse_price(strip_or_none(raw["discount_price"]))
+    product["photos"] = [src for src in raw["photos"] if src]
+    product["code"] = strip_or_none(raw["code"])
+    product["reviews_count"] = parse_reviews(raw["reviews"])
 
-    save_kwargs = {}
-    for field_name, field_obj in field_names.items():
-        if field_obj.primary_key:
+    specifications = {}
+    for key_text, link_texts, value_text in raw["specifications"]:
+        key = strip_or_none(key_text)
+        if not key:
             continue
-        value = product_data.get(field_name)
-        if value is not None:
-            save_kwargs[field_name] = value
+        if link_texts is not None:
+            value = ", ".join(t.strip() for t in link_texts if t and t.strip())
+        else:
+            value = value_text
+        specifications[key] = value
+    product["specifications"] = specifications
 
-    try:
-        code = save_kwargs.get('code')
-        if code:
-            obj = Product.objects.filter(code=code).first()
-            if obj:
-                duplicate = True
-                for k, v in save_kwargs.items():
-                    if getattr(obj, k) != v:
-                        duplicate = False
-                        break
-
-                if duplicate:
-                    print(f"[DB] Продукт (code={code}) вже існує — не створюємо дубліката")
-                    return obj
-                else:
-                    for k, v in save_kwargs.items():
-                        setattr(obj, k, v)
-                    obj.save()
-                    print(f"[DB] Оновлено Product (code={code}) id={obj.pk}")
-                    return obj
+    return normalize_product(product)
+
+
+async def benchmark_extraction(page, urls, repeat=5):
+    """
+    Порівнює час витягування даних extract_product та extract_product_fast
+    на одних і тих самих відкритих сторінках і перевіряє, що результати однакові.
+    """
+    totals = {"locators": 0.0, "evaluate": 0.0}
+    pages = 0
+    for url in urls:
+        if not await open_product_page(url, page):
+            continue
+        timings = {}
+        results = {}
+        for name, extractor in (("locators", extract_product), ("evaluate", extract_product_fast)):
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                results[name] = await extractor(page, url)
+                runs.append(time.perf_counter() - started)
+            timings[name] = sorted(runs)[len(runs) // 2]
+            totals[name] += timings[name]
+        pages += 1
+        same = results["locators"] == results["evaluate"]
+        print(f"[BENCH] {url}\n"
+              f"        locators: {timings['locators'] * 1000:.1f} мс, "
+              f"evaluate: {timings['evaluate'] * 1000:.1f} мс, "
+              f"однаковий результат: {'так' if same else 'НІ'}")
+
+    if pages:
+        loc = totals["locators"] / pages * 1000
+        ev = totals["evaluate"] / pages * 1000
+        print(f"[BENCH] Середнє на сторінку ({pages} стор.): locators {loc:.1f} мс, "
+              f"evaluate {ev:.1f} мс, x{loc / ev if ev else 0:.1f}")
+
+
+# ------------------ Пул сторінок ------------------
+class PagePool:
+    """
+    Пул із size сторінок в одному контексті браузера. Кожна сторінка
+    обслуговується окремим воркером, який бере URL з asyncio.Queue, тож
+    поки одна сторінка чекає на мережу, інші вже парсять.
+    Сторінка пересоздається після recycle_after переходів або після помилки.
+    on_finished — callback(url, ok, error=None) для URL, які не вдалось обробити
+    (наприклад, Frontier.finished); успіх підтверджує on_product після запису
+    товару (AsyncProductPipeline з тим самим on_finished).
+    policy — спільна для всіх сторінок FetchPolicy; за замовчуванням limiter
+    починає з 0.5 переходу/с на сторінку і може зрости до 2, 3 повтори, breaker.
+    """
+
+    def __init__(self, context, size, recycle_after=50, fast=False, profile=FULL, report=None,
+                 on_finished=None, policy=None):
+        self.context = context
+        self.size = max(1, size)
+        self.recycle_after = recycle_after
+        if policy is None:
+            policy = browser_policy(rate=0.5 * self.size, max_rate=2.0 * self.size)
+        self.policy = policy
+        self.fast = fast
+        self.profile = profile
+        self.report = report
+        self.on_finished = on_finished
+
+    def _finished(self, url, ok, error=None):
+        if self.on_finished is not None:
+            self.on_finished(url, ok, error)
+
+    @staticmethod
+    async def _close_page(page):
+        if page is None or page.is_closed():
+            return
+        try:
+            await page.close()
+        except Exception as e:
+            print(f"[WARN] Не вдалось закрити сторінку: {e}")
+
+    async def _worker(self, queue, on_product):
+        # Сторінка створюється перед URL, а не після збою: якщо new_page()
+        # падає (браузер перезапускається), URL позначається невдалим, а
+        # воркер лишається живим — інакше run() чекав би на queue.put вічно
+        page = None
+        navigations = 0
+        try:
+            while True:
+                url = await queue.get()
+                try:
+                    if url is None:
+                        return
+                    if page is not None and self.recycle_after and navigations >= self.recycle_after:
+                        await self._close_page(page)
+                        page = None
+                    if page is None:
+                        page = await self.context.new_page()
+                        navigations = 0
+
+                    print(f"\nПарсинг: {url}")
+                    navigations += 1
+                    await self.policy.abefore(url)
+                    started = time.perf_counter()
+                    data = await parse_single_product(url, page, fast=self.fast, policy=self.policy)
+                    if self.report is not None:
+                        self.report.record(self.profile, url, time.perf_counter() - started,
+                                           await page_transfer_stats(page))
+                    if not data:
+                        print("[WARN] Дані не отримані")
+                        METRICS.inc("pages", result="failed")
+                        self._finished(url, False, "no data")
+                        # Сторінка могла залишитись у зламаному стані
+                        await self._close_page(page)
+                        page = None
+                        continue
+
+                    await on_product(data, url)
+                    METRICS.inc("pages", result="ok")
+                except Exception as e:
+                    print(f"[ERROR] Помилка при обробці {url}: {e}")
+                    METRICS.inc("pages", result="failed")
+                    self._finished(url, False, e)
+                    await self._close_page(page)
+                    page = None
+                finally:
+                    queue.task_done()
+        finally:
+            await self._close_page(page)
+
+    async def run(self, urls, on_product):
+        """
+        Обробляє всі urls (звичайний або асинхронний ітератор);
+        on_product — async-callback(data, url) для кожного товару.
+        """
+        queue = asyncio.Queue(maxsize=self.size * 2)
+        workers = [asyncio.create_task(self._worker(queue, on_product)) for _ in range(self.size)]
+        try:
+            if hasattr(urls, "__aiter__"):
+                async for url in urls:
+                    await queue.put(url)
             else:
-                obj = Product.objects.create(**save_kwargs)
-                print(f"[DB] Створено Product (code={code}) id={obj.pk}")
-                return obj
-        else:
-            obj = Product.objects.create(**save_kwargs)
-            print(f"[DB] Створено Product id={obj.pk}")
-            return obj
+                for url in urls:
+                    await queue.put(url)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+        self.policy.report()
 
-    except Exception as e:
-        print(f"[ERROR] Помилка збереження в БД: {e}")
+
+# ------------------ Профілі браузера ------------------
+async def page_transfer_stats(page):
+    """Байти та кількість запитів для поточної сторінки (Performance API)."""
+    try:
+        return await page.evaluate(TRANSFER_STATS_JS)
+    except Exception:
         return None
 
 
+async def _block_heavy_requests(route):
+    """Обробник route для профілю lean: відкидає зображення, шрифти, медіа та сторонні домени."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or is_third_party(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def launch_context(p, profile=FULL):
+    """
+    Запускає Chromium і створює контекст для профілю.
+    full — вікно браузера, всі ресурси; lean — headless, важкі та сторонні запити відкидаються.
+    Повертає (browser, context).
+    """
+    browser = await p.chromium.launch(
+        headless=(profile == LEAN),
+        args=[
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--no-sandbox',
+            '--disable-gpu',
+        ]
+    )
+
+    # Створення контексту з налаштуваннями
+    context = await browser.new_context(
+        viewport={'width': 1920, 'height': 1080},
+        user_agent='Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:126.0) Gecko/20100101 Firefox/126.0'
+    )
+
+    # Приховування автоматизації
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'webdriver', {
+            get: () => undefined
+        })
+    """)
+
+    if profile == LEAN:
+        await context.route("**/*", _block_heavy_requests)
+
+    return browser, context
+
+
 # ------------------ MAIN ------------------
-async def main():
+async def compare_profiles(p, urls, pages, recycle_after, fast):
+    """Проходить urls в обох профілях без запису в БД і друкує порівняння."""
+    report = ProfileReport()
+
+    async def skip(data, url):
+        pass
+
+    for profile in PROFILES:
+        browser, context = await launch_context(p, profile)
+        try:
+            pool = PagePool(context, size=pages, recycle_after=recycle_after, fast=fast,
+                            profile=profile, report=report)
+            await pool.run(urls, skip)
+        finally:
+            await context.close()
+            await browser.close()
+    report.summary()
+
+
+async def main(pages=1, recycle_after=50, fast=False, benchmark=False, profile=FULL, discover=None,
+               frontier=False, resume=False, rate=None, max_rate=None, retries=3, dead_letters=None,
+               replay=None, batch_size=500):
     PRODUCT_URLS = [
         "https://brain.com.ua/ukr/Mobilniy_telefon_Apple_iPhone_13_128GB_Starlight_MLPG3-p800206.html",
     ]
+    if replay:
+        PRODUCT_URLS = DeadLetters(replay).take()
+        print(f"[RETRY] Повторний обхід {len(PRODUCT_URLS)} URL з {replay}")
+    crawl_frontier = None
+    if (frontier or resume) and not benchmark and profile != "compare":
+        crawl_frontier = Frontier()
+        # Після аварії URL попереднього запуску не чекають закінчення lease
+        await sync_to_async(crawl_frontier.release_stale)(lease=timedelta(0) if resume else None)
+        if not resume:
+            seeds = iter_product_urls(discover) if discover else PRODUCT_URLS
+            print(f"[FRONTIER] Додано в чергу: {await sync_to_async(crawl_frontier.add)(seeds)}")
+        PRODUCT_URLS = crawl_frontier
+    elif discover:
+        PRODUCT_URLS = discover_product_urls(discover)
+        if benchmark or profile == "compare":
+            # Ці режими проходять список кілька разів
+            PRODUCT_URLS = [url async for url in PRODUCT_URLS]
 
     async with async_playwright() as p:
-        # Запуск браузера
-        browser = await p.chromium.launch(
-            headless=False,  # Змініть на True для headless режиму
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-gpu',
-            ]
-        )
-
-        # Створення контексту з налаштуваннями
-        context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:126.0) Gecko/20100101 Firefox/126.0'
-        )
-
-        # Приховування автоматизації
-        await context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            })
-        """)
-
-        page = await context.new_page()
+        if profile == "compare":
+            await compare_profiles(p, PRODUCT_URLS, pages, recycle_after, fast)
+            return
 
+        # Запуск браузера
+        browser, context = await launch_context(p, profile)
+
+        if benchmark:
+            page = await context.new_page()
+            try:
+                await benchmark_extraction(page, PRODUCT_URLS)
+            finally:
+                await context.close()
+                await browser.close()
+            return
+
+        on_finished = crawl_frontier.finished if crawl_frontier is not None else None
+        pipeline = AsyncProductPipeline(batch_size=batch_size, on_finished=on_finished)
+
+        async def on_product(data, url):
+            print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
+            await pipeline.process(data, url)
+
+        report = ProfileReport()
+        policy = browser_policy(rate=0.5 * pages if rate is None else rate,
+                                max_rate=2.0 * pages if max_rate is None else max_rate,
+                                retries=retries, dead_letters=dead_letters)
+        pool = PagePool(context, size=pages, recycle_after=recycle_after, fast=fast,
+                        profile=profile, report=report, policy=policy, on_finished=on_finished)
         try:
-            for url in PRODUCT_URLS:
-                print(f"\nПарсинг: {url}")
-                try:
-                    data = await parse_single_product(url, page)
-                    if not data:
-                        print("[WARN] Дані не отримані")
-                        continue
-
-                    print(json.dumps(data, ensure_ascii=False, indent=2, default=str))
-                    await save_to_db(data)
-                    await asyncio.sleep(1.0)
-                except Exception as e:
-                    print(f"[ERROR] Помилка при обробці {url}: {e}")
-                    continue
+            await pool.run(PRODUCT_URLS, on_product)
         finally:
             await context.close()
             await browser.close()
+            await pipeline.close()
+            if crawl_frontier is not None:
+                await crawl_frontier.aflush()
+                await sync_to_async(crawl_frontier.report)()
+            report.summary()
 
     print("\nГотово.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    arg_parser = argparse.ArgumentParser(description="Парсер товарів brain.com.ua (Playwright)")
+    arg_parser.add_argument("--pages", type=int, default=os.cpu_count() or 1,
+                            help="кількість паралельних сторінок браузера (за замовчуванням — кількість ядер); "
+                                 "кожна сторінка займає ~100-200 МБ RAM")
+    arg_parser.add_argument("--recycle-after", type=int, default=50,
+                            help="пересоздавати сторінку після N переходів (0 — ніколи)")
+    arg_parser.add_argument("--fast", action="store_true",
+                            help="витягувати дані одним page.evaluate замість окремих локаторів")
+    arg_parser.add_argument("--benchmark", action="store_true",
+                            help="порівняти час витягування locators vs evaluate (без запису в БД)")
+    arg_parser.add_argument("--profile", choices=PROFILES + ("compare",), default=FULL,
+                            help="full — як раніше; lean — headless без зображень, шрифтів і сторонніх запитів; "
+                                 "compare — пройти URL в обох профілях без запису в БД і порівняти")
+    arg_parser.add_argument("--discover", nargs="+", metavar="URL",
+                            help="замість PRODUCT_URLS знаходити товари в категоріях / sitemap (*.xml, *.xml.gz)")
+    arg_parser.add_argument("--rate", type=float,
+                            help="початкова частота переходів за секунду на хост (для всіх сторінок разом), "
+                                 "далі підлаштовується під час завантаження; за замовчуванням 0.5 на сторінку")
+    arg_parser.add_argument("--max-rate", type=float,
+                            help="максимальна частота переходів за секунду на хост; за замовчуванням 2 на сторінку")
+    arg_parser.add_argument("--retries", type=int, default=3,
+                            help="скільки разів повторювати таймаути, збої та 5xx при завантаженні сторінки (404 — ні)")
+    arg_parser.add_argument("--dead-letters", metavar="PATH",
+                            help="файл (JSON Lines), куди записуються URL, які не вдалось завантажити")
+    arg_parser.add_argument("--replay-dead-letters", metavar="PATH",
+                            help="замість PRODUCT_URLS обійти URL з dead-letter файлу (файл перейменовується на *.replayed)")
+    arg_parser.add_argument("--batch-size", type=int, default=500,
+                            help="скільки товарів записувати в БД за один раз (запис іде паралельно з парсингом)")
+    arg_parser.add_argument("--frontier", action="store_true",
+                            help="додати URL у чергу обходу в БД і парсити з неї (обхід можна продовжити після зупинки)")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="продовжити обхід з черги в БД без додавання нових URL; URL, взяті "
+                                 "перерваним запуском, одразу повертаються в чергу — не запускайте "
+                                 "з --resume, поки з цією чергою працює інший обхід")
+    arg_parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                            help="віддавати метрики обходу (час етапів, статуси, записи в БД) "
+                                 "на http://127.0.0.1:PORT/metrics у форматі Prometheus")
+    arg_parser.add_argument("--metrics-json", metavar="PATH",
+                            help="дописувати summary метрик з перцентилями у PATH (JSON Lines) "
+                                 "раз на --metrics-interval секунд і в кінці обходу")
+    arg_parser.add_argument("--metrics-interval", type=float, default=60,
+                            help="як часто писати --metrics-json, секунд")
+    args = arg_parser.parse_args()
+    METRICS.start(port=args.metrics_port, json_path=args.metrics_json, interval=args.metrics_interval)
+
+    asyncio.run(main(pages=args.pages, recycle_after=args.recycle_after,
+                     fast=args.fast, benchmark=args.benchmark, profile=args.profile,
+                     discover=args.discover, frontier=args.frontier, resume=args.resume,
+                     rate=args.rate, max_rate=args.max_rate, retries=args.retries,
+                     dead_letters=args.dead_letters, replay=args.replay_dead_letters,
+                     batch_size=args.batch_size))
+    METRICS.stop()
@@ -0,0 +1,92 @@
+"""
+browser_profiles.py
+Профілі навігації для браузерних парсерів (Selenium та Playwright).
+
+full — як раніше: вікно браузера, завантажуються всі ресурси сторінки.
+lean — headless, без зображень, відео, шрифтів та сторонніх доменів
+       (аналітика, реклама). Парсер читає лише текст DOM та атрибути
+       зображень, тож самі файли зображень не потрібні.
+"""
+from urllib.parse import urlsplit
+
+FULL = "full"
+LEAN = "lean"
+PROFILES = (FULL, LEAN)
+
+SITE_DOMAIN = "brain.com.ua"
+
+# Типи ресурсів Playwright (request.resource_type), які блокуються в lean
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Шаблони для CDP Network.setBlockedURLs (Selenium). CDP не вміє блокувати
+# "все, крім домену", тому сторонні сервіси перелічені явно.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*facebook.net*", "*facebook.com*",
+    "*connect.facebook*", "*hotjar.com*", "*criteo.*", "*tiktok.com*",
+    "*clarity.ms*", "*bing.com*", "*youtube.com*", "*ytimg.com*",
+]
+
+# Скільки байт передано для поточного документа (сама сторінка + ресурси).
+# Для сторонніх ресурсів без Timing-Allow-Origin браузер повертає 0,
+# тому значення — нижня оцінка, але придатна для порівняння профілів.
+TRANSFER_STATS_JS = """
+() => {
+    const entries = performance.getEntriesByType("navigation")
+        .concat(performance.getEntriesByType("resource"));
+    let bytes = 0;
+    for (const entry of entries) {
+        bytes += entry.transferSize || 0;
+    }
+    return {bytes: bytes, requests: entries.length};
+}
+"""
+
+
+def is_third_party(url):
+    """True, якщо URL не належить домену сайту (і його піддоменам)."""
+    host = urlsplit(url).hostname or ""
+    return not (host == SITE_DOMAIN or host.endswith("." + SITE_DOMAIN))
+
+
+class ProfileReport:
+    """Збирає байти та час завантаження кожної сторінки по профілях."""
+
+    def __init__(self):
+        self.pages = {}
+
+    def record(self, profile, url, seconds, transfer=None):
+        transfer = transfer or {}
+        self.pages.setdefault(profile, []).append({
+            "url": url,
+            "seconds": seconds,
+            "bytes": transfer.get("bytes", 0),
+            "requests": transfer.get("requests", 0),
+        })
+        print(f"[{profile.upper()}] {seconds:.2f} с, {transfer.get('bytes', 0) / 1024:.0f} КБ, "
+              f"{transfer.get('requests', 0)} запитів — {url}")
+
+    def summary(self):
+        """Друкує середні значення на сторінку для кожного профілю та їх співвідношення."""
+        averages = {}
+        for profile, rows in self.pages.items():
+            if not rows:
+                continue
+            averages[profile] = {
+                "seconds": sum(r["seconds"] for r in rows) / len(rows),
+                "bytes": sum(r["bytes"] for r in rows) / len(rows),
+                "requests": sum(r["requests"] for r in rows) / len(rows),
+            }
+            avg = averages[profile]
+            print(f"[REPORT] {profile}: {len(rows)} стор., {avg['seconds']:.2f} с/стор., "
+                  f"{avg['bytes'] / 1024:.0f} КБ/стор., {avg['requests']:.0f} запитів/стор.")
+
+        if FULL in averages and LEAN in averages:
+            full, lean = averages[FULL], averages[LEAN]
+            time_ratio = full["seconds"] / lean["seconds"] if lean["seconds"] else 0
+            bytes_ratio = full["bytes"] / lean["bytes"] if lean["bytes"] else 0
+            print(f"[REPORT] lean vs full: швидше в {time_ratio:.1f} раз, "
+                  f"менше трафіку в {bytes_ratio:.1f} раз")
+        return averages
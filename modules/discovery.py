@@ -0,0 +1,241 @@
+"""
+discovery.py
+Пошук URL товарів brain.com.ua у категоріях та sitemap.
+
+discover_product_urls(seeds) — асинхронний генератор: обходить сторінки
+категорій (з пагінацією через rel="next") і sitemap-файли (включно з
+sitemap-індексами та .xml.gz), витягує посилання на товари виду
+...-p<id>.html і віддає їх одразу, без дублікатів за id товару.
+Посилання на інші хости (партнери, CDN, дзеркала) відкидаються — див. hosts.
+Пам'ять не залежить від розміру каталогу: зберігаються лише id вже
+знайдених товарів, сторінки обробляються по одній і відкидаються, а
+оброблені елементи sitemap видаляються з дерева розбору.
+
+iter_product_urls(seeds) — те саме для синхронного коду (Selenium).
+"""
+import asyncio
+import queue
+import re
+import threading
+import zlib
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import aiohttp
+from bs4 import BeautifulSoup, SoupStrainer
+
+PRODUCT_URL_RE = re.compile(r"-p(\d+)\.html$")
+
+# Хости, посилання на які вважаються товарами (піддомени теж)
+PRODUCT_HOSTS = ("brain.com.ua",)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:126.0) Gecko/20100101 Firefox/126.0',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Для сторінок категорій потрібні лише посилання
+LINKS_ONLY = SoupStrainer(["a", "link"])
+
+
+def product_id(url):
+    """Повертає id товару з URL виду ...-p1044347.html або None."""
+    m = PRODUCT_URL_RE.search(urlsplit(url).path)
+    return int(m.group(1)) if m else None
+
+
+def canonical_product_url(url):
+    """URL товару без query та fragment."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+def allowed_host(url, hosts=PRODUCT_HOSTS):
+    """Чи належить url одному з hosts або його піддомену; hosts=None — будь-який хост."""
+    if hosts is None:
+        return True
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == allowed or host.endswith("." + allowed) for allowed in hosts)
+
+
+def is_sitemap(url):
+    path = urlsplit(url).path
+    return path.endswith(".xml") or path.endswith(".xml.gz")
+
+
+async def _get_text(session, url, semaphore, timeout):
+    async with semaphore:
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                resp.raise_for_status()
+                return await resp.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"[ERROR] Не вдалось завантажити {url}: {e}")
+            return None
+
+
+async def iter_category(session, url, semaphore, max_pages=500, timeout=20, hosts=PRODUCT_HOSTS):
+    """
+    Віддає посилання на товари зі сторінки категорії та наступних сторінок
+    пагінації (rel="next"). Зупиняється, коли наступної сторінки немає,
+    вона вже була або досягнуто max_pages. Посилання й пагінація на
+    хости поза hosts пропускаються.
+    """
+    visited = set()
+    page = 0
+    while url and url not in visited and page < max_pages:
+        visited.add(url)
+        page += 1
+        html = await _get_text(session, url, semaphore, timeout)
+        if html is None:
+            return
+
+        soup = BeautifulSoup(html, "lxml", parse_only=LINKS_ONLY)
+        next_url = None
+        for tag in soup.find_all(["a", "link"], href=True):
+            href = urljoin(url, tag["href"])
+            if not allowed_host(href, hosts):
+                continue
+            if product_id(href) is not None:
+                yield canonical_product_url(href)
+            elif "next" in (tag.get("rel") or ()) and next_url is None:
+                next_url = href
+        print(f"[DISCOVERY] Категорія, сторінка {page}: {url}")
+        url = next_url
+
+
+async def iter_sitemap(session, url, semaphore, timeout=60, hosts=PRODUCT_HOSTS):
+    """
+    Потоково розбирає sitemap: <loc> з <url> віддаються одразу,
+    вкладені sitemap з індексу обходяться по черзі. <loc> на хости поза
+    hosts пропускаються.
+    """
+    nested = []
+    parser = XMLPullParser(events=("start", "end"))
+    root = []
+    gzipped = urlsplit(url).path.endswith(".gz")
+
+    def drain():
+        for event, elem in parser.read_events():
+            if event == "start":
+                if not root:
+                    root.append(elem)
+                continue
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if tag == "loc" and elem.text:
+                yield elem.text.strip()
+            elif tag in ("url", "sitemap"):
+                # Звільняємо пам'ять: очищений елемент інакше лишився б
+                # дочірнім у корені <urlset>, і корінь ріс би з кожним URL
+                elem.clear()
+                try:
+                    root[0].remove(elem)
+                except (IndexError, ValueError):
+                    pass
+
+    async with semaphore:
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                resp.raise_for_status()
+                # .xml.gz без Content-Encoding aiohttp не розпаковує сам
+                inflate = None
+                if gzipped and "gzip" not in resp.headers.get("Content-Encoding", ""):
+                    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                async for chunk in resp.content.iter_chunked(64 * 1024):
+                    parser.feed(inflate.decompress(chunk) if inflate else chunk)
+                    for loc in drain():
+                        if not allowed_host(loc, hosts):
+                            continue
+                        if is_sitemap(loc):
+                            nested.append(loc)
+                        elif product_id(loc) is not None:
+                            yield canonical_product_url(loc)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"[ERROR] Не вдалось завантажити {url}: {e}")
+            return
+        except (ParseError, zlib.error) as e:
+            print(f"[ERROR] Некоректний sitemap {url}: {e}")
+            return
+    print(f"[DISCOVERY] Sitemap: {url}")
+
+    for child in nested:
+        async for loc in iter_sitemap(session, child, semaphore, timeout=timeout, hosts=hosts):
+            yield loc
+
+
+async def discover_product_urls(seeds, concurrency=4, max_pages=500, timeout=20,
+                                headers=DEFAULT_HEADERS, queue_size=200, hosts=PRODUCT_HOSTS):
+    """
+    Асинхронний генератор унікальних (за id) URL товарів з seeds —
+    сторінок категорій та/або sitemap (*.xml, *.xml.gz).
+    concurrency обмежує кількість одночасних запитів до сторінок списків;
+    queue_size — скільки знайдених URL може чекати на парсер, після чого
+    пошук призупиняється; hosts — дозволені хости товарів (None — будь-які).
+    """
+    found = asyncio.Queue(maxsize=queue_size)
+    seen_ids = set()
+    done = object()
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def produce(seed):
+            if is_sitemap(seed):
+                source = iter_sitemap(session, seed, semaphore, hosts=hosts)
+            else:
+                source = iter_category(session, seed, semaphore, max_pages=max_pages, timeout=timeout,
+                                       hosts=hosts)
+            async for url in source:
+                pid = product_id(url)
+                if pid in seen_ids:
+                    continue
+                seen_ids.add(pid)
+                await found.put(url)
+
+        async def produce_all():
+            results = await asyncio.gather(*(produce(seed) for seed in seeds), return_exceptions=True)
+            for seed, result in zip(seeds, results):
+                if isinstance(result, Exception):
+                    print(f"[ERROR] Помилка пошуку товарів у {seed}: {result}")
+            await found.put(done)
+
+        producer = asyncio.create_task(produce_all())
+        try:
+            while True:
+                url = await found.get()
+                if url is done:
+                    break
+                yield url
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+    print(f"[DISCOVERY] Знайдено товарів: {len(seen_ids)}")
+
+
+def iter_product_urls(seeds, **kwargs):
+    """
+    Синхронна обгортка над discover_product_urls: пошук працює у фоновому
+    потоці, а URL віддаються по мірі знаходження.
+    """
+    urls = queue.Queue(maxsize=kwargs.get("queue_size", 200))
+    done = object()
+
+    def runner():
+        async def pump():
+            async for url in discover_product_urls(seeds, **kwargs):
+                await asyncio.to_thread(urls.put, url)
+
+        try:
+            asyncio.run(pump())
+        finally:
+            urls.put(done)
+
+    threading.Thread(target=runner, daemon=True).start()
+    while True:
+        url = urls.get()
+        if url is done:
+            return
+        yield url
@@ -0,0 +1,300 @@
+"""
+fetch_policy.py
+Повтори, circuit breaker та dead-letter список для завантаження сторінок.
+
+FetchPolicy об'єднує все, що відбувається навколо одного запиту:
+- перед запитом: чекає, поки закритий circuit breaker хоста, і бере
+  місце в AdaptiveRateLimiter (before / abefore);
+- після запиту: класифікує результат (after):
+    OK    — 2xx / 304;
+    RETRY — таймаут, помилка з'єднання, 5xx, 408, 429 — повторюємо
+            з експоненційною паузою та jitter;
+    FAIL  — 404 та інші 4xx — повторювати немає сенсу;
+- коли спроби вичерпано або помилка постійна — URL записується в
+  dead-letter файл (give_up), звідки його можна обійти повторно.
+
+CircuitBreaker рахує частку помилок у ковзному вікні останніх запитів
+до хоста. Якщо вона перевищує threshold, хост "відкривається" на
+cooldown секунд: нові запити до нього чекають замість того, щоб
+витрачати час на сервер, який зараз не справляється. Після паузи
+пропускається один пробний запит: успіх закриває breaker, помилка —
+відкриває знову з подвоєною паузою. Запит загортається в
+FetchPolicy.attempt: якщо пробний запит завершився винятком, який не
+дійшов до after, пробу знімає finally, і її бере наступний запит.
+
+Очікування перед запитом, час запитів, статуси відповідей, повтори та
+відмови пишуться в metrics.METRICS.
+"""
+import asyncio
+import collections
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from metrics import METRICS
+from rate_limit import BROWSER_TARGET_LATENCY, THROTTLE_STATUSES, AdaptiveRateLimiter, backoff_delay
+
+OK = "ok"
+RETRY = "retry"
+FAIL = "fail"
+
+# Статуси, які варто повторити: сервер тимчасово не впорався
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def classify(status=None, error=None):
+    """OK / RETRY / FAIL для HTTP-статусу або винятку (error — будь-який виняток мережі чи браузера)."""
+    if error is not None:
+        return RETRY
+    if status is None or status < 400:
+        return OK
+    if status in RETRY_STATUSES or status >= 500:
+        return RETRY
+    return FAIL
+
+
+class CircuitBreaker:
+    """
+    Breaker на хост: window — скільки останніх результатів враховувати,
+    threshold — частка помилок, при якій breaker відкривається,
+    min_requests — мінімум результатів у вікні для рішення,
+    cooldown / max_cooldown — пауза після відкриття (подвоюється при повторних).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window=20, threshold=0.5, min_requests=10, cooldown=30.0, max_cooldown=300.0):
+        self.window = window
+        self.threshold = threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.trips = 0
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                "state": self.CLOSED,
+                "results": collections.deque(maxlen=self.window),
+                "open_until": 0.0,
+                "cooldown": self.cooldown,
+                "trial": None,
+            }
+        return state
+
+    def delay(self, url):
+        """Скільки секунд почекати перед запитом до хоста (0 — можна йти)."""
+        with self._lock:
+            state = self._host(url)
+            if state["state"] == self.CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if state["state"] == self.OPEN:
+                if now < state["open_until"]:
+                    return state["open_until"] - now
+                state["state"] = self.HALF_OPEN
+                state["trial"] = None
+            # Half-open: пропускаємо лише один пробний запит (trial — його URL)
+            if state["trial"] is not None:
+                return 0.5
+            state["trial"] = url
+            return 0.0
+
+    def release(self, url):
+        """Знімає пробний запит url, якщо він так і не дійшов до record (виняток)."""
+        with self._lock:
+            state = self._host(url)
+            if state["state"] == self.HALF_OPEN and state["trial"] == url:
+                state["trial"] = None
+
+    def record(self, url, ok):
+        with self._lock:
+            state = self._host(url)
+            host = urlsplit(url).netloc
+            if state["state"] == self.HALF_OPEN:
+                state["trial"] = None
+                if ok:
+                    state["state"] = self.CLOSED
+                    state["results"].clear()
+                    state["cooldown"] = self.cooldown
+                    print(f"[BREAKER] {host}: відновлено")
+                else:
+                    state["cooldown"] = min(self.max_cooldown, state["cooldown"] * 2)
+                    self._open(state, host)
+                return
+
+            state["results"].append(ok)
+            results = state["results"]
+            if state["state"] == self.CLOSED and len(results) >= self.min_requests:
+                failure_rate = results.count(False) / len(results)
+                if failure_rate >= self.threshold:
+                    self._open(state, host, failure_rate)
+
+    def _open(self, state, host, failure_rate=None):
+        state["state"] = self.OPEN
+        state["open_until"] = time.monotonic() + state["cooldown"]
+        self.trips += 1
+        reason = f"{failure_rate:.0%} помилок" if failure_rate is not None else "пробний запит невдалий"
+        print(f"[BREAKER] {host}: {reason} — пауза {state['cooldown']:.0f} с")
+
+
+class DeadLetters:
+    """
+    Dead-letter файл (JSON Lines): один рядок на URL, який не вдалось
+    завантажити. Запис — одним write в режимі append, тож файл можна
+    спільно використовувати з кількох процесів.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, url, error=None, status=None, attempts=1):
+        record = {
+            "url": url,
+            "status": status,
+            "error": str(error) if error is not None else None,
+            "attempts": attempts,
+            "failed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.count += 1
+
+    def take(self):
+        """
+        Повертає унікальні URL з файлу для повторного обходу. Файл
+        перейменовується на *.replayed, тож нові невдачі повторного обходу
+        записуються в чистий файл.
+        """
+        if not self.path.exists():
+            return []
+        urls = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    urls.append(json.loads(line)["url"])
+        os.replace(self.path, self.path.with_name(self.path.name + ".replayed"))
+        return list(dict.fromkeys(urls))
+
+
+class FetchPolicy:
+    """
+    Правила завантаження сторінки: limiter (AdaptiveRateLimiter або None),
+    retries — скільки разів повторювати RETRY-помилки, backoff_base / backoff_cap —
+    параметри паузи між повторами, breaker (CircuitBreaker або None),
+    dead_letters (DeadLetters або None).
+    """
+
+    def __init__(self, limiter=None, retries=3, backoff_base=1.0, backoff_cap=30.0, breaker=None,
+                 dead_letters=None):
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker
+        self.dead_letters = dead_letters
+        self.stats = {"retries": 0, "gave_up": 0}
+
+    def _delay(self, url):
+        return self.breaker.delay(url) if self.breaker is not None else 0.0
+
+    def before(self, url):
+        """Блокує потік, поки хост недоступний (breaker) або не дозволяє limiter."""
+        started = time.perf_counter()
+        while True:
+            delay = self._delay(url)
+            if not delay:
+                break
+            time.sleep(delay)
+        if self.limiter is not None:
+            self.limiter.acquire(url)
+        METRICS.observe("throttle", time.perf_counter() - started)
+
+    async def abefore(self, url):
+        """Асинхронний варіант before."""
+        started = time.perf_counter()
+        while True:
+            delay = self._delay(url)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+        if self.limiter is not None:
+            await self.limiter.wait(url)
+        METRICS.observe("throttle", time.perf_counter() - started)
+
+    @contextmanager
+    def attempt(self, url):
+        """
+        with policy.attempt(url): запит і after. Якщо запит завершився
+        винятком до after, пробний запит breaker знімається — інакше
+        half-open хост чекав би на результат, якого не буде.
+        """
+        try:
+            yield
+        finally:
+            if self.breaker is not None:
+                self.breaker.release(url)
+
+    def after(self, url, latency=None, status=None, error=None, retry_after=None):
+        """Фіксує результат запиту в limiter і breaker та повертає OK / RETRY / FAIL."""
+        outcome = classify(status, error)
+        if latency is not None:
+            METRICS.observe("fetch", latency)
+        # Selenium статусу не бачить: успіх без статусу — "unknown"
+        METRICS.inc("responses", status=status or ("error" if error is not None else "unknown"))
+        if self.limiter is not None:
+            self.limiter.record(url, latency if outcome == OK else None, status,
+                                error=outcome == RETRY and status not in THROTTLE_STATUSES,
+                                retry_after=retry_after)
+        if self.breaker is not None:
+            self.breaker.record(url, outcome != RETRY)
+        return outcome
+
+    def retry_delay(self, attempt, status=None):
+        """Пауза перед повтором attempt (0, 1, ...). Для 429 / 503 паузу вже задав limiter."""
+        self.stats["retries"] += 1
+        METRICS.inc("retries")
+        if self.limiter is not None and status in THROTTLE_STATUSES:
+            return 0.0
+        return backoff_delay(attempt, base=self.backoff_base, cap=self.backoff_cap)
+
+    def give_up(self, url, error=None, status=None, attempts=1):
+        """URL не вдалось завантажити: пишемо його в dead-letter файл."""
+        self.stats["gave_up"] += 1
+        METRICS.inc("gave_up")
+        if self.dead_letters is not None:
+            self.dead_letters.add(url, error, status, attempts)
+
+    def report(self):
+        if self.limiter is not None:
+            self.limiter.report()
+        trips = self.breaker.trips if self.breaker is not None else 0
+        print(f"[RETRY] повторів {self.stats['retries']}, не вдалось {self.stats['gave_up']}, "
+              f"спрацювань breaker {trips}")
+
+
+def browser_policy(rate=0.5, max_rate=2.0, retries=3, dead_letters=None):
+    """FetchPolicy для браузерних парсерів; dead_letters — шлях до dead-letter файлу або None."""
+    return FetchPolicy(
+        limiter=AdaptiveRateLimiter(rate=rate, max_rate=max_rate, target_latency=BROWSER_TARGET_LATENCY),
+        retries=retries,
+        breaker=CircuitBreaker(),
+        dead_letters=DeadLetters(dead_letters) if dead_letters else None,
+    )
@@ -0,0 +1,327 @@
+"""
+metrics.py
+Метрики обходу: час етапів обробки сторінки та лічильники подій.
+
+Етапи (phase) — тривалість у секундах на один URL або одну пачку:
+    throttle — очікування limiter / circuit breaker перед запитом;
+    fetch    — запит (для браузерів — до появи основного контенту);
+    render   — браузер: розгортання характеристик і очікування елементів;
+    extract  — розбір HTML / витягування даних зі сторінки;
+    db_write — запис пачки товарів у БД.
+Для кожного етапу зберігаються кількість, сума й максимум за весь час
+роботи та ковзне вікно останніх window значень, з якого рахуються
+перцентилі p50 / p90 / p99.
+
+Лічильники (inc) мають мітки, наприклад:
+    responses{status="200"}, retries, gave_up,
+    cache{result="not_modified"}, rows{result="created"}, pages{result="ok"}.
+
+METRICS — спільний об'єкт процесу. Показати метрики можна:
+- serve(port) — HTTP-ендпоінт /metrics у текстовому форматі Prometheus
+  (і /metrics.json — той самий summary у JSON);
+- start_reporter(interval, path) — раз на interval секунд дописувати
+  summary рядком JSON у файл path (JSON Lines) або друкувати його;
+- report() — підсумкова таблиця в кінці обходу.
+
+Приклад:
+    METRICS.start(port=9108, json_path="metrics.jsonl", interval=30)
+    with METRICS.time("extract"):
+        data = extract_product(html, url)
+    METRICS.inc("pages", result="ok")
+    METRICS.stop()
+"""
+import collections
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PHASES = ("throttle", "fetch", "render", "extract", "db_write")
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Префікс назв метрик у форматі Prometheus
+PREFIX = "scraper"
+
+
+def _percentile(ordered, q):
+    """Перцентиль q (0..1) відсортованого списку методом найближчого рангу."""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """
+    Потокобезпечне сховище метрик. window — скільки останніх значень
+    кожного етапу тримати для перцентилів.
+    """
+
+    def __init__(self, window=10000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._server = None
+        self._reporter = None
+        self._stop = threading.Event()
+        self._json_path = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+            self._count = collections.Counter()
+            self._sum = collections.Counter()
+            self._max = {}
+            self._counters = collections.Counter()
+
+    # ------------------ Запис ------------------
+    def observe(self, phase, seconds):
+        """Додає тривалість етапу phase."""
+        with self._lock:
+            self._samples[phase].append(seconds)
+            self._count[phase] += 1
+            self._sum[phase] += seconds
+            if seconds > self._max.get(phase, 0.0):
+                self._max[phase] = seconds
+
+    @contextmanager
+    def time(self, phase):
+        """with METRICS.time("extract"): ... — вимірює блок (і тоді, коли він завершився винятком)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def timed(self, phase, func):
+        """Обгортка func, що вимірює кожен виклик, — напр. для run_in_executor."""
+        def wrapper(*args, **kwargs):
+            with self.time(phase):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def inc(self, name, value=1, **labels):
+        """Збільшує лічильник name з мітками labels на value."""
+        if not value:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def record_write(self, counts, seconds):
+        """
+        Запис пачки ProductBulkWriter: час і лічильники created / updated /
+        unchanged / prices. Порожня пачка (flush без товарів) не рахується.
+        """
+        if not any(counts.get(result) for result in ("created", "updated", "unchanged")):
+            return
+        self.observe("db_write", seconds)
+        for result in ("created", "updated", "unchanged"):
+            self.inc("rows", counts.get(result, 0), result=result)
+        self.inc("price_changes", counts.get("prices", 0))
+
+    # ------------------ Між процесами ------------------
+    def drain(self):
+        """
+        Забирає накопичені значення й лічильники і очищає сховище — для
+        передачі з процесу-воркера в батьківський (див. merge).
+        """
+        with self._lock:
+            data = {
+                "phases": {phase: list(samples) for phase, samples in self._samples.items()},
+                "counters": dict(self._counters),
+            }
+            self._samples.clear()
+            self._count.clear()
+            self._sum.clear()
+            self._max.clear()
+            self._counters.clear()
+        return data
+
+    def merge(self, data):
+        """Додає результат drain() іншого процесу."""
+        if not data:
+            return
+        for phase, samples in data["phases"].items():
+            for seconds in samples:
+                self.observe(phase, seconds)
+        with self._lock:
+            self._counters.update(data["counters"])
+
+    # ------------------ Читання ------------------
+    def summary(self):
+        """
+        Словник для JSON: uptime, pages_per_sec (успішні сторінки за секунду),
+        phases — {етап: count, sum, mean, p50, p90, p99, max},
+        counters — {назва: значення або {мітки: значення}}.
+        """
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            samples = {phase: sorted(values) for phase, values in self._samples.items()}
+            counts = dict(self._count)
+            sums = dict(self._sum)
+            maxima = dict(self._max)
+            counters = dict(self._counters)
+
+        phases = {}
+        for phase in sorted(samples, key=lambda p: (PHASES.index(p) if p in PHASES else len(PHASES), p)):
+            ordered = samples[phase]
+            count = counts.get(phase, 0)
+            stats = {"count": count, "sum": round(sums.get(phase, 0.0), 6),
+                     "mean": round(sums.get(phase, 0.0) / count, 6) if count else 0.0}
+            for q in QUANTILES:
+                stats[f"p{round(q * 100):d}"] = round(_percentile(ordered, q), 6)
+            stats["max"] = round(maxima.get(phase, 0.0), 6)
+            phases[phase] = stats
+
+        grouped = {}
+        for (name, labels), value in sorted(counters.items()):
+            if labels:
+                grouped.setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels)] = value
+            else:
+                grouped[name] = value
+
+        pages = sum(value for (name, labels), value in counters.items()
+                    if name == "pages" and ("result", "ok") in labels)
+        return {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "uptime": round(uptime, 3),
+            "pages_per_sec": round(pages / uptime, 3) if uptime else 0.0,
+            "phases": phases,
+            "counters": grouped,
+        }
+
+    def prometheus(self):
+        """Метрики в текстовому форматі Prometheus (exposition format 0.0.4)."""
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            samples = {phase: sorted(values) for phase, values in self._samples.items()}
+            counts = dict(self._count)
+            sums = dict(self._sum)
+            counters = dict(self._counters)
+
+        name = f"{PREFIX}_phase_seconds"
+        lines = [f"# HELP {name} Тривалість етапів обробки сторінки (перцентилі — за останні значення).",
+                 f"# TYPE {name} summary"]
+        for phase, ordered in sorted(samples.items()):
+            for q in QUANTILES:
+                lines.append(f"{name}{_labels([('phase', phase), ('quantile', q)])} {_percentile(ordered, q):.6f}")
+            lines.append(f"{name}_sum{_labels([('phase', phase)])} {sums.get(phase, 0.0):.6f}")
+            lines.append(f"{name}_count{_labels([('phase', phase)])} {counts.get(phase, 0)}")
+
+        by_name = collections.defaultdict(list)
+        for (counter, labels), value in counters.items():
+            by_name[counter].append((labels, value))
+        for counter in sorted(by_name):
+            metric = f"{PREFIX}_{counter}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(by_name[counter]):
+                lines.append(f"{metric}{_labels(labels)} {value}")
+
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {uptime:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Друкує підсумок: етапи з перцентилями та лічильники."""
+        summary = self.summary()
+        if not summary["phases"] and not summary["counters"]:
+            return
+        for phase, s in summary["phases"].items():
+            print(f"[METRICS] {phase:<9} n={s['count']:<6} сер. {s['mean']:.3f} с | p50 {s['p50']:.3f} | "
+                  f"p90 {s['p90']:.3f} | p99 {s['p99']:.3f} | макс {s['max']:.3f} | всього {s['sum']:.1f} с")
+        for name, value in summary["counters"].items():
+            if isinstance(value, dict):
+                value = ", ".join(f"{labels}: {n}" for labels, n in value.items())
+            print(f"[METRICS] {name}: {value}")
+        print(f"[METRICS] {summary['pages_per_sec']:.2f} стор/с за {summary['uptime']:.1f} с")
+
+    # ------------------ Експорт ------------------
+    def serve(self, port, host="127.0.0.1"):
+        """HTTP-ендпоінт у фоновому потоці: /metrics (Prometheus) та /metrics.json."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = metrics.prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(metrics.summary(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[METRICS] Ендпоінт: http://{host}:{self._server.server_port}/metrics")
+        return self._server
+
+    def _write_summary(self):
+        line = json.dumps(self.summary(), ensure_ascii=False)
+        if self._json_path is None:
+            print(f"[METRICS] {line}")
+            return
+        with open(self._json_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def start_reporter(self, interval=60.0, path=None):
+        """Раз на interval секунд дописує summary у path (JSON Lines) або друкує його (path=None)."""
+        self._json_path = Path(path) if path else None
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self._write_summary()
+
+        self._reporter = threading.Thread(target=loop, name="metrics-reporter", daemon=True)
+        self._reporter.start()
+
+    def start(self, port=None, json_path=None, interval=60.0):
+        """Запускає ендпоінт (port) і / або періодичний JSON-звіт (json_path) — що передано."""
+        if port is not None:
+            self.serve(port)
+        if json_path:
+            self.start_reporter(interval, json_path)
+
+    def stop(self):
+        """Зупиняє звіт (дописавши останній summary) і ендпоінт, друкує підсумок."""
+        if self._reporter is not None:
+            self._stop.set()
+            self._reporter.join()
+            self._reporter = None
+            self._write_summary()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.report()
+
+
+METRICS = Metrics()
@@ -0,0 +1,164 @@
+"""
+page_cache.py
+Постійний кеш сторінок для повторних обходів.
+
+Для кожного URL зберігаються ETag, Last-Modified, стиснутий (zlib) HTML та
+sha256 від нього. При наступному обході запит надсилається з
+If-None-Match / If-Modified-Since; відповідь 304 або той самий хеш тіла
+означає, що сторінка не змінилась, і її не потрібно ні парсити, ні
+записувати в БД.
+
+Нова або змінена сторінка потрапляє в кеш не одразу: store() лише
+відкладає її, а записує finished(url, True) — callback on_finished
+пайплайна, який викликається після коміту товару в БД. Якщо товар так і
+не записано (аварія, помилка запису), кеш не вважатиме сторінку
+обробленою, і наступний обхід розбере її знову.
+
+Кеш — один SQLite-файл; застарілі записи видаляються за TTL, а при
+перевищенні розміру — найдавніше використані. Попадання й промахи рахуються і в metrics.METRICS
+(лічильник cache).
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from metrics import METRICS
+
+
+class PageCache:
+    """Кеш сторінок у SQLite-файлі path з TTL (секунди) та лімітом розміру max_bytes."""
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_bytes=2 * 1024 ** 3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "not_modified": 0, "same_body": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        # url -> (etag, last_modified, стиснуте тіло, хеш): чекають на finished(url, True)
+        self._staged = {}
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB NOT NULL,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def conditional_headers(self, url):
+        """Заголовки If-None-Match / If-Modified-Since для URL (порожній dict, якщо запису немає)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return {}
+        etag, last_modified, fetched_at = row
+        if self.ttl and time.time() - fetched_at > self.ttl:
+            return {}
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def not_modified(self, url):
+        """Сервер відповів 304: оновлює час запису і рахує попадання."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+            self.stats["hits"] += 1
+            self.stats["not_modified"] += 1
+        METRICS.inc("cache", result="not_modified")
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """
+        Обробляє відповідь 200. Повертає True, якщо тіло нове або змінилось —
+        тоді воно відкладається до finished(url, True); False — якщо воно
+        побайтово таке саме, як у кеші (такий запис одразу оновлюється).
+        """
+        raw = body.encode("utf-8")
+        body_hash = hashlib.sha256(raw).hexdigest()
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT body_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            changed = row is None or row[0] != body_hash
+            if changed:
+                self._staged[url] = (etag, last_modified, zlib.compress(raw, 6), body_hash)
+                self.stats["misses"] += 1
+            else:
+                self._db.execute(
+                    "UPDATE pages SET etag = ?, last_modified = ?, fetched_at = ?, accessed_at = ? WHERE url = ?",
+                    (etag, last_modified, now, now, url),
+                )
+                self._db.commit()
+                self.stats["hits"] += 1
+                self.stats["same_body"] += 1
+        METRICS.inc("cache", result="miss" if changed else "same_body")
+        return changed
+
+    def finished(self, url, ok, error=None):
+        """
+        callback(url, ok, error=None) для on_finished пайплайна: сторінка,
+        відкладена store(), записується в кеш, коли її товар записано в БД
+        (ok=True), і відкидається, якщо його не вдалось обробити.
+        """
+        with self._lock:
+            staged = self._staged.pop(url, None)
+            if staged is None or not ok:
+                return
+            etag, last_modified, packed, body_hash = staged
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, body, body_hash, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, packed, body_hash, len(packed), now, now),
+            )
+            self._db.commit()
+            self.stats["stored"] += 1
+
+    def evict(self):
+        """Видаляє записи, старші за TTL, і найдавніше використані понад max_bytes."""
+        removed = 0
+        with self._lock:
+            if self.ttl:
+                cur = self._db.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,))
+                removed += cur.rowcount
+            if self.max_bytes:
+                total = 0
+                stale = []
+                for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at DESC"):
+                    total += size
+                    if total > self.max_bytes:
+                        stale.append((url,))
+                if stale:
+                    self._db.executemany("DELETE FROM pages WHERE url = ?", stale)
+                    removed += len(stale)
+            self._db.commit()
+            self.stats["evicted"] += removed
+        return removed
+
+    def report(self):
+        requests_total = self.stats["hits"] + self.stats["misses"]
+        ratio = self.stats["hits"] / requests_total * 100 if requests_total else 0.0
+        print(f"[CACHE] попадань {self.stats['hits']} (304: {self.stats['not_modified']}, "
+              f"те саме тіло: {self.stats['same_body']}), промахів {self.stats['misses']}, "
+              f"видалено {self.stats['evicted']}, hit ratio {ratio:.1f}%")
@@ -0,0 +1,176 @@
+"""
+rate_limit.py
+Адаптивне обмеження частоти запитів до хоста замість фіксованих пауз.
+
+AdaptiveRateLimiter — token bucket окремо для кожного хоста. Частота
+підлаштовується під відповіді сайту:
+- успішна відповідь з затримкою в межах target_latency → частота
+  поступово зростає (+increase запитів/с або +1%, до max_rate);
+- повільні відповіді → частота трохи знижується;
+- 429 / 503 → частота зменшується (×decrease, до min_rate), а хост
+  призупиняється на Retry-After або на експоненційну паузу з jitter;
+- помилки мережі / таймаути / 5xx → частота зменшується (×decrease).
+
+Працює і в синхронному коді (acquire), і в asyncio (wait). Один об'єкт
+можна використовувати з кількох потоків; між процесами стан не спільний.
+"""
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Відповіді, що означають "запитів забагато — пригальмуй"
+THROTTLE_STATUSES = {429, 503}
+
+# Для браузерів "затримка" — час до появи контенту сторінки, а не лише
+# відповіді сервера, тому допустима межа вища
+BROWSER_TARGET_LATENCY = 5.0
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Експоненційна пауза з повним jitter: випадкове значення з [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_seconds(value):
+    """Значення заголовка Retry-After (секунди або HTTP-дата) у секундах або None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttles = 0
+        self.latency = None
+        self.decreased_at = 0.0
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket на хост. rate — початкова частота (запитів/с, 0 — без
+    обмеження, лише паузи на 429/503), min_rate / max_rate — межі
+    адаптації, burst — скільки запитів можна зробити без очікування,
+    target_latency — затримка відповіді (с), до якої частоту можна збільшувати.
+    """
+
+    def __init__(self, rate=1.0, min_rate=0.2, max_rate=8.0, burst=1, target_latency=2.0,
+                 increase=0.1, decrease=0.5):
+        self.initial_rate = rate
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0.0
+        self.max_rate = max(max_rate, rate)
+        self.burst = burst
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "waited": 0.0}
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial_rate, self.burst)
+        return state
+
+    def _reserve(self, url):
+        """Резервує місце для запиту і повертає, скільки секунд треба почекати."""
+        with self._lock:
+            state = self._host(url)
+            now = time.monotonic()
+            delay = 0.0
+            if state.rate > 0:
+                state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+                state.tokens -= 1
+                if state.tokens < 0:
+                    delay = -state.tokens / state.rate
+            state.updated = now
+            delay = max(delay, state.paused_until - now)
+            self.stats["requests"] += 1
+            self.stats["waited"] += delay
+            return delay
+
+    def acquire(self, url):
+        """Блокує потік до моменту, коли можна робити запит до хоста url."""
+        delay = self._reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait(self, url):
+        """Асинхронний варіант acquire."""
+        delay = self._reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, url, latency=None, status=None, error=False, retry_after=None):
+        """
+        Повідомляє результат запиту. Повертає паузу хоста в секундах
+        (0, якщо сайт не просив пригальмувати).
+        """
+        with self._lock:
+            state = self._host(url)
+            now = time.monotonic()
+            if status in THROTTLE_STATUSES:
+                self.stats["throttled"] += 1
+                if self._decrease(state, now):
+                    state.throttles += 1
+                pause = retry_after_seconds(retry_after)
+                if pause is None:
+                    pause = backoff_delay(state.throttles)
+                state.paused_until = max(state.paused_until, now + pause)
+                print(f"[RATE] {urlsplit(url).netloc}: відповідь {status}, пауза {pause:.1f} с, "
+                      f"частота {state.rate:.2f} запитів/с")
+                return pause
+
+            if error:
+                self.stats["errors"] += 1
+                self._decrease(state, now)
+                return 0.0
+
+            state.throttles = 0
+            if latency is not None:
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            if state.rate > 0:
+                if state.latency is not None and state.latency > 2 * self.target_latency:
+                    state.rate = max(self.min_rate, state.rate * 0.9)
+                elif state.latency is None or state.latency <= self.target_latency:
+                    state.rate = min(self.max_rate, state.rate + max(self.increase, state.rate * 0.01))
+            return 0.0
+
+    def _decrease(self, state, now):
+        # Запити, що були "в дорозі" одночасно, часто отримують 429 разом —
+        # частота зменшується (і пауза зростає) не частіше ніж раз на секунду
+        if now - state.decreased_at < 1.0:
+            return False
+        if state.rate > 0:
+            state.rate = max(self.min_rate, state.rate * self.decrease)
+        state.decreased_at = now
+        return True
+
+    def current_rate(self, url):
+        with self._lock:
+            return self._host(url).rate
+
+    def report(self):
+        hosts = ", ".join(
+            f"{host} {state.rate:.2f} запитів/с"
+            + (f" (затримка {state.latency:.2f} с)" if state.latency is not None else "")
+            for host, state in self._hosts.items()
+        )
+        print(f"[RATE] запитів {self.stats['requests']}, 429/503: {self.stats['throttled']}, "
+              f"помилок {self.stats['errors']}, очікування {self.stats['waited']:.1f} с; {hosts}")
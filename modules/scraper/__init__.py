@@ -0,0 +1,18 @@
+"""
+scraper — спільне ядро парсерів brain.com.ua.
+
+- normalize: розбір цін, очищення текстів, URL фото, normalize_product;
+- fields: XPath / CSS-селектори полів сторінки товару;
+- backends: FetchBackend (http, selenium, playwright) і реєстр backend;
+- pipeline: ProductPipeline / AsyncProductPipeline (нормалізація + пакетний запис), save_to_db, crawl,
+  finished_callback;
+- hybrid: HTTP для всіх сторінок, браузер лише для неповних (run_hybrid).
+
+Імпортувати після load_django: pipeline працює з моделями Django.
+"""
+from .backends import (BACKENDS, NOT_MODIFIED, FetchBackend, HttpBackend, PlaywrightBackend, SeleniumBackend,
+                       backends_by_cost, get_backend, register_backend)
+from .normalize import (absolute_photo_url, clean_text, normalize_product, parse_price, parse_reviews,
+                        strip_or_none, unique_preserve_order)
+from .pipeline import AsyncProductPipeline, ProductPipeline, crawl, finished_callback, save_to_db
+from .hybrid import MIN_SPECS, REQUIRED_FIELDS, HybridStats, missing_fields, run_hybrid
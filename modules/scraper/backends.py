@@ -0,0 +1,206 @@
+"""
+backends.py
+Fetch backend — спосіб отримати словник товару за URL.
+
+Усі backend мають однаковий інтерфейс: open() / close() (або with) і
+fetch(url) → словник товару, NOT_MODIFIED або None. cost — відносна
+вартість сторінки (час і ресурси), щоб обирати найдешевший backend,
+який справляється: спершу звичайний HTTP, браузер — лише коли потрібно.
+
+Реалізації беруть завантаження та розбір зі скриптів парсерів
+(3_parser_requests_bs4.py, 4_parser_selenium.py, 5_parser_playwright.py);
+скрипт імпортується лише при open(), тож для HTTP не потрібні ні
+Selenium, ні Playwright.
+"""
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+from browser_profiles import LEAN
+
+# Повертається замість словника, якщо сторінка не змінилась з минулого обходу
+NOT_MODIFIED = object()
+
+BACKENDS = {}
+
+
+def register_backend(cls):
+    """Декоратор: реєструє клас backend під його name."""
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+def get_backend(name, **kwargs):
+    """Створює backend за назвою (http, selenium, playwright)."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Невідомий backend '{name}', доступні: {', '.join(BACKENDS)}") from None
+    return cls(**kwargs)
+
+
+def backends_by_cost():
+    """Назви зареєстрованих backend від найдешевшого до найдорожчого."""
+    return sorted(BACKENDS, key=lambda name: BACKENDS[name].cost)
+
+
+def _script(name):
+    """
+    Модуль скрипта парсера. Якщо скрипт запущено напряму, повертається
+    __main__, щоб не виконувати його вдруге під іншим іменем.
+    """
+    main = sys.modules.get("__main__")
+    if Path(getattr(main, "__file__", "") or "").stem == name:
+        return main
+    return importlib.import_module(name)
+
+
+class FetchBackend:
+    """
+    Базовий клас. policy — FetchPolicy (частота, повтори, breaker, dead-letter)
+    або None — за замовчуванням скрипта.
+    """
+
+    name = None
+    cost = 1
+
+    def __init__(self, policy=None):
+        self.policy = policy
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def fetch(self, url):
+        raise NotImplementedError
+
+
+@register_backend
+class HttpBackend(FetchBackend):
+    """requests + bs4. fast — розбір через lxml; cache — PageCache для умовних запитів."""
+
+    name = "http"
+    cost = 1
+
+    def __init__(self, policy=None, fast=False, cache=None, timeout=12):
+        super().__init__(policy)
+        self.fast = fast
+        self.cache = cache
+        self.timeout = timeout
+        self._parser = None
+
+    def open(self):
+        self._parser = _script("3_parser_requests_bs4")
+
+    def fetch(self, url):
+        return self._parser.parse_single_product(url, timeout=self.timeout, fast=self.fast,
+                                                 cache=self.cache, policy=self.policy)
+
+
+@register_backend
+class SeleniumBackend(FetchBackend):
+    """Selenium + Chrome; драйвер перезапускається, якщо браузер перестав відповідати."""
+
+    name = "selenium"
+    cost = 20
+
+    def __init__(self, policy=None, profile=LEAN, timeout=12):
+        super().__init__(policy)
+        self.profile = profile
+        self.timeout = timeout
+        self._parser = None
+        self._driver = None
+
+    def open(self):
+        self._parser = _script("4_parser_selenium")
+        if self.policy is None:
+            self.policy = self._parser.browser_policy()
+
+    def close(self):
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+
+    def fetch(self, url):
+        if self._driver is None:
+            self._driver = self._parser.create_driver(self.profile)
+        self.policy.before(url)
+        data = self._parser.parse_single_product(url, self._driver, timeout=self.timeout, policy=self.policy)
+        if data is None and not self._parser._driver_alive(self._driver):
+            print("[WARN] Браузер не відповідає — перезапуск драйвера")
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+            self._driver = None
+        return data
+
+
+@register_backend
+class PlaywrightBackend(FetchBackend):
+    """
+    Playwright + Chromium з синхронним інтерфейсом: браузер працює у
+    власному циклі подій, fetch чекає на результат. Для паралельного
+    обходу в asyncio використовуйте PagePool зі скрипта напряму.
+    """
+
+    name = "playwright"
+    cost = 10
+
+    def __init__(self, policy=None, profile=LEAN, fast=True, timeout=12000):
+        super().__init__(policy)
+        self.profile = profile
+        self.fast = fast
+        self.timeout = timeout
+        self._parser = None
+        self._loop = None
+        self._playwright = self._browser = self._context = self._page = None
+
+    def open(self):
+        self._parser = _script("5_parser_playwright")
+        if self.policy is None:
+            self.policy = self._parser.browser_policy()
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._open())
+
+    async def _open(self):
+        self._playwright = await self._parser.async_playwright().start()
+        self._browser, self._context = await self._parser.launch_context(self._playwright, self.profile)
+
+    def close(self):
+        if self._loop is None:
+            return
+        try:
+            self._loop.run_until_complete(self._close())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _close(self):
+        await self._context.close()
+        await self._browser.close()
+        await self._playwright.stop()
+
+    async def _fetch(self, url):
+        if self._page is None or self._page.is_closed():
+            self._page = await self._context.new_page()
+        await self.policy.abefore(url)
+        data = await self._parser.parse_single_product(url, self._page, timeout=self.timeout, fast=self.fast,
+                                                       policy=self.policy)
+        if data is None:
+            # Сторінка могла залишитись у зламаному стані
+            await self._page.close()
+        return data
+
+    def fetch(self, url):
+        return self._loop.run_until_complete(self._fetch(url))
@@ -0,0 +1,52 @@
+"""
+fields.py
+Де на сторінці товару brain.com.ua шукати кожне поле.
+
+XPath використовують браузерні парсери (Selenium, Playwright), CSS-селектори —
+парсер requests + bs4. Якщо верстка сайту зміниться, виправляти потрібно
+лише тут.
+"""
+
+# ------------------ XPath (Selenium, Playwright) ------------------
+TITLE_XPATH = "//div[@id='br-pr-1']/h1"
+VENDOR_XPATH = "//div[@class='delivery-target']//strong"
+PRICE_XPATH = "//div[@class='br-pr-np']//div/span[1]"
+DISCOUNT_PRICE_XPATH = "//div[@class='br-pr-np-hz']//div/span[1]"
+PHOTOS_XPATH = "//img[@class='zoomImg']"
+CODE_XPATH = "//div[@id='product_code']//span[contains(@class,'br-pr-code-val')]"
+REVIEWS_XPATH = "//a[@href='#reviews-list']/span"
+CHR_BLOCKS_XPATH = "//div[contains(@class, 'br-pr-chr-item')]"
+CHR_ROWS_XPATH = ".//div/div"
+
+# Атрибути img, з яких береться адреса фото (у порядку пріоритету)
+PHOTO_ATTRIBUTES = ("data-big-picture-src", "data-src", "src")
+
+# Основні характеристики: поле товару → XPath значення
+FIELD_MAP = {
+    "color": "//div[@class='br-pr-chr-item']//div[./span[normalize-space(text())='Колір']]/span[2]",
+    "memory": "//span[contains(text(), 'Вбудована пам')]/following-sibling::span[1]",
+    "article": "//span[normalize-space(text())='Артикул']/following-sibling::span[1]",
+    "diagonal": "//span[normalize-space(text())='Діагональ екрану']/following-sibling::span[1]",
+    "resolution": "//span[normalize-space(text())='Роздільна здатність екрану']/following-sibling::span[1]",
+}
+
+# ------------------ CSS (requests + bs4) ------------------
+TITLE_CSS = ("h1", ".product-title")
+VENDOR_CSS = ".br-pr-del-type .delivery-target strong"
+PRICE_CSS = ".br-pr-price.main-price-block .br-pr-np > div > span"
+DISCOUNT_PRICE_CSS = ".br-pr-price.main-price-block .br-pr-np-hz > div > span"
+PHOTOS_CSS = "img.dots-image"
+# Парсер requests + bs4 завжди брав фото з data-big-picture-src або src, без data-src
+HTTP_PHOTO_ATTRIBUTES = ("data-big-picture-src", "src")
+CODE_CSS = "#product_code .br-pr-code-val"
+REVIEWS_CSS = "a.scroll-to-element span"
+CHR_ITEM_CSS = ".br-pr-chr-item"
+
+# Основні характеристики: поле товару → назви характеристики (укр. та рос. версія сайту)
+CHARACTERISTIC_LABELS = {
+    "color": ("Колір", "Цвет"),
+    "memory": ("Вбудована пам'ять", "Встроенная память"),
+    "article": ("Артикул",),
+    "diagonal": ("Діагональ екрану", "Диагональ экрана"),
+    "resolution": ("Роздільна здатність екрану", "Разрешение дисплея"),
+}
@@ -0,0 +1,256 @@
+"""
+hybrid.py
+Гібридний обхід: HTTP для всіх сторінок, браузер — лише для неповних.
+
+Кожен URL спершу обробляється дешевим парсером requests + bs4
+(crawl_async). Якщо результат неповний — немає обов'язкових полів або
+характеристик менше min_specs (частина з них з'являється лише після
+JS і кнопки "всі характеристики") — URL передається в пул браузера
+(Playwright PagePool або процеси Selenium), який працює паралельно з
+HTTP-обходом. Черга між ними обмежена: якщо браузер не встигає,
+HTTP-обхід чекає.
+
+Якщо браузер не впорався з URL, зберігаються неповні дані HTTP — краще,
+ніж нічого; URL при цьому вважається невдалим (frontier повторить його).
+Сторінка з кешу (PageCache) для такого URL фіксується лише після запису
+товару браузера, тож невдалий URL наступний обхід завантажить знову.
+
+Наприкінці друкується, яка частка товарів потребувала браузера і чому.
+"""
+import asyncio
+import collections
+import threading
+
+from asgiref.sync import sync_to_async
+
+from browser_profiles import LEAN
+
+from .backends import _script
+from .normalize import normalize_product
+from .pipeline import AsyncProductPipeline, _write_batch
+
+# Поля, без яких товар вважається неповним
+REQUIRED_FIELDS = ("title", "code")
+
+# Мінімальна кількість характеристик у повністю розібраному товарі
+MIN_SPECS = 10
+
+# Скрипт, що надає пул браузера для fallback
+FALLBACK_SCRIPTS = {
+    "playwright": "5_parser_playwright",
+    "selenium": "4_parser_selenium",
+}
+
+
+def missing_fields(product, required=REQUIRED_FIELDS, min_specs=MIN_SPECS):
+    """
+    Чого не вистачає товару: порожні поля з required і "specifications",
+    якщо характеристик менше min_specs. Порожній список — товар повний.
+    """
+    missing = [field for field in required if product.get(field) in (None, "", [], {})]
+    if len(product.get("specifications") or {}) < min_specs:
+        missing.append("specifications")
+    return missing
+
+
+class HybridStats:
+    """Лічильники гібридного обходу: скільки товарів розібрано через HTTP, скільки — браузером."""
+
+    def __init__(self):
+        self.http = 0
+        self.escalated = 0
+        self.browser_ok = 0
+        self.browser_failed = 0
+        # Скільки товарів, з якими браузер не впорався, збережено з неповними даними HTTP
+        self.partial = 0
+        self.reasons = collections.Counter()
+
+    @property
+    def browser_share(self):
+        total = self.http + self.escalated
+        return self.escalated / total if total else 0.0
+
+    def report(self):
+        reasons = ", ".join(f"{name} {count}" for name, count in self.reasons.most_common())
+        print(f"[HYBRID] товарів {self.http + self.escalated}: HTTP {self.http}, браузер {self.escalated} "
+              f"({self.browser_share:.1%}; успішно {self.browser_ok}, помилок {self.browser_failed}, "
+              f"збережено неповних {self.partial})"
+              + (f"; неповні поля: {reasons}" if reasons else ""))
+
+
+class EscalationQueue:
+    """
+    Обмежена черга URL для браузера. Читається з asyncio (async for, PagePool)
+    або з іншого потоку (for, run_pool Selenium). close() — URL більше не буде;
+    abandon() — завершити читачів негайно (після помилки обходу).
+    """
+
+    _DONE = object()
+
+    def __init__(self, maxsize=100):
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._loop = asyncio.get_running_loop()
+        self._abandoned = threading.Event()
+
+    async def put(self, url):
+        await self._queue.put(url)
+
+    async def close(self):
+        await self._queue.put(self._DONE)
+
+    def abandon(self):
+        """Викликається з циклу подій: відкидає URL у черзі і зупиняє читачів."""
+        self._abandoned.set()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(self._DONE)
+
+    async def __aiter__(self):
+        while True:
+            url = await self._queue.get()
+            if url is self._DONE:
+                return
+            yield url
+
+    def __iter__(self):
+        while not self._abandoned.is_set():
+            url = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+            if url is self._DONE:
+                return
+            yield url
+
+
+async def _playwright_pool(module, urls, workers, profile, policy, on_product, on_finished):
+    async with module.async_playwright() as p:
+        browser, context = await module.launch_context(p, profile)
+        try:
+            pool = module.PagePool(context, size=workers, fast=True, profile=profile, policy=policy,
+                                   on_finished=on_finished)
+            await pool.run(urls, on_product)
+        finally:
+            await context.close()
+            await browser.close()
+
+
+async def run_hybrid(urls, fallback="playwright", browser_workers=2, required=REQUIRED_FIELDS,
+                     min_specs=MIN_SPECS, concurrency=16, batch_size=500, fast=False, cache=None,
+                     frontier=None, policy=None, browser_rate=None, browser_max_rate=None, retries=3,
+                     dead_letters=None, profile=LEAN):
+    """
+    Гібридний обхід urls (звичайний або асинхронний ітератор, наприклад Frontier).
+    - fallback: "playwright" або "selenium" — чим дообробляти неповні товари;
+    - browser_workers: сторінок Playwright / процесів Selenium;
+    - required / min_specs: критерій повноти (див. missing_fields);
+    - concurrency, fast, cache, policy: як у crawl_async для HTTP-частини;
+    - browser_rate / browser_max_rate, retries, dead_letters: FetchPolicy браузера
+      (за замовчуванням 0.5 і 2 переходи/с на сторінку чи процес).
+    Повертає HybridStats.
+    """
+    http = _script("3_parser_requests_bs4")
+    # Браузерний модуль імпортується одразу: якщо його немає, обхід не починається
+    browser = _script(FALLBACK_SCRIPTS[fallback])
+    stats = HybridStats()
+    escalation = EscalationQueue(maxsize=browser_workers * 4)
+    # URL, передані браузеру -> дані HTTP; результат цих URL рахується в статистиці браузера
+    escalated = {}
+    # finished викликається з циклу подій, потоку запису БД і потоку run_pool
+    lock = threading.Lock()
+    loop = asyncio.get_running_loop()
+    loop_thread = threading.current_thread()
+    partial_saves = []
+
+    def take_partial(url, ok):
+        """Результат браузера для url; повертає дані HTTP, якщо їх треба зберегти замість товару браузера."""
+        with lock:
+            data = escalated.pop(url, None)
+            if data is None:
+                return None
+            if ok:
+                stats.browser_ok += 1
+                return None
+            stats.browser_failed += 1
+            stats.partial += 1
+        print(f"[HYBRID] {url}: браузер не впорався — зберігаємо неповні дані HTTP")
+        return data
+
+    def acknowledge(url, ok, error):
+        if frontier is not None:
+            frontier.finished(url, ok, error)
+        if cache is not None:
+            cache.finished(url, ok, error)
+
+    def finished(url, ok, error=None):
+        # Цикл подій (crawl_async, PagePool) або потік run_pool Selenium
+        partial = take_partial(url, ok)
+        if partial is not None:
+            if threading.current_thread() is loop_thread:
+                partial_saves.append(loop.create_task(pipeline.process(partial)))
+            else:
+                asyncio.run_coroutine_threadsafe(pipeline.process(partial), loop).result()
+        acknowledge(url, ok, error)
+
+    def written(url, ok, error=None):
+        # Потік запису pipeline: черга може бути заповнена, тож дані HTTP
+        # замість незаписаного товару браузера пишуться тут же
+        partial = take_partial(url, ok)
+        if partial is not None:
+            _write_batch(pipeline.writer, [(normalize_product(partial), None)], None)
+        acknowledge(url, ok, error)
+
+    # Успіх URL (і HTTP, і браузерного) підтверджується після запису товару в БД
+    pipeline = AsyncProductPipeline(batch_size=batch_size, on_finished=written)
+
+    async def on_http_product(data, url):
+        missing = missing_fields(data, required, min_specs)
+        if not missing:
+            stats.http += 1
+            print(f"[OK] {url}")
+            await pipeline.process(data, url)
+            return True
+        stats.escalated += 1
+        stats.reasons.update(missing)
+        print(f"[HYBRID] {url}: неповні {', '.join(missing)} — передаємо браузеру")
+        with lock:
+            escalated[url] = data
+        await escalation.put(url)
+        return False
+
+    async def on_browser_product(data, url):
+        print(f"[OK] браузер: {url}")
+        await pipeline.process(data, url)
+
+    async def http_phase():
+        await http.crawl_async(urls, on_product=on_http_product, concurrency=concurrency, policy=policy,
+                               fast=fast, cache=cache, on_finished=finished, on_unchanged=pipeline.unchanged)
+        await escalation.close()
+
+    async def browser_phase():
+        rate = 0.5 * browser_workers if browser_rate is None else browser_rate
+        max_rate = 2.0 * browser_workers if browser_max_rate is None else browser_max_rate
+        if fallback == "selenium":
+            await asyncio.to_thread(browser.run_pool, escalation, browser_workers, profile=profile,
+                                    rate=rate, max_rate=max_rate, retries=retries,
+                                    dead_letters=dead_letters, on_finished=finished)
+        else:
+            browser_policy = browser.browser_policy(rate=rate, max_rate=max_rate, retries=retries,
+                                                    dead_letters=dead_letters)
+            await _playwright_pool(browser, escalation, browser_workers, profile, browser_policy,
+                                   on_browser_product, finished)
+
+    http_task = asyncio.create_task(http_phase())
+    browser_task = asyncio.create_task(browser_phase())
+    try:
+        await asyncio.gather(http_task, browser_task)
+    except BaseException:
+        http_task.cancel()
+        escalation.abandon()
+        await asyncio.gather(http_task, browser_task, return_exceptions=True)
+        raise
+    finally:
+        await asyncio.gather(*partial_saves, return_exceptions=True)
+        await pipeline.close()
+        if frontier is not None:
+            await frontier.aflush()
+            await sync_to_async(frontier.report)()
+        stats.report()
+    return stats
@@ -0,0 +1,112 @@
+"""
+normalize.py
+Нормалізація значень товару, спільна для всіх парсерів.
+
+Кожен парсер (requests + bs4, Selenium, Playwright) лише дістає "сирі"
+значення зі сторінки, а приведення до одного вигляду — тут:
+ціни в Decimal, абсолютні URL фото без дублікатів, тексти без зайвих
+пробілів. Так результат не залежить від того, яким способом завантажено
+сторінку.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urljoin
+
+# Текстові поля товару, з яких прибираються зайві пробіли
+TEXT_FIELDS = ("title", "full_name", "color", "memory", "article", "diagonal", "resolution", "vendor", "code")
+
+
+def parse_price(text):
+    """
+    Витягує числове значення з рядка та перетворює його у Decimal.
+    Повертає None, якщо перетворення неможливе.
+    """
+    if not text:
+        return None
+    m = re.search(r'[\d\s,\.]+', text)
+    if not m:
+        return None
+    raw = m.group().strip()
+    raw = raw.replace(' ', '').replace(',', '.')
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        try:
+            return Decimal(str(float(raw)))
+        except Exception:
+            return None
+
+
+def unique_preserve_order(seq):
+    """
+    Повертає список без дублікатів, зберігаючи порядок.
+    """
+    seen = set()
+    out = []
+    for x in seq:
+        if x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+
+def clean_text(text):
+    """Замінює будь-які послідовності пробілів і переносів одним пробілом; порожній рядок → None."""
+    if not text:
+        return None
+    return " ".join(text.split()) or None
+
+
+def strip_or_none(text):
+    return text.strip() if text else None
+
+
+def absolute_photo_url(src, url):
+    """Перетворює src фото на абсолютний URL відносно сторінки url."""
+    src = src.strip()
+    if src.startswith('//'):
+        src = 'https:' + src
+    elif not src.startswith('http'):
+        src = urljoin(url, src)
+    return src
+
+
+def parse_reviews(text):
+    """Кількість відгуків з тексту лічильника або None."""
+    try:
+        return int(text.strip()) if text else None
+    except ValueError:
+        return None
+
+
+def normalize_product(product):
+    """
+    Приводить словник товару до спільного вигляду (змінює і повертає його):
+    - текстові поля без зайвих пробілів, порожні → None;
+    - price / discount_price — Decimal; якщо акційної ціни немає, вона дорівнює price;
+    - photos — абсолютні URL без дублікатів;
+    - specifications — без порожніх ключів і значень.
+    Повторний виклик нічого не змінює.
+    """
+    url = product.get("link") or ""
+    for field in TEXT_FIELDS:
+        if isinstance(product.get(field), str):
+            product[field] = clean_text(product[field])
+
+    for field in ("price", "discount_price"):
+        value = product.get(field)
+        if isinstance(value, str):
+            product[field] = parse_price(value)
+    product["discount_price"] = product.get("discount_price") or product.get("price")
+
+    photos = [absolute_photo_url(src, url) for src in product.get("photos") or () if src and src.strip()]
+    product["photos"] = unique_preserve_order(photos)
+
+    specifications = {}
+    for key, value in (product.get("specifications") or {}).items():
+        key = strip_or_none(key)
+        value = strip_or_none(value)
+        if key and value:
+            specifications[key] = value
+    product["specifications"] = specifications
+    return product
@@ -0,0 +1,388 @@
+"""
+pipeline.py
+Спільний шлях товару від розібраного словника до БД.
+
+ProductPipeline нормалізує кожен товар (normalize_product) і записує його
+пачками через ProductBulkWriter. AsyncProductPipeline — те саме для
+asyncio: запис іде в окремому потоці й не блокує цикл подій. Обидва
+підтверджують URL товару (on_finished, наприклад Frontier.finished) лише
+після коміту пачки, а не в момент постановки в чергу.
+save_to_db — запис одного товару для випадків, коли пачки не потрібні.
+Сторінки, що не змінились (unchanged), підтверджуються так само — разом
+з пачкою, після оновлення розкладу повторного обходу (recrawl.mark_unchanged).
+Час запису пачок, лічильники рядків і сторінок пишуться в metrics.METRICS.
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.utils import timezone
+
+from metrics import METRICS
+from parser_app.bulk import ProductBulkWriter, prepare_product_values
+from parser_app.models import Product
+from parser_app.prices import record_prices
+from parser_app.recrawl import mark_seen, mark_unchanged
+from parser_app.specs import sync_specifications
+
+from .backends import NOT_MODIFIED
+from .normalize import normalize_product
+
+
+def save_to_db(product_data):
+    """
+    Зберігає дані продукту в БД через Django ORM.
+    Логіка:
+    - Якщо продукт з таким кодом існує і дані не змінились → нічого не робимо.
+    - Якщо продукт з таким кодом існує, але дані змінились → оновлюємо.
+    - Якщо продукту з таким кодом немає → створюємо новий.
+    Для створених і оновлених товарів зміна ціни пишеться в історію (PriceObservation),
+    а характеристики — в нормалізовані таблиці (parser_app.specs). Кожен обхід
+    товару з кодом оновлює розклад повторного обходу (parser_app.recrawl).
+    """
+
+    save_kwargs = prepare_product_values(normalize_product(product_data))
+    save_kwargs.setdefault('last_changed_at', timezone.now())
+
+    try:
+        code = save_kwargs.get('code')
+        if code:
+            obj = Product.objects.filter(code=code).first()
+            if obj:
+                # Порівнюємо лише відбиток вмісту замість усіх полів
+                if obj.fingerprint == save_kwargs['fingerprint']:
+                    mark_seen([code])
+                    print(f"[DB] Продукт (code={code}) вже існує — не створюємо дубліката")
+                    return obj
+                else:
+                    for k, v in save_kwargs.items():
+                        setattr(obj, k, v)
+                    obj.save()
+                    changed = record_prices([(obj.pk, obj.price, obj.discount_price)])
+                    sync_specifications([(obj.pk, obj.specifications)])
+                    mark_seen([code], changed)
+                    print(f"[DB] Оновлено Product (code={code}) id={obj.pk}")
+                    return obj
+            else:
+                obj = Product.objects.create(**save_kwargs)
+                record_prices([(obj.pk, obj.price, obj.discount_price)])
+                sync_specifications([(obj.pk, obj.specifications)])
+                mark_seen([code])
+                print(f"[DB] Створено Product (code={code}) id={obj.pk}")
+                return obj
+        else:
+            obj = Product.objects.create(**save_kwargs)
+            print(f"[DB] Створено Product id={obj.pk}")
+            return obj
+
+    except Exception as e:
+        print(f"[ERROR] Помилка збереження в БД: {e}")
+        return None
+
+
+def finished_callback(*callbacks):
+    """
+    Об'єднує кілька callback(url, ok, error=None) в один (None пропускаються),
+    наприклад Frontier.finished і PageCache.finished. Повертає None, якщо
+    жодного callback не передано.
+    """
+    callbacks = [callback for callback in callbacks if callback is not None]
+    if not callbacks:
+        return None
+
+    def finished(url, ok, error=None):
+        for callback in callbacks:
+            callback(url, ok, error)
+    return finished
+
+
+class ProductPipeline:
+    """
+    Нормалізація та пакетний запис товарів. save=False — лише нормалізація
+    (наприклад, для порівняння профілів браузера без запису в БД).
+
+    on_finished — callback(url, ok, error=None) (наприклад, Frontier.finished):
+    URL, переданий у process(data, url), вважається обробленим лише після
+    того, як пачку з його товаром записано в БД. Так після аварії не буде
+    URL, позначених завершеними, чиї товари так і не потрапили в БД.
+    Пачка, яку не вдалось записати, записується по одному товару; URL
+    товарів, що не записались і так, передаються з ok=False.
+
+    Приклад:
+        with ProductPipeline(batch_size=500, on_finished=frontier.finished) as pipeline:
+            for url, data in products:
+                pipeline.process(data, url)
+    """
+
+    def __init__(self, batch_size=500, save=True, on_finished=None):
+        self.save = save
+        self.batch_size = batch_size
+        self.on_finished = on_finished
+        self.writer = ProductBulkWriter(batch_size=batch_size) if save else None
+        self.failed = 0
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def totals(self):
+        return self.writer.totals if self.writer is not None else {}
+
+    def finished(self, url, ok, error=None):
+        """Передає результат URL без товару (наприклад, після помилки) в on_finished."""
+        if self.on_finished is not None:
+            self.on_finished(url, ok, error)
+
+    def process(self, product_data, url=None):
+        """
+        Нормалізує товар і ставить його в чергу на запис. Повертає
+        нормалізований словник. url — підтвердити в on_finished після запису.
+        """
+        product = normalize_product(product_data)
+        if self.writer is None:
+            if url is not None:
+                self.finished(url, True)
+            return product
+        self._append((product, url))
+        return product
+
+    def unchanged(self, url):
+        """
+        Сторінка url не змінилась (304 або той самий вміст): товар з цим
+        посиланням позначається побаченим разом з наступною пачкою,
+        після чого url підтверджується в on_finished.
+        """
+        if self.writer is None or not self.writer.schedule:
+            self.finished(url, True)
+            return
+        self._append((None, url))
+
+    def _append(self, item):
+        self._pending.append(item)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Записує накопичені товари, не чекаючи заповнення пачки."""
+        batch, self._pending = self._pending, []
+        if batch:
+            self.failed += _write_pending(self.writer, batch, self.on_finished)
+
+    def close(self):
+        """Записує залишок пачки та друкує підсумок."""
+        if self.writer is not None:
+            self.flush()
+            failed = f", не записано {self.failed}" if self.failed else ""
+            print(f"[DB] Разом: {self.writer.totals}{failed}")
+
+
+def _write_pending(writer, pending, on_finished):
+    """
+    Записує чергу пайплайна [(товар, url), ...]: товари — через _write_batch,
+    незмінені сторінки (товар None) — оновленням розкладу за посиланням.
+    Повертає кількість незаписаних товарів.
+    """
+    batch = [item for item in pending if item[0] is not None]
+    links = [url for product, url in pending if product is None]
+    failed = _write_batch(writer, batch, on_finished) if batch else 0
+    if links:
+        try:
+            mark_unchanged(links)
+        except Exception as e:
+            # Сторінку оброблено; без оновлення розкладу товар лише раніше обійдуть знову
+            print(f"[ERROR] Не вдалось оновити розклад обходу для {len(links)} незмінених сторінок: {e}")
+        if on_finished is not None:
+            for url in links:
+                on_finished(url, True)
+    return failed
+
+
+def _write_batch(writer, batch, on_finished):
+    """
+    Записує пачку [(товар, url), ...] і лише після коміту підтверджує
+    url в on_finished. Якщо пачка не записалась (вона пишеться в одній
+    транзакції, тож не записалось нічого), товари записуються по одному:
+    той, що знову не записався, передається в on_finished(url, False, помилка).
+    Повертає кількість незаписаних товарів.
+    """
+    started = time.perf_counter()
+    try:
+        counts = writer.write([product for product, _ in batch])
+    except Exception as e:
+        if len(batch) == 1:
+            product, url = batch[0]
+            print(f"[ERROR] Помилка запису товару в БД (code={product.get('code')}): {e}")
+            if on_finished is not None and url is not None:
+                on_finished(url, False, e)
+            return 1
+        print(f"[ERROR] Помилка запису пачки в БД ({len(batch)} товарів): {e} — записуємо по одному")
+        return sum(_write_batch(writer, [item], on_finished) for item in batch)
+    METRICS.record_write(counts, time.perf_counter() - started)
+    if on_finished is not None:
+        for _, url in batch:
+            if url is not None:
+                on_finished(url, True)
+    return 0
+
+
+class AsyncProductPipeline:
+    """
+    Асинхронна стадія запису для парсерів на asyncio.
+
+    process() нормалізує товар і кладе його в обмежену asyncio.Queue
+    (max_pending, за замовчуванням 2 × batch_size). Окрема задача збирає
+    пачки — batch_size товарів або все, що накопичилось за flush_interval
+    секунд, — і записує їх ProductBulkWriter в окремому потоці БД, поки
+    парсери продовжують роботу. Якщо запис відстає і черга заповнена,
+    process() чекає: так швидкість парсерів підлаштовується під БД.
+    Пачки пишуться по одній (один потік), тож upsert-и не конкурують
+    за ті самі рядки.
+    on_finished — як у ProductPipeline: url з process(data, url)
+    підтверджується з потоку запису після коміту його пачки, а якщо товар
+    не вдалось записати навіть окремо — передається з ok=False.
+
+    Приклад:
+        async with AsyncProductPipeline(batch_size=500, on_finished=frontier.finished) as pipeline:
+            await pool.run(urls, pipeline.process)
+    """
+
+    _DONE = object()
+
+    def __init__(self, batch_size=500, max_pending=None, flush_interval=5.0, on_finished=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_finished = on_finished
+        self.writer = ProductBulkWriter(batch_size=batch_size)
+        self.stats = {"queued": 0, "failed": 0, "waited": 0.0}
+        self._queue = asyncio.Queue(maxsize=max_pending or 2 * batch_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._consumer = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def totals(self):
+        return self.writer.totals
+
+    def start(self):
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def process(self, product_data, url=None):
+        """
+        Нормалізує товар і ставить його в чергу на запис (чекає, якщо черга
+        заповнена). url — підтвердити в on_finished після запису.
+        """
+        product = normalize_product(product_data)
+        await self._put((product, url))
+        self.stats["queued"] += 1
+        return product
+
+    async def unchanged(self, url):
+        """Як ProductPipeline.unchanged: розклад оновлюється в потоці запису разом з пачкою."""
+        if not self.writer.schedule:
+            if self.on_finished is not None:
+                self.on_finished(url, True)
+            return
+        await self._put((None, url))
+
+    async def _put(self, item):
+        self.start()
+        if self._queue.full():
+            started = time.monotonic()
+            await self._queue.put(item)
+            self.stats["waited"] += time.monotonic() - started
+        else:
+            self._queue.put_nowait(item)
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            batch = []
+            item = await self._queue.get()
+            deadline = loop.time() + self.flush_interval
+            while item is not self._DONE:
+                batch.append(item)
+                timeout = deadline - loop.time()
+                if len(batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                done = True
+            if batch:
+                await loop.run_in_executor(self._executor, self._write, batch)
+
+    def _write(self, batch):
+        # Виконується в потоці db-writer; виняток тут зупинив би _consume,
+        # і process() чекав би на заповнену чергу вічно
+        try:
+            self.stats["failed"] += _write_pending(self.writer, batch, self.on_finished)
+        except Exception as e:
+            print(f"[ERROR] Помилка після запису пачки в БД: {e}")
+
+    async def close(self):
+        """Дописує все з черги, закриває з'єднання потоку БД і друкує підсумок."""
+        if self._consumer is not None:
+            await self._queue.put(self._DONE)
+            await self._consumer
+            self._consumer = None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, connections.close_all)
+        self._executor.shutdown()
+        failed = f", не записано {self.stats['failed']}" if self.stats["failed"] else ""
+        print(f"[DB] Разом: {self.writer.totals}{failed}; "
+              f"парсери чекали на запис {self.stats['waited']:.1f} с")
+
+
+def crawl(urls, backend, pipeline, verbose=True):
+    """
+    Послідовно обходить urls через backend (FetchBackend) і передає товари
+    в pipeline. Результат кожного URL іде в pipeline.on_finished (наприклад,
+    Frontier.finished): успіх — після запису пачки з товаром, помилки та
+    незмінені сторінки — одразу. Повертає лічильники pages / unchanged / failed.
+    """
+    stats = {"pages": 0, "unchanged": 0, "failed": 0}
+
+    for url in urls:
+        print(f"\nПарсинг: {url}")
+        try:
+            data = backend.fetch(url)
+            if data is NOT_MODIFIED:
+                print("[CACHE] Сторінка не змінилась — пропускаємо")
+                stats["unchanged"] += 1
+                METRICS.inc("pages", result="unchanged")
+                pipeline.unchanged(url)
+                continue
+            if not data:
+                print("[WARN] Дані не отримані")
+                stats["failed"] += 1
+                METRICS.inc("pages", result="failed")
+                pipeline.finished(url, False, "no data")
+                continue
+
+            product = pipeline.process(data, url)
+            if verbose:
+                print(json.dumps(product, ensure_ascii=False, indent=2, default=str))
+            stats["pages"] += 1
+            METRICS.inc("pages", result="ok")
+        except Exception as e:
+            print(f"[ERROR] Помилка при обробці {url}: {e}")
+            stats["failed"] += 1
+            METRICS.inc("pages", result="failed")
+            pipeline.finished(url, False, e)
+    return stats
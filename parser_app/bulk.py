@@ -0,0 +1,326 @@
+"""
+bulk.py
+Пакетний запис товарів у БД замість save_to_db на кожен товар.
+
+ProductBulkWriter накопичує словники товарів і записує їх пачками.
+На PostgreSQL пачка записується одним запитом
+INSERT ... ON CONFLICT (code) DO UPDATE ... WHERE fingerprint IS DISTINCT FROM,
+тож незмінені товари не перезаписуються (copy=True — пачка спершу
+завантажується COPY у тимчасову таблицю, для великих імпортів).
+На інших БД використовується
+запасний шлях: один SELECT відбитків по code, bulk_create та bulk_update.
+
+Для створених і змінених товарів з кодом ціни додатково пишуться в
+історію (prices.record_prices), а характеристики — в нормалізовані
+таблиці (specs.sync_specifications) в тій самій транзакції. Для всіх
+товарів пачки з кодом оновлюється розклад повторного обходу (recrawl.mark_seen).
+"""
+import io
+import json
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .fingerprint import product_fingerprint
+from .models import Product
+from .numeric import numeric_values
+from .prices import record_prices
+from .recrawl import mark_seen
+from .specs import sync_specifications
+
+
+def _model_fields():
+    return {f.name: f for f in Product._meta.concrete_fields if not f.primary_key}
+
+
+# Розклад повторного обходу веде recrawl.mark_seen, а не дані товару:
+# при оновленні через ON CONFLICT ці колонки не чіпаються
+SCHEDULE_FIELDS = ("last_seen_at", "recrawl_interval", "next_crawl_at")
+
+
+def _insert_value(field, values):
+    """
+    Значення колонки для INSERT у сирому SQL. Значення за замовчуванням
+    (наприклад, recrawl_interval) Django ставить лише в Python — у БД
+    колонка NOT NULL без DEFAULT, тож для відсутніх значень його
+    підставляємо тут, як це робить Product(**values).
+    """
+    value = values.get(field.name)
+    if value is None and not field.null and field.has_default():
+        value = field.get_default()
+    return value
+
+
+def _copy_cell(field, value):
+    """Значення для COPY ... (FORMAT csv): NULL — порожньо без лапок, решта — в лапках."""
+    if value is None:
+        return ""
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def prepare_product_values(product_data):
+    """
+    Відбирає з словника товару лише поля моделі Product і приводить значення
+    до типів полів (наприклад, Decimal-ціну до рядка для CharField), щоб
+    порівняння зі збереженими значеннями було коректним.
+    Значення None пропускаються — вони не перезаписують наявні дані.
+    Числові колонки (price_value, memory_gb, ...), яких немає в даних,
+    розбираються з текстових полів. До результату додається fingerprint
+    вмісту товару (числові колонки похідні й у нього не входять).
+    """
+    values = {}
+    fields = _model_fields()
+    for name, field in fields.items():
+        value = product_data.get(name)
+        if value is not None:
+            values[name] = field.to_python(value)
+    for name, value in numeric_values(values).items():
+        if name not in values:
+            values[name] = fields[name].to_python(value)
+    values["fingerprint"] = product_fingerprint(values)
+    return values
+
+
+class ProductBulkWriter:
+    """
+    Збирає товари та записує їх у БД пачками по batch_size.
+
+    Приклад:
+        with ProductBulkWriter(batch_size=500) as writer:
+            for data in products:
+                writer.add(data)
+        print(writer.totals)
+    """
+
+    def __init__(self, batch_size=500, verbose=True, track_prices=True, index_specs=True, copy=False,
+                 schedule=True):
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.copy = copy
+        self.schedule = schedule
+        self.track_prices = track_prices
+        self.index_specs = index_specs
+        self._pending = []
+        self.totals = {"created": 0, "updated": 0, "unchanged": 0, "prices": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def add(self, product_data):
+        """
+        Додає товар у чергу. Повертає лічильники пачки, якщо вона була
+        записана в результаті цього виклику, інакше None.
+        """
+        self._pending.append(prepare_product_values(product_data))
+        if len(self._pending) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Записує накопичені товари та повертає лічильники created/updated/unchanged."""
+        batch, self._pending = self._pending, []
+        return self._write(batch)
+
+    def write(self, products):
+        """Записує список словників товарів одразу, окремо від черги add()."""
+        return self._write([prepare_product_values(product_data) for product_data in products])
+
+    def write_values(self, batch):
+        """Записує словники, вже підготовлені prepare_product_values (наприклад, перевірені при імпорті)."""
+        return self._write(list(batch))
+
+    def _write(self, batch):
+        if not batch:
+            return {"created": 0, "updated": 0, "unchanged": 0, "prices": 0}
+
+        # last_changed_at потрапляє в БД лише для створених і змінених рядків
+        now = timezone.now()
+        # В межах пачки залишаємо останню версію товару для кожного коду:
+        # ON CONFLICT не може оновити один рядок двічі за запит
+        by_code = {}
+        without_code = []
+        for values in batch:
+            values.setdefault("last_changed_at", now)
+            code = values.get("code")
+            if code:
+                by_code[code] = values
+            else:
+                without_code.append(values)
+        rows = without_code + list(by_code.values())
+
+        with transaction.atomic():
+            if connection.vendor == "postgresql" and self.copy:
+                counts, changed_ids = self._copy_upsert_postgresql(rows)
+            elif connection.vendor == "postgresql":
+                counts, changed_ids = self._upsert_postgresql(rows)
+            else:
+                counts, changed_ids = self._upsert_generic(without_code, by_code)
+            # Ціна й характеристики входять у fingerprint, тож змінитись вони могли
+            # лише у створених і оновлених товарах. Товари без коду між обходами
+            # не зіставляються — для них ні історії цін, ні нормалізованих характеристик.
+            price_changed = []
+            if self.track_prices and changed_ids:
+                price_changed = record_prices(
+                    ((product_id, by_code[code].get("price"), by_code[code].get("discount_price"))
+                     for code, product_id in changed_ids.items()),
+                    observed_at=now,
+                )
+            counts["prices"] = len(price_changed)
+            if self.index_specs and changed_ids:
+                # Без specifications у нових даних наявні характеристики не чіпаємо
+                sync_specifications(
+                    (product_id, by_code[code]["specifications"])
+                    for code, product_id in changed_ids.items()
+                    if by_code[code].get("specifications") is not None
+                )
+            if self.schedule and by_code:
+                # Усі товари пачки побачені — і змінені, і ні
+                mark_seen(by_code, price_changed, now)
+
+        for k, v in counts.items():
+            self.totals[k] += v
+
+        if self.verbose:
+            print(f"[DB] Пакет {len(batch)}: створено {counts['created']}, "
+                  f"оновлено {counts['updated']}, без змін {counts['unchanged']}, "
+                  f"змін цін {counts['prices']}")
+        return counts
+
+    def _conflict_sql(self, fields):
+        """
+        ON CONFLICT (code) ... RETURNING для вставки в таблицю Product. Рядок
+        оновлюється лише якщо змінився fingerprint; None у нових даних не
+        затирає наявне значення, а розклад обходу (SCHEDULE_FIELDS) не змінюється.
+        (xmax = 0) відрізняє вставлені рядки від оновлених.
+        """
+        table = connection.ops.quote_name(Product._meta.db_table)
+        code_column = connection.ops.quote_name(Product._meta.get_field("code").column)
+        fingerprint_column = connection.ops.quote_name(Product._meta.get_field("fingerprint").column)
+        pk_column = connection.ops.quote_name(Product._meta.pk.column)
+
+        assignments = []
+        for f in fields:
+            if f.name in ("code", "fingerprint") or f.name in SCHEDULE_FIELDS:
+                continue
+            column = connection.ops.quote_name(f.column)
+            assignments.append(f"{column} = COALESCE(EXCLUDED.{column}, {table}.{column})")
+        assignments.append(f"{fingerprint_column} = EXCLUDED.{fingerprint_column}")
+        return (
+            f"ON CONFLICT ({code_column}) DO UPDATE SET {', '.join(assignments)} "
+            f"WHERE {table}.{fingerprint_column} IS DISTINCT FROM EXCLUDED.{fingerprint_column} "
+            f"RETURNING {pk_column}, {code_column}, (xmax = 0)"
+        )
+
+    @staticmethod
+    def _count_returned(returned, total, counts, changed_ids):
+        created = sum(1 for _, _, inserted in returned if inserted)
+        changed_ids.update((code, pk) for pk, code, _ in returned if code)
+        counts["created"] += created
+        counts["updated"] += len(returned) - created
+        counts["unchanged"] += total - len(returned)
+
+    def _upsert_postgresql(self, rows):
+        """
+        Один INSERT ... VALUES ... ON CONFLICT на пачку (див. _conflict_sql).
+        Повертає лічильники і {code: id} вставлених та оновлених товарів.
+        """
+        fields = list(_model_fields().values())
+        table = connection.ops.quote_name(Product._meta.db_table)
+        columns = [connection.ops.quote_name(f.column) for f in fields]
+        conflict_sql = self._conflict_sql(fields)
+
+        row_sql = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        counts = {"created": 0, "updated": 0, "unchanged": 0}
+        changed_ids = {}
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            params = []
+            for values in chunk:
+                for f in fields:
+                    value = _insert_value(f, values)
+                    params.append(None if value is None else f.get_db_prep_save(value, connection))
+            sql = (
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES {', '.join([row_sql] * len(chunk))} "
+                f"{conflict_sql}"
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                self._count_returned(cursor.fetchall(), len(chunk), counts, changed_ids)
+        return counts, changed_ids
+
+    def _copy_upsert_postgresql(self, rows):
+        """
+        Варіант для великих імпортів: пачка завантажується COPY у тимчасову
+        таблицю сесії, а звідти в Product — одним INSERT ... SELECT з тими
+        самими правилами ON CONFLICT. Без тисяч параметрів у запиті.
+        """
+        fields = list(_model_fields().values())
+        table = connection.ops.quote_name(Product._meta.db_table)
+        columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+        staging = connection.ops.quote_name("parser_app_product_staging")
+
+        buffer = io.StringIO()
+        for values in rows:
+            buffer.write(",".join(_copy_cell(f, _insert_value(f, values)) for f in fields))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        counts = {"created": 0, "updated": 0, "unchanged": 0}
+        changed_ids = {}
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS SELECT {columns} FROM {table} WITH NO DATA")
+            cursor.execute(f"TRUNCATE {staging}")
+            cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                           f"{self._conflict_sql(fields)}")
+            self._count_returned(cursor.fetchall(), len(rows), counts, changed_ids)
+        return counts, changed_ids
+
+    def _upsert_generic(self, without_code, by_code):
+        """
+        Запасний шлях для БД без ON CONFLICT ... RETURNING (наприклад, SQLite).
+        Повертає те саме, що й _upsert_postgresql.
+        """
+        counts = {"created": 0, "updated": 0, "unchanged": 0}
+        known = dict(
+            Product.objects.filter(code__in=list(by_code)).values_list("code", "fingerprint")
+        )
+
+        to_create = [Product(**values) for values in without_code]
+        changed = {}
+        for code, values in by_code.items():
+            if code not in known:
+                to_create.append(Product(**values))
+            elif known[code] != values["fingerprint"]:
+                changed[code] = values
+            else:
+                counts["unchanged"] += 1
+
+        to_update = []
+        update_fields = set()
+        for obj in Product.objects.filter(code__in=list(changed)):
+            values = changed[obj.code]
+            for k, v in values.items():
+                setattr(obj, k, v)
+            update_fields.update(values)
+            to_update.append(obj)
+
+        if to_create:
+            Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            Product.objects.bulk_update(to_update, sorted(update_fields), batch_size=self.batch_size)
+
+        counts["created"] = len(to_create)
+        counts["updated"] = len(to_update)
+        changed_ids = {obj.code: obj.pk for obj in to_update}
+        created_codes = [obj.code for obj in to_create if obj.code]
+        if created_codes:
+            # bulk_create повертає pk не на всіх БД — беремо їх одним запитом
+            changed_ids.update(Product.objects.filter(code__in=created_codes).values_list("code", "pk"))
+        return counts, changed_ids
@@ -0,0 +1,93 @@
+"""
+csv_import.py
+Потокове читання CSV-дампу товарів (db/parser_app_product.csv або
+вивантаження export_products --format csv) для імпорту в Product.
+
+Файл читається пачками: у пам'яті лише chunk_size рядків. JSON-колонки
+(photos, specifications) декодуються для всієї пачки разом і
+перевіряються на тип; записи з помилками пропускаються й повертаються
+окремо з номером запису CSV (запис може займати кілька рядків файлу).
+"""
+import csv
+import json
+import sys
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+
+from .bulk import prepare_product_values
+from .export import DUMP_COLUMNS, EXPORT_FIELDS
+
+# Очікуваний тип JSON-колонок
+JSON_COLUMNS = {"photos": list, "specifications": dict}
+
+# specifications одного товару може перевищувати стандартний ліміт поля csv (128 КБ)
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def _decode_json(chunk, columns, errors):
+    """Декодує JSON-колонки пачки; записи з помилками переносить в errors і повертає решту."""
+    json_indexes = [(i, name) for i, name in enumerate(columns) if name in JSON_COLUMNS]
+    decoded = []
+    for line, row in chunk:
+        try:
+            row = list(row)
+            for i, name in json_indexes:
+                if row[i] in ("", None):
+                    row[i] = None
+                    continue
+                value = json.loads(row[i])
+                if not isinstance(value, JSON_COLUMNS[name]):
+                    raise ValueError(f"{name}: очікується {JSON_COLUMNS[name].__name__}, а не {type(value).__name__}")
+                row[i] = value
+        except ValueError as e:
+            errors.append((line, str(e)))
+            continue
+        decoded.append((line, row))
+    return decoded
+
+
+def read_products(stream, chunk_size=5000):
+    """
+    Генератор пачок (values, errors) з CSV:
+    - values — словники після prepare_product_values для ProductBulkWriter.write_values;
+    - errors — [(номер запису, причина), ...] для пропущених записів.
+    Перший рядок вважається заголовком, якщо всі його клітинки — назви полів
+    Product; інакше колонки — як у дампі (DUMP_COLUMNS).
+    """
+    reader = csv.reader(stream)
+    first = next(reader, None)
+    if first is None:
+        return
+    if all(name in EXPORT_FIELDS for name in first):
+        columns, pending = tuple(first), []
+    else:
+        columns, pending = DUMP_COLUMNS, [(1, first)]
+
+    def numbered():
+        yield from pending
+        for n, row in enumerate(reader, start=2):
+            yield n, row
+
+    numbered_rows = numbered()
+    while True:
+        chunk = list(islice(numbered_rows, chunk_size))
+        if not chunk:
+            return
+        errors = []
+        sized = []
+        for line, row in chunk:
+            if len(row) != len(columns):
+                errors.append((line, f"{len(row)} колонок замість {len(columns)}"))
+            else:
+                sized.append((line, row))
+
+        values = []
+        for line, row in _decode_json(sized, columns, errors):
+            data = {name: (None if value == "" else value) for name, value in zip(columns, row)}
+            try:
+                values.append(prepare_product_values(data))
+            except ValidationError as e:
+                errors.append((line, "; ".join(e.messages)))
+        errors.sort()
+        yield values, errors
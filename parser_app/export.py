@@ -0,0 +1,182 @@
+"""
+export.py
+Потокове вивантаження таблиці Product у CSV, JSONL або Parquet.
+
+Рядки читаються через .iterator(chunk_size=...) — на PostgreSQL це
+серверний курсор, тож у пам'яті одночасно лише одна пачка, незалежно від
+розміру каталогу. CSV і JSONL можна стиснути gzip / bz2 / xz, Parquet
+стискається власними кодеками (потрібен pyarrow).
+
+Інкрементальне вивантаження: since / until обмежують last_changed_at, тож
+щоденний дамп змін містить лише товари, вміст яких змінився.
+
+Приклад:
+    with open("products.jsonl", "w", encoding="utf-8") as f:
+        stats = export_products(JsonlExportWriter(f, EXPORT_FIELDS), since=yesterday)
+"""
+import csv
+import datetime
+import json
+from decimal import Decimal
+from itertools import islice
+
+from django.db import models
+
+from .models import Product
+
+# Поля, що вивантажуються за замовчуванням (у порядку моделі)
+EXPORT_FIELDS = tuple(f.name for f in Product._meta.concrete_fields)
+
+# Колонки дампу db/parser_app_product.csv (без рядка заголовка): CSV без
+# заголовка пишеться й читається (csv_import) саме в цьому порядку
+DUMP_COLUMNS = (
+    "id", "title", "color", "memory", "vendor", "price", "discount_price", "photos", "code",
+    "reviews_count", "article", "diagonal", "resolution", "link", "specifications",
+)
+
+FORMATS = ("csv", "jsonl", "parquet")
+TEXT_COMPRESSIONS = ("none", "gzip", "bz2", "xz")
+PARQUET_COMPRESSIONS = ("none", "snappy", "gzip", "zstd", "brotli")
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не серіалізується в JSON")
+
+
+class CsvExportWriter:
+    """
+    CSV у форматі дампу db/parser_app_product.csv: JSON-поля (photos,
+    specifications) — JSON-рядком, None — порожньою клітинкою.
+    header=False — без рядка заголовка; формат дампу виходить лише з
+    fields=DUMP_COLUMNS (export_products --no-header так і робить).
+    """
+
+    def __init__(self, stream, fields, header=True):
+        self.fields = fields
+        self._json = {name for name in fields if isinstance(Product._meta.get_field(name), models.JSONField)}
+        self._writer = csv.writer(stream)
+        if header:
+            self._writer.writerow(fields)
+
+    def _cell(self, name, value):
+        if value is None:
+            return ""
+        if name in self._json:
+            return json.dumps(value, ensure_ascii=False)
+        if isinstance(value, datetime.datetime):
+            return value.isoformat()
+        return value
+
+    def write(self, rows):
+        self._writer.writerows([self._cell(name, value) for name, value in zip(self.fields, row)] for row in rows)
+
+    def close(self):
+        pass
+
+
+class JsonlExportWriter:
+    """Один JSON-об'єкт на рядок; ціни — рядками, щоб не втратити точність Decimal."""
+
+    def __init__(self, stream, fields):
+        self.fields = fields
+        self._stream = stream
+
+    def write(self, rows):
+        self._stream.write("".join(
+            json.dumps(dict(zip(self.fields, row)), ensure_ascii=False, default=_json_default) + "\n"
+            for row in rows
+        ))
+
+    def close(self):
+        pass
+
+
+class ParquetExportWriter:
+    """
+    Parquet через pyarrow: кожна пачка — окрема row group, тож файл
+    пишеться потоково. JSON-поля зберігаються JSON-рядками.
+    """
+
+    def __init__(self, path, fields, compression="snappy"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Для Parquet потрібен pyarrow: pip install pyarrow") from None
+        self._pa = pa
+        self.fields = fields
+        self._json = set()
+        schema = []
+        for name in fields:
+            field = Product._meta.get_field(name)
+            if isinstance(field, models.JSONField):
+                self._json.add(name)
+            schema.append(pa.field(name, self._arrow_type(field)))
+        self.schema = pa.schema(schema)
+        self._writer = pq.ParquetWriter(path, self.schema,
+                                        compression=None if compression == "none" else compression)
+
+    def _arrow_type(self, field):
+        pa = self._pa
+        if isinstance(field, models.DecimalField):
+            return pa.decimal128(field.max_digits, field.decimal_places)
+        if isinstance(field, models.DateTimeField):
+            return pa.timestamp("us", tz="UTC")
+        if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField)):
+            return pa.int64()
+        if isinstance(field, models.FloatField):
+            return pa.float64()
+        return pa.string()
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        arrays = []
+        for name, column in zip(self.fields, columns):
+            if name in self._json:
+                column = [None if value is None else json.dumps(value, ensure_ascii=False) for value in column]
+            arrays.append(self._pa.array(column, type=self.schema.field(name).type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def export_queryset(since=None, until=None):
+    """Товари для вивантаження: усі або змінені в [since, until), у порядку pk."""
+    qs = Product.objects.all()
+    if since is not None:
+        qs = qs.filter(last_changed_at__gte=since)
+    if until is not None:
+        qs = qs.filter(last_changed_at__lt=until)
+    return qs.order_by("pk")
+
+
+def export_products(writer, since=None, until=None, chunk_size=2000):
+    """
+    Передає writer-у рядки Product пачками по chunk_size (поля — writer.fields).
+    Повертає {"rows": ..., "last_changed_at": найпізніший last_changed_at} —
+    останнє можна передати як since для наступного інкрементального вивантаження.
+    """
+    fields = list(writer.fields)
+    extra = "last_changed_at" not in fields
+    if extra:
+        fields.append("last_changed_at")
+    changed_index = fields.index("last_changed_at")
+
+    stats = {"rows": 0, "last_changed_at": None}
+    rows = export_queryset(since, until).values_list(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        changed = max((row[changed_index] for row in chunk if row[changed_index] is not None), default=None)
+        if changed is not None and (stats["last_changed_at"] is None or changed > stats["last_changed_at"]):
+            stats["last_changed_at"] = changed
+        writer.write([row[:-1] for row in chunk] if extra else chunk)
+        stats["rows"] += len(chunk)
+    writer.close()
+    return stats
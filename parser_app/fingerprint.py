@@ -0,0 +1,39 @@
+"""
+fingerprint.py
+Відбиток вмісту товару для швидкої перевірки "чи змінилось щось".
+
+Замість порівняння кожного поля (включно з великими JSON photos та
+specifications) зберігаємо sha256 від нормалізованого словника товару
+і порівнюємо лише його.
+"""
+import hashlib
+import json
+
+# Поля, що описують вміст товару. Службові поля (pk, сам відбиток) не входять.
+FINGERPRINT_FIELDS = (
+    "title",
+    "color",
+    "memory",
+    "vendor",
+    "price",
+    "discount_price",
+    "photos",
+    "code",
+    "reviews_count",
+    "article",
+    "diagonal",
+    "resolution",
+    "specifications",
+    "link",
+)
+
+
+def product_fingerprint(values):
+    """
+    Повертає hex sha256 для словника товару. Очікує значення, вже приведені
+    до типів полів моделі (див. parser_app.bulk.prepare_product_values),
+    тому однаковий товар з БД і з парсера дає однаковий відбиток.
+    """
+    payload = {name: values.get(name) for name in FINGERPRINT_FIELDS}
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
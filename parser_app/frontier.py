@@ -0,0 +1,202 @@
+"""
+frontier.py
+Постійна черга обходу на основі моделі CrawlURL.
+
+Frontier додає URL у чергу, видає воркерам пачки URL і фіксує результат
+обробки. Видача атомарна, тож кілька воркерів не отримають один і той
+самий URL: на PostgreSQL — SELECT ... FOR UPDATE SKIP LOCKED, на SQLite —
+один оператор UPDATE ... RETURNING (SELECT FOR UPDATE там нічого не
+блокує). URL, взяті воркером, який потім впав, повертаються в чергу після
+закінчення lease, а при відновленні після аварії (--resume) — одразу:
+release_stale(lease=timedelta(0)).
+
+Приклад:
+    frontier = Frontier()
+    frontier.add(PRODUCT_URLS)
+    for url in frontier:
+        data = parse_single_product(url)
+        frontier.finished(url, ok=bool(data))
+    frontier.flush()
+"""
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import CrawlURL
+
+
+class Frontier:
+    """
+    Черга обходу: batch_size — скільки URL брати за один claim,
+    lease — через скільки "завислий" in_progress URL повертається в чергу,
+    max_attempts — після скількох невдалих спроб URL позначається failed.
+    """
+
+    def __init__(self, batch_size=100, lease=timedelta(minutes=15), max_attempts=3):
+        self.batch_size = batch_size
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._done = []
+        self._failed = {}
+        self.stats = {"added": 0, "requeued": 0, "claimed": 0, "done": 0, "failed": 0, "released": 0}
+
+    def add(self, urls, chunk_size=1000, requeue=False):
+        """
+        Додає URL (будь-який ітератор) у чергу; вже відомі URL пропускаються.
+        requeue=True — відомі done / failed URL повертаються в чергу з нуля
+        спроб (повторний обхід, див. parser_app.recrawl).
+        """
+        added = 0
+        chunk = []
+        for url in urls:
+            chunk.append(url)
+            if len(chunk) >= chunk_size:
+                added += self._insert(chunk, requeue)
+                chunk = []
+        if chunk:
+            added += self._insert(chunk, requeue)
+        self.stats["added"] += added
+        return added
+
+    def _insert(self, chunk, requeue=False):
+        if requeue:
+            requeued = CrawlURL.objects.filter(
+                url__in=chunk, status__in=(CrawlURL.DONE, CrawlURL.FAILED)
+            ).update(status=CrawlURL.PENDING, attempts=0, last_error=None)
+            self.stats["requeued"] += requeued
+        known = set(CrawlURL.objects.filter(url__in=chunk).values_list("url", flat=True))
+        new = [url for url in dict.fromkeys(chunk) if url not in known]
+        # ignore_conflicts — на випадок, якщо інший процес додав ті самі URL одночасно
+        CrawlURL.objects.bulk_create([CrawlURL(url=url) for url in new], ignore_conflicts=True)
+        return len(new)
+
+    def release_stale(self, lease=None):
+        """
+        Повертає в чергу URL, взяті воркерами, що не завершили обробку за
+        lease (за замовчуванням self.lease). lease=timedelta(0) повертає всі
+        in_progress URL — для відновлення після аварії, коли інших
+        воркерів цієї черги точно немає.
+        """
+        lease = self.lease if lease is None else lease
+        released = CrawlURL.objects.filter(
+            status=CrawlURL.IN_PROGRESS, claimed_at__lte=timezone.now() - lease
+        ).update(status=CrawlURL.PENDING, claimed_at=None)
+        self.stats["released"] += released
+        return released
+
+    def claim(self):
+        """
+        Атомарно бере наступну пачку pending-URL і позначає їх in_progress.
+        Перед цим записує накопичені результати (finished).
+        Повертає список URL (порожній, якщо черга вичерпана).
+        """
+        self.flush()
+        now = timezone.now()
+        if connection.vendor == "sqlite":
+            urls = self._claim_sqlite(now)
+            self.stats["claimed"] += len(urls)
+            return urls
+        with transaction.atomic():
+            ids = list(
+                CrawlURL.objects.select_for_update(skip_locked=True)
+                .filter(status=CrawlURL.PENDING)
+                .order_by("id")
+                .values_list("id", flat=True)[:self.batch_size]
+            )
+            if not ids:
+                return []
+            CrawlURL.objects.filter(id__in=ids).update(
+                status=CrawlURL.IN_PROGRESS, claimed_at=now, attempts=F("attempts") + 1
+            )
+            urls = list(CrawlURL.objects.filter(id__in=ids).order_by("id").values_list("url", flat=True))
+        self.stats["claimed"] += len(urls)
+        return urls
+
+    def _claim_sqlite(self, now):
+        """
+        Claim одним оператором. Транзакція SQLite відкладена, і
+        SELECT ... FOR UPDATE там ігнорується: два процеси прочитали б ту
+        саму пачку pending-URL. UPDATE виконується під блокуванням запису
+        БД, тож кожен рядок переходить у in_progress рівно один раз, а
+        RETURNING віддає саме ті URL, які взяв цей процес.
+        """
+        quote = connection.ops.quote_name
+        table = quote(CrawlURL._meta.db_table)
+        column = {name: quote(CrawlURL._meta.get_field(name).column)
+                  for name in ("id", "url", "status", "attempts", "claimed_at")}
+        sql = (
+            f"UPDATE {table} SET {column['status']} = %s, {column['claimed_at']} = %s, "
+            f"{column['attempts']} = {column['attempts']} + 1 "
+            f"WHERE {column['id']} IN (SELECT {column['id']} FROM {table} WHERE {column['status']} = %s "
+            f"ORDER BY {column['id']} LIMIT %s) "
+            f"RETURNING {column['id']}, {column['url']}"
+        )
+        claimed_at = CrawlURL._meta.get_field("claimed_at").get_db_prep_value(now, connection)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [CrawlURL.IN_PROGRESS, claimed_at, CrawlURL.PENDING, self.batch_size])
+            rows = cursor.fetchall()
+        return [url for _, url in sorted(rows)]
+
+    def finished(self, url, ok=True, error=None):
+        """Фіксує результат обробки URL (записується в БД при flush/claim)."""
+        with self._lock:
+            if ok:
+                self._done.append(url)
+            else:
+                self._failed[url] = error
+
+    def flush(self):
+        """Записує накопичені результати: done — завершені, невдалі — назад у чергу або failed."""
+        with self._lock:
+            done, self._done = self._done, []
+            failed, self._failed = self._failed, {}
+        now = timezone.now()
+        if done:
+            self.stats["done"] += CrawlURL.objects.filter(url__in=done).update(
+                status=CrawlURL.DONE, last_crawled_at=now, claimed_at=None, last_error=None
+            )
+        if failed:
+            urls = list(failed)
+            # Після max_attempts спроб URL більше не повертається в чергу
+            self.stats["failed"] += CrawlURL.objects.filter(
+                url__in=urls, attempts__gte=self.max_attempts
+            ).update(status=CrawlURL.FAILED, last_crawled_at=now, claimed_at=None)
+            CrawlURL.objects.filter(url__in=urls, attempts__lt=self.max_attempts).update(
+                status=CrawlURL.PENDING, last_crawled_at=now, claimed_at=None
+            )
+            for url, error in failed.items():
+                if error:
+                    CrawlURL.objects.filter(url=url).update(last_error=str(error))
+
+    def __iter__(self):
+        """Віддає URL пачка за пачкою, доки в черзі є pending-URL."""
+        while True:
+            urls = self.claim()
+            if not urls:
+                return
+            yield from urls
+
+    def report(self):
+        counts = {status: 0 for status, _ in CrawlURL.STATUS_CHOICES}
+        for row in CrawlURL.objects.values("status").order_by().annotate(n=Count("id")):
+            counts[row["status"]] = row["n"]
+        print(f"[FRONTIER] Сесія: {self.stats}; у черзі: {counts}")
+        return counts
+
+    async def __aiter__(self):
+        """Асинхронний варіант __iter__ для crawl_async та PagePool."""
+        claim = sync_to_async(self.claim)
+        while True:
+            urls = await claim()
+            if not urls:
+                return
+            for url in urls:
+                yield url
+
+    async def aflush(self):
+        await sync_to_async(self.flush)()
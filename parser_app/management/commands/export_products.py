@@ -0,0 +1,128 @@
+"""
+Потокове вивантаження каталогу для BI.
+
+Приклади:
+    python manage.py export_products --format csv --output products.csv.gz
+    python manage.py export_products --format jsonl --since 2026-10-16 --until 2026-10-17 -o delta.jsonl.xz
+    python manage.py export_products --format parquet --output products.parquet --compression zstd
+    python manage.py export_products --format jsonl | gzip > products.jsonl.gz
+    python manage.py export_products --no-header -o dump.csv   # як db/parser_app_product.csv, для import_products
+"""
+import bz2
+import datetime
+import gzip
+import io
+import lzma
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from parser_app.export import (DUMP_COLUMNS, EXPORT_FIELDS, FORMATS, PARQUET_COMPRESSIONS, TEXT_COMPRESSIONS,
+                               CsvExportWriter, JsonlExportWriter, ParquetExportWriter, export_products)
+
+_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+
+def _parse_moment(value):
+    """ISO дата або дата й час; без часового поясу — у поясі проєкту."""
+    moment = parse_datetime(value)
+    if moment is None:
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f"Не вдалося розібрати дату '{value}' (очікується ISO, напр. 2026-10-17 або 2026-10-17T06:00)")
+        moment = datetime.datetime(date.year, date.month, date.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = "Потоково вивантажує таблицю Product у CSV, JSONL або Parquet (повний дамп або зміни з --since)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("-o", "--output", default="-",
+                            help="Файл або '-' для stdout (CSV / JSONL). Parquet — лише у файл.")
+        parser.add_argument("--compression", default=None,
+                            help=f"CSV / JSONL: {', '.join(TEXT_COMPRESSIONS)} (за замовчуванням — за розширенням "
+                                 f"файлу .gz / .bz2 / .xz); Parquet: {', '.join(PARQUET_COMPRESSIONS)} "
+                                 "(за замовчуванням snappy)")
+        parser.add_argument("--since", default=None,
+                            help="Лише товари з last_changed_at >= since (ISO дата або дата й час)")
+        parser.add_argument("--until", default=None,
+                            help="Лише товари з last_changed_at < until; з --since дає вікна без перетинів")
+        parser.add_argument("--fields", default=None,
+                            help=f"Поля через кому (за замовчуванням усі: {','.join(EXPORT_FIELDS)}; "
+                                 "з --no-header — колонки дампу)")
+        parser.add_argument("--chunk-size", type=int, default=2000,
+                            help="Скільки рядків читати з курсора й писати за раз")
+        parser.add_argument("--no-header", action="store_true",
+                            help="CSV без рядка заголовка з колонками дампу db/parser_app_product.csv "
+                                 f"({','.join(DUMP_COLUMNS)}), який читає import_products. "
+                                 "З --fields — без заголовка в порядку --fields (import_products такий файл не прочитає)")
+
+    def handle(self, *args, **options):
+        fmt = options["format"]
+        output = options["output"]
+        fields = DUMP_COLUMNS if options["no_header"] and fmt == "csv" else EXPORT_FIELDS
+        if options["fields"]:
+            fields = tuple(name.strip() for name in options["fields"].split(",") if name.strip())
+            unknown = [name for name in fields if name not in EXPORT_FIELDS]
+            if unknown:
+                raise CommandError(f"Невідомі поля: {', '.join(unknown)}")
+        since = _parse_moment(options["since"]) if options["since"] else None
+        until = _parse_moment(options["until"]) if options["until"] else None
+
+        compression = options["compression"]
+        if fmt == "parquet":
+            compression = compression or "snappy"
+            if compression not in PARQUET_COMPRESSIONS:
+                raise CommandError(f"Parquet підтримує стиснення: {', '.join(PARQUET_COMPRESSIONS)}")
+            if output == "-":
+                raise CommandError("Parquet пишеться лише у файл: вкажіть --output")
+        else:
+            if compression is None:
+                compression = next((name for suffix, name in _SUFFIXES.items() if output.endswith(suffix)), "none")
+            if compression not in TEXT_COMPRESSIONS:
+                raise CommandError(f"CSV / JSONL підтримують стиснення: {', '.join(TEXT_COMPRESSIONS)}")
+
+        started = time.monotonic()
+        if fmt == "parquet":
+            try:
+                writer = ParquetExportWriter(output, fields, compression)
+            except ImportError as e:
+                raise CommandError(str(e))
+            stats = export_products(writer, since, until, options["chunk_size"])
+        else:
+            stream = self._open_text(output, compression)
+            try:
+                if fmt == "csv":
+                    writer = CsvExportWriter(stream, fields, header=not options["no_header"])
+                else:
+                    writer = JsonlExportWriter(stream, fields)
+                stats = export_products(writer, since, until, options["chunk_size"])
+            finally:
+                if output == "-" and compression == "none":
+                    # Не закриваємо sys.stdout разом з обгорткою
+                    stream.flush()
+                    stream.detach()
+                else:
+                    stream.close()
+
+        # Звіт — у stderr, щоб не змішувати його з даними при виводі в stdout
+        latest = stats["last_changed_at"].isoformat() if stats["last_changed_at"] else "—"
+        self.stderr.write(f"[EXPORT] {stats['rows']} товарів → {output} ({fmt}, стиснення {compression}) "
+                          f"за {time.monotonic() - started:.1f} с; найпізніша зміна: {latest}")
+
+    def _open_text(self, output, compression):
+        if output == "-":
+            if compression == "none":
+                return io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="", write_through=False)
+            return _OPENERS[compression](sys.stdout.buffer, "wt", encoding="utf-8", newline="")
+        if compression == "none":
+            return open(output, "w", encoding="utf-8", newline="")
+        return _OPENERS[compression](output, "wt", encoding="utf-8", newline="")
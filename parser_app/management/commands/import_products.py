@@ -0,0 +1,81 @@
+"""
+Імпорт CSV-дампу товарів у Product зі злиттям по code.
+
+Приклади:
+    python manage.py import_products db/parser_app_product.csv
+    python manage.py import_products products.csv.gz --batch-size 10000
+    python manage.py import_products products.csv --no-prices --no-specs
+"""
+import bz2
+import gzip
+import lzma
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from parser_app.bulk import ProductBulkWriter
+from parser_app.csv_import import read_products
+
+_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# Скільки помилок друкувати поіменно
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = ("Імпортує CSV (db/parser_app_product.csv або export_products --format csv) у Product: "
+            "нові товари створюються, наявні з тим самим code оновлюються, якщо змінились.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV-файл, можна стиснений .gz / .bz2 / .xz")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Скільки записів читати й записувати за раз")
+        parser.add_argument("--no-copy", action="store_true",
+                            help="PostgreSQL: INSERT ... VALUES замість COPY у тимчасову таблицю")
+        parser.add_argument("--no-prices", action="store_true",
+                            help="Не записувати історію цін (PriceObservation)")
+        parser.add_argument("--no-specs", action="store_true",
+                            help="Не заповнювати нормалізовані характеристики")
+        parser.add_argument("--strict", action="store_true",
+                            help="Зупинитись на першій пачці з некоректними записами (нічого з неї не записавши)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        opener = next((opener for suffix, opener in _OPENERS.items() if path.endswith(suffix)), open)
+        writer = ProductBulkWriter(
+            batch_size=options["batch_size"],
+            verbose=options["verbosity"] > 1,
+            track_prices=not options["no_prices"],
+            index_specs=not options["no_specs"],
+            copy=not options["no_copy"],
+            # Імпорт дампу — не обхід сайту: розклад повторних обходів
+            # (last_seen_at, recrawl_interval) ведуть лише парсери
+            schedule=False,
+        )
+
+        started = time.monotonic()
+        invalid = 0
+        try:
+            stream = opener(path, "rt", encoding="utf-8", newline="")
+        except OSError as e:
+            raise CommandError(f"Не вдалося відкрити {path}: {e}")
+        with stream:
+            for values, errors in read_products(stream, chunk_size=options["batch_size"]):
+                for line, reason in errors:
+                    if invalid < MAX_REPORTED_ERRORS:
+                        self.stderr.write(f"[WARN] запис {line}: {reason}")
+                    invalid += 1
+                if errors and options["strict"]:
+                    raise CommandError(f"Некоректні записи в {path}; імпорт зупинено (--strict)")
+                writer.write_values(values)
+                if options["verbosity"] > 0:
+                    totals = writer.totals
+                    self.stdout.write(f"[DB] Імпортовано {sum(totals[k] for k in ('created', 'updated', 'unchanged'))}"
+                                      f" за {time.monotonic() - started:.1f} с")
+
+        if invalid > MAX_REPORTED_ERRORS:
+            self.stderr.write(f"[WARN] ... ще {invalid - MAX_REPORTED_ERRORS} некоректних записів")
+        mode = "COPY" if connection.vendor == "postgresql" and writer.copy else "bulk_create / bulk_update"
+        self.stdout.write(f"[DB] Разом: {writer.totals}, пропущено некоректних {invalid}; "
+                          f"{mode}, {time.monotonic() - started:.1f} с")
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.24 on 2026-10-17 10:00
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+# Копія parser_app.fingerprint на момент міграції: історична міграція не
+# повинна залежати від того, як відбиток рахується в майбутніх версіях
+FINGERPRINT_FIELDS = (
+    "title", "color", "memory", "vendor", "price", "discount_price", "photos", "code",
+    "reviews_count", "article", "diagonal", "resolution", "specifications", "link",
+)
+
+# Скільки кодів дублікатів показувати поіменно
+MAX_REPORTED_CODES = 20
+
+
+def product_fingerprint(values):
+    payload = {name: values.get(name) for name in FINGERPRINT_FIELDS}
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def dedupe_and_backfill(apps, schema_editor):
+    """
+    Перед додаванням унікального індексу на code:
+    - порожній code ('') замінюється на NULL — такі товари не дублікати
+      один одного, а товари без коду;
+    - видаляються дублікати за code (залишається рядок з найменшим id —
+      саме його оновлював save_to_db); кількість і коди друкуються;
+    - заповнюється fingerprint для наявних рядків.
+    """
+    Product = apps.get_model('parser_app', 'Product')
+
+    emptied = Product.objects.filter(code='').update(code=None)
+    if emptied:
+        print(f"\n  [DB] Порожній code замінено на NULL у {emptied} товарах")
+
+    seen = set()
+    duplicates = []
+    duplicate_codes = set()
+    for pk, code in Product.objects.exclude(code=None).order_by('pk').values_list('pk', 'code').iterator():
+        if code in seen:
+            duplicates.append(pk)
+            duplicate_codes.add(code)
+        else:
+            seen.add(code)
+    if duplicates:
+        deleted, _ = Product.objects.filter(pk__in=duplicates).delete()
+        codes = sorted(duplicate_codes)
+        shown = ", ".join(codes[:MAX_REPORTED_CODES]) + (" ..." if len(codes) > MAX_REPORTED_CODES else "")
+        print(f"\n  [DB] Видалено {len(duplicates)} дублікатів товарів ({deleted} рядків разом із залежними) "
+              f"для {len(codes)} кодів, залишено рядок з найменшим id: {shown}")
+
+    batch = []
+    for obj in Product.objects.only('pk', *FINGERPRINT_FIELDS).iterator(chunk_size=1000):
+        obj.fingerprint = product_fingerprint({name: getattr(obj, name) for name in FINGERPRINT_FIELDS})
+        batch.append(obj)
+        if len(batch) >= 1000:
+            Product.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0016_product_link_product_specifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(dedupe_and_backfill, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='code',
+            field=models.CharField(blank=True, max_length=256, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.24 on 2026-10-17 23:30
+
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def _to_decimal(value):
+    if not value:
+        return None
+    try:
+        return Decimal(str(value).replace(' ', '').replace(',', '.'))
+    except InvalidOperation:
+        return None
+
+
+def seed_observations(apps, schema_editor):
+    """Перше спостереження для кожного товару з поточною ціною — від нього рахуються наступні зміни."""
+    Product = apps.get_model('parser_app', 'Product')
+    PriceObservation = apps.get_model('parser_app', 'PriceObservation')
+
+    now = django.utils.timezone.now()
+    batch = []
+    for pk, price, discount_price in Product.objects.values_list('pk', 'price', 'discount_price').iterator():
+        price, discount_price = _to_decimal(price), _to_decimal(discount_price)
+        if price is None and discount_price is None:
+            continue
+        batch.append(PriceObservation(product_id=pk, price=price, discount_price=discount_price, observed_at=now))
+        if len(batch) >= 1000:
+            PriceObservation.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        PriceObservation.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0018_crawlurl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('discount_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('observed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_observations', to='parser_app.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-observed_at'], name='priceobs_product_time_idx'), models.Index(fields=['observed_at'], name='priceobs_time_idx')],
+            },
+        ),
+        migrations.RunPython(seed_observations, migrations.RunPython.noop),
+    ]
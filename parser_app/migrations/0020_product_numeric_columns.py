@@ -0,0 +1,139 @@
+# Generated by Django 4.2.24 on 2026-10-17 23:50
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+# Копія розбору з parser_app.numeric на момент міграції: історична
+# міграція не повинна залежати від майбутніх змін правил розбору
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+_MEMORY_UNITS = {
+    "tb": 1024, "тб": 1024,
+    "gb": 1, "гб": 1,
+    "mb": 1 / 1024, "мб": 1 / 1024,
+}
+_MEMORY_RE = re.compile(_NUMBER + r"\s*(tb|gb|mb|тб|гб|мб)?", re.IGNORECASE)
+_DIAGONAL_RE = re.compile(_NUMBER)
+_RESOLUTION_RE = re.compile(r"(\d{2,5})\s*[xх×*]\s*(\d{2,5})", re.IGNORECASE)
+
+NUMERIC_SOURCES = {
+    "price_value": "price",
+    "discount_price_value": "discount_price",
+    "memory_gb": "memory",
+    "diagonal_inches": "diagonal",
+    "resolution_width": "resolution",
+    "resolution_height": "resolution",
+}
+
+
+def parse_decimal(value):
+    if value is None:
+        return None
+    value = str(value).replace(" ", "").replace("\xa0", "").replace(",", ".")
+    if not value:
+        return None
+    try:
+        return Decimal(value).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+
+
+def parse_memory_gb(text):
+    m = _MEMORY_RE.search(text or "")
+    if not m:
+        return None
+    number = float(m.group(1).replace(",", "."))
+    gb = number * _MEMORY_UNITS[(m.group(2) or "gb").lower()]
+    return int(gb) if gb >= 1 else None
+
+
+def parse_diagonal(text):
+    m = _DIAGONAL_RE.search(text or "")
+    return float(m.group(1).replace(",", ".")) if m else None
+
+
+def parse_resolution(text):
+    m = _RESOLUTION_RE.search(text or "")
+    if not m:
+        return None, None
+    return int(m.group(1)), int(m.group(2))
+
+
+def numeric_values(values):
+    width, height = parse_resolution(values.get("resolution"))
+    parsed = {
+        "price_value": parse_decimal(values.get("price")),
+        "discount_price_value": parse_decimal(values.get("discount_price")),
+        "memory_gb": parse_memory_gb(values.get("memory")),
+        "diagonal_inches": parse_diagonal(values.get("diagonal")),
+        "resolution_width": width,
+        "resolution_height": height,
+    }
+    return {name: value for name, value in parsed.items() if value is not None}
+
+
+def backfill_numeric_columns(apps, schema_editor):
+    """Розбирає числові колонки з текстових полів наявних товарів пачками по 1000."""
+    Product = apps.get_model('parser_app', 'Product')
+    sources = sorted(set(NUMERIC_SOURCES.values()))
+    columns = list(NUMERIC_SOURCES)
+
+    batch = []
+    for obj in Product.objects.only('pk', *sources).iterator(chunk_size=1000):
+        parsed = numeric_values({name: getattr(obj, name) for name in sources})
+        if not parsed:
+            continue
+        for name, value in parsed.items():
+            setattr(obj, name, value)
+        batch.append(obj)
+        if len(batch) >= 1000:
+            Product.objects.bulk_update(batch, columns)
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, columns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0019_priceobservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='diagonal_inches',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='discount_price_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='memory_gb',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='price_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='resolution_height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='resolution_width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_numeric_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['resolution_width', 'resolution_height'], name='product_resolution_idx'),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 4.2.24 on 2026-10-18 00:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+CHUNK_SIZE = 1000
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _backfill_batch(batch, Key, Value, Link):
+    """
+    Розкладає характеристики пачки (product_id, specifications) у таблиці.
+    Самостійна копія логіки parser_app.specs.sync_specifications на момент
+    міграції: таблиці щойно створені, тож зв'язки лише додаються.
+    """
+    key_length = Key._meta.get_field('name').max_length
+    value_length = Value._meta.get_field('value').max_length
+
+    pairs_by_product = {}
+    for product_id, specifications in batch:
+        pairs = set()
+        for key, value in (specifications or {}).items():
+            if not key or value in (None, ''):
+                continue
+            value = str(value)
+            if len(key) <= key_length and len(value) <= value_length:
+                pairs.add((key, value))
+        pairs_by_product[product_id] = pairs
+
+    names = {key for pairs in pairs_by_product.values() for key, _ in pairs}
+    Key.objects.bulk_create([Key(name=name) for name in names], batch_size=CHUNK_SIZE, ignore_conflicts=True)
+    key_ids = {}
+    for chunk in _chunks(names):
+        key_ids.update(Key.objects.filter(name__in=chunk).values_list('name', 'id'))
+
+    wanted = {(key_ids[key], value) for pairs in pairs_by_product.values() for key, value in pairs}
+    Value.objects.bulk_create([Value(key_id=key_id, value=value) for key_id, value in wanted],
+                              batch_size=CHUNK_SIZE, ignore_conflicts=True)
+    value_ids = {}
+    for chunk in _chunks(wanted):
+        rows = Value.objects.filter(key_id__in={key_id for key_id, _ in chunk},
+                                    value__in={value for _, value in chunk})
+        value_ids.update(((key_id, value), pk) for pk, key_id, value in rows.values_list('id', 'key_id', 'value')
+                         if (key_id, value) in wanted)
+
+    Link.objects.bulk_create(
+        [Link(product_id=product_id, value_id=value_ids[key_ids[key], value])
+         for product_id, pairs in pairs_by_product.items() for key, value in pairs],
+        batch_size=CHUNK_SIZE, ignore_conflicts=True,
+    )
+
+
+def backfill_attributes(apps, schema_editor):
+    """Розкладає specifications наявних товарів у нормалізовані таблиці пачками по 1000."""
+    Product = apps.get_model('parser_app', 'Product')
+    models_ = (
+        apps.get_model('parser_app', 'AttributeKey'),
+        apps.get_model('parser_app', 'AttributeValue'),
+        apps.get_model('parser_app', 'ProductAttribute'),
+    )
+
+    batch = []
+    for item in Product.objects.exclude(specifications=None).values_list('pk', 'specifications').iterator(chunk_size=1000):
+        batch.append(item)
+        if len(batch) >= 1000:
+            _backfill_batch(batch, *models_)
+            batch = []
+    if batch:
+        _backfill_batch(batch, *models_)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0020_product_numeric_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttributeKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=512, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AttributeValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=1024)),
+                ('key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='values', to='parser_app.attributekey')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='attributes', to='parser_app.product')),
+                ('value', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='links', to='parser_app.attributevalue')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['value', 'product'], name='productattr_value_product_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productattribute',
+            constraint=models.UniqueConstraint(fields=('product', 'value'), name='productattribute_product_value_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='attributevalue',
+            constraint=models.UniqueConstraint(fields=('key', 'value'), name='attributevalue_key_value_uniq'),
+        ),
+        migrations.RunPython(backfill_attributes, migrations.RunPython.noop),
+    ]
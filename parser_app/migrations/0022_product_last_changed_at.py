@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-18 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0021_attribute_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='last_changed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
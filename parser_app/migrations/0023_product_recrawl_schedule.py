@@ -0,0 +1,36 @@
+# Generated by Django 4.2.24 on 2026-10-18 01:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def schedule_existing(apps, schema_editor):
+    """Наявні товари одразу потрапляють у розклад: перший повторний обхід — будь-коли."""
+    Product = apps.get_model('parser_app', 'Product')
+    Product.objects.exclude(code=None).update(next_crawl_at=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0022_product_last_changed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='next_crawl_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='recrawl_interval',
+            field=models.PositiveIntegerField(default=86400),
+        ),
+        migrations.RunPython(schedule_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-18 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0023_product_recrawl_schedule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='link',
+            field=models.URLField(blank=True, db_index=True, max_length=2048, null=True),
+        ),
+    ]
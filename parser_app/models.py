@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class Product(models.Model):
@@ -10,17 +11,144 @@ class Product(models.Model):
     price = models.CharField(max_length=128, null=True, blank=True)
     discount_price = models.CharField(max_length=128, null=True, blank=True)
     photos = models.JSONField(null=True, blank=True)
-    code = models.CharField(max_length=256, null=True, blank=True)
+    code = models.CharField(max_length=256, null=True, blank=True, unique=True)
     reviews_count = models.IntegerField(null=True, blank=True)
     article = models.CharField(max_length=256, null=True, blank=True)
     diagonal = models.CharField(max_length=128, null=True, blank=True)
     resolution = models.CharField(max_length=128, null=True, blank=True)
     specifications = models.JSONField(null=True, blank=True)
-    link = models.URLField(max_length=2048, null=True, blank=True)
+    # Індекс — для recrawl.mark_unchanged: незмінені сторінки шукаються за посиланням
+    link = models.URLField(max_length=2048, null=True, blank=True, db_index=True)
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
 
+    # Числові значення текстових полів (parser_app.numeric) — для фільтрів і сортування по індексу
+    price_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_index=True)
+    discount_price_value = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_index=True)
+    memory_gb = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    diagonal_inches = models.FloatField(null=True, blank=True, db_index=True)
+    resolution_width = models.PositiveIntegerField(null=True, blank=True)
+    resolution_height = models.PositiveIntegerField(null=True, blank=True)
 
-updated_at = models.DateTimeField(auto_now=True)
+    # Коли вміст товару (fingerprint) востаннє змінився; ставить ProductBulkWriter / save_to_db
+    last_changed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Повторний обхід (parser_app.recrawl): коли товар востаннє обходили, з яким
+    # інтервалом (секунди, залежить від того, як часто змінюється ціна) і коли наступного разу
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    recrawl_interval = models.PositiveIntegerField(default=24 * 3600)
+    next_crawl_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['resolution_width', 'resolution_height'], name='product_resolution_idx'),
+        ]
 
-def __str__(self):
-    return self.title or str(self.pk)
\ No newline at end of file
+    def __str__(self):
+        return self.title or str(self.pk)
+
+
+class PriceObservation(models.Model):
+    """
+    Історія цін товару (лише додавання). Новий рядок з'являється, тільки
+    якщо ціна або акційна ціна відрізняється від останнього спостереження
+    (див. parser_app.prices.record_prices).
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_observations')
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    discount_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    observed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Остання ціна товару та історія одного товару: WHERE product_id = ... ORDER BY observed_at DESC
+            models.Index(fields=['product', '-observed_at'], name='priceobs_product_time_idx'),
+            # Стрічка змін цін за період: WHERE observed_at >= ... ORDER BY observed_at
+            models.Index(fields=['observed_at'], name='priceobs_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.price} / {self.discount_price} ({self.observed_at:%Y-%m-%d %H:%M})"
+
+
+class AttributeKey(models.Model):
+    """Назва характеристики ("Виробник", "Безпека"), одна на весь каталог."""
+
+    name = models.CharField(max_length=512, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class AttributeValue(models.Model):
+    """Значення характеристики; кожна пара (ключ, значення) зберігається один раз."""
+
+    key = models.ForeignKey(AttributeKey, on_delete=models.CASCADE, related_name='values')
+    value = models.CharField(max_length=1024)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'value'], name='attributevalue_key_value_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key_id}: {self.value}"
+
+
+class ProductAttribute(models.Model):
+    """
+    Зв'язок товару зі значенням характеристики — нормалізована копія
+    Product.specifications для фільтрів і фасетів по індексу
+    (заповнюється parser_app.specs.sync_specifications).
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='attributes', db_index=False)
+    value = models.ForeignKey(AttributeValue, on_delete=models.CASCADE, related_name='links', db_index=False)
+
+    class Meta:
+        constraints = [
+            # Також індекс для вибірки характеристик товару
+            models.UniqueConstraint(fields=['product', 'value'], name='productattribute_product_value_uniq'),
+        ]
+        indexes = [
+            # Товари зі значенням і підрахунок фасетів: WHERE value_id IN (...)
+            models.Index(fields=['value', 'product'], name='productattr_value_product_idx'),
+        ]
+
+
+class CrawlURL(models.Model):
+    """
+    Черга обходу (crawl frontier): стан кожного URL зберігається в БД,
+    тож перерваний обхід продовжується з місця зупинки, а кілька
+    воркерів можуть брати URL з однієї черги.
+    """
+
+    PENDING = 'pending'
+    IN_PROGRESS = 'in_progress'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (IN_PROGRESS, 'In progress'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    url = models.URLField(max_length=2048, unique=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_crawled_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Вибірка наступної пачки: WHERE status = 'pending' ORDER BY id
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='crawlurl_pending_idx'),
+            # Повернення "завислих" URL: WHERE status = 'in_progress' AND claimed_at < ...
+            models.Index(fields=['claimed_at'], condition=models.Q(status='in_progress'),
+                         name='crawlurl_in_progress_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.url} ({self.status})"
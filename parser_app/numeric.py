@@ -0,0 +1,88 @@
+"""
+numeric.py
+Числові колонки товару, розібрані з текстових характеристик.
+
+Текстові поля (price "33999", memory "128 Gb", diagonal "6.1\"",
+resolution "1179 х 2556") лишаються як є, а поруч зберігаються числа з
+індексами, щоб фільтри й сортування ("до 20000 грн, від 256 ГБ") йшли
+по індексу, а не розбором рядків під час запиту.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+
+# Множник до гігабайт за одиницею об'єму (латиниця, українська, російська)
+_MEMORY_UNITS = {
+    "tb": 1024, "тб": 1024,
+    "gb": 1, "гб": 1,
+    "mb": 1 / 1024, "мб": 1 / 1024,
+}
+_MEMORY_RE = re.compile(_NUMBER + r"\s*(tb|gb|mb|тб|гб|мб)?", re.IGNORECASE)
+_DIAGONAL_RE = re.compile(_NUMBER)
+# "1179 х 2556": латинська x, кирилична х або знак множення
+_RESOLUTION_RE = re.compile(r"(\d{2,5})\s*[xх×*]\s*(\d{2,5})", re.IGNORECASE)
+
+# Числова колонка → текстове поле, з якого вона розбирається
+NUMERIC_SOURCES = {
+    "price_value": "price",
+    "discount_price_value": "discount_price",
+    "memory_gb": "memory",
+    "diagonal_inches": "diagonal",
+    "resolution_width": "resolution",
+    "resolution_height": "resolution",
+}
+
+
+def parse_decimal(value):
+    """Ціна ("41 999", "41999.00", Decimal) у Decimal з двома знаками або None."""
+    if value is None:
+        return None
+    value = str(value).replace(" ", "").replace("\xa0", "").replace(",", ".")
+    if not value:
+        return None
+    try:
+        return Decimal(value).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+
+
+def parse_memory_gb(text):
+    """Об'єм пам'яті в ГБ: "128 Gb" → 128, "1 ТБ" → 1024. Без одиниці вважаємо ГБ."""
+    m = _MEMORY_RE.search(text or "")
+    if not m:
+        return None
+    number = float(m.group(1).replace(",", "."))
+    gb = number * _MEMORY_UNITS[(m.group(2) or "gb").lower()]
+    return int(gb) if gb >= 1 else None
+
+
+def parse_diagonal(text):
+    """Діагональ у дюймах: '6.1"' → 6.1, "6,7 дюйма" → 6.7."""
+    m = _DIAGONAL_RE.search(text or "")
+    return float(m.group(1).replace(",", ".")) if m else None
+
+
+def parse_resolution(text):
+    """Роздільна здатність: "1179 х 2556" → (1179, 2556); не розібрано → (None, None)."""
+    m = _RESOLUTION_RE.search(text or "")
+    if not m:
+        return None, None
+    return int(m.group(1)), int(m.group(2))
+
+
+def numeric_values(values):
+    """
+    Числові колонки для словника товару з текстовими полями. Повертає
+    лише те, що вдалося розібрати, — None не затирає наявних значень.
+    """
+    width, height = parse_resolution(values.get("resolution"))
+    parsed = {
+        "price_value": parse_decimal(values.get("price")),
+        "discount_price_value": parse_decimal(values.get("discount_price")),
+        "memory_gb": parse_memory_gb(values.get("memory")),
+        "diagonal_inches": parse_diagonal(values.get("diagonal")),
+        "resolution_width": width,
+        "resolution_height": height,
+    }
+    return {name: value for name, value in parsed.items() if value is not None}
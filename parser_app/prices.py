@@ -0,0 +1,90 @@
+"""
+prices.py
+Історія цін товарів на основі PriceObservation.
+
+Product.price / discount_price зберігають лише поточні значення, тому
+кожна зміна ціни додатково записується окремим рядком PriceObservation.
+Спостереження додаються пакетно (record_prices) і лише тоді, коли ціна
+справді змінилась щодо останнього спостереження товару.
+
+- latest_observations: остання ціна кожного товару (на PostgreSQL —
+  DISTINCT ON по індексу (product, -observed_at), без сканування таблиці);
+- price_changes: стрічка змін цін за період (індекс observed_at).
+"""
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import PriceObservation
+from .numeric import parse_decimal
+
+# Скільки товарів перевіряти одним запитом до останніх цін
+CHUNK_SIZE = 1000
+
+
+def latest_observations(product_ids=None):
+    """
+    QuerySet з останнім спостереженням ціни для кожного товару
+    (або лише для product_ids).
+    """
+    qs = PriceObservation.objects.all()
+    if product_ids is not None:
+        qs = qs.filter(product_id__in=list(product_ids))
+    if connection.vendor == "postgresql":
+        return qs.order_by("product_id", "-observed_at", "-id").distinct("product_id")
+    latest = (PriceObservation.objects.filter(product_id=OuterRef("product_id"))
+              .order_by("-observed_at", "-id").values("id")[:1])
+    return qs.filter(id=Subquery(latest))
+
+
+def latest_prices(product_ids=None):
+    """Словник product_id → (price, discount_price) за останнім спостереженням."""
+    return {
+        product_id: (price, discount_price)
+        for product_id, price, discount_price
+        in latest_observations(product_ids).values_list("product_id", "price", "discount_price")
+    }
+
+
+def record_prices(rows, observed_at=None, batch_size=CHUNK_SIZE):
+    """
+    Записує ціни rows — ітерованого (product_id, price, discount_price) —
+    одним bulk_create на пачку. Рядок додається, лише якщо ціна відрізняється
+    від останнього спостереження товару (або спостережень ще немає);
+    товари без жодної ціни пропускаються. Повертає список product_id,
+    для яких додано спостереження.
+    """
+    observed_at = observed_at or timezone.now()
+    by_product = {}
+    for product_id, price, discount_price in rows:
+        price, discount_price = parse_decimal(price), parse_decimal(discount_price)
+        if price is None and discount_price is None:
+            continue
+        by_product[product_id] = (price, discount_price)
+
+    created = []
+    ids = list(by_product)
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        latest = latest_prices(chunk)
+        new = [
+            PriceObservation(product_id=product_id, price=by_product[product_id][0],
+                             discount_price=by_product[product_id][1], observed_at=observed_at)
+            for product_id in chunk
+            if latest.get(product_id) != by_product[product_id]
+        ]
+        if new:
+            PriceObservation.objects.bulk_create(new, batch_size=batch_size)
+            created.extend(observation.product_id for observation in new)
+    return created
+
+
+def price_changes(since, until=None):
+    """
+    Стрічка змін цін з моменту since (і до until), від старіших до новіших.
+    Великі вибірки читайте через .iterator().
+    """
+    qs = PriceObservation.objects.filter(observed_at__gte=since)
+    if until is not None:
+        qs = qs.filter(observed_at__lt=until)
+    return qs.select_related("product").order_by("observed_at", "id")
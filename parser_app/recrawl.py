@@ -0,0 +1,120 @@
+"""
+recrawl.py
+Планування повторного обходу товарів за тим, як часто змінюється ціна.
+
+Кожен товар має власний інтервал повторного обходу (recrawl_interval).
+Після обходу (mark_seen) інтервал зменшується вдвічі, якщо ціна
+змінилась, і подвоюється, якщо ні, в межах MIN_INTERVAL..MAX_INTERVAL.
+next_crawl_at = last_seen_at + інтервал. Так товари з "живими" цінами
+обходяться щогодини, а стабільні — раз на кілька днів.
+
+Наступна пачка вибирається по індексу next_crawl_at (claim_due) — від
+найбільш прострочених. Сторінки, що не змінились (304 або той самий
+вміст — їх товари не записуються), фіксуються за посиланням (mark_unchanged).
+
+Приклад:
+    urls = claim_due(limit=1000)
+    # ... обхід urls через ProductBulkWriter / save_to_db викликає mark_seen,
+    # а для незмінених сторінок пайплайн викликає mark_unchanged
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Product
+
+MIN_INTERVAL = 3600
+MAX_INTERVAL = 14 * 24 * 3600
+DEFAULT_INTERVAL = 24 * 3600
+
+# На скільки відкладається товар, виданий claim_due: якщо обхід не
+# завершився (mark_seen не викликано), товар знову стане доступним
+CLAIM_LEASE = timedelta(hours=1)
+
+CHUNK_SIZE = 1000
+
+
+def next_interval(interval, price_changed):
+    """Новий інтервал у секундах: удвічі коротший після зміни ціни, удвічі довший — без неї."""
+    if price_changed:
+        return max(MIN_INTERVAL, interval // 2)
+    return min(MAX_INTERVAL, interval * 2)
+
+
+def mark_seen(codes, price_changed_ids=(), now=None):
+    """
+    Фіксує обхід товарів з кодами codes: last_seen_at, новий інтервал і
+    next_crawl_at. price_changed_ids — id товарів, ціна яких змінилась.
+    Товар, побачений уперше, зберігає початковий інтервал.
+    Оновлення групуються за новим інтервалом — кілька UPDATE на пачку.
+    """
+    _mark("code", codes, price_changed_ids, now)
+
+
+def mark_unchanged(links, now=None):
+    """
+    Фіксує обхід товарів, сторінки яких (links) не змінились з минулого
+    обходу: ціна та сама, тож інтервал подвоюється, як у mark_seen.
+    """
+    _mark("link", links, (), now)
+
+
+def _mark(field, values, price_changed_ids, now):
+    now = now or timezone.now()
+    price_changed_ids = set(price_changed_ids)
+    groups = defaultdict(list)
+    values = list(values)
+    for start in range(0, len(values), CHUNK_SIZE):
+        rows = Product.objects.filter(**{f"{field}__in": values[start:start + CHUNK_SIZE]}).values_list(
+            "pk", "recrawl_interval", "last_seen_at")
+        for pk, interval, last_seen_at in rows:
+            if last_seen_at is not None:
+                interval = next_interval(interval, pk in price_changed_ids)
+            groups[interval].append(pk)
+
+    for interval, ids in groups.items():
+        for start in range(0, len(ids), CHUNK_SIZE):
+            Product.objects.filter(pk__in=ids[start:start + CHUNK_SIZE]).update(
+                last_seen_at=now, recrawl_interval=interval, next_crawl_at=now + timedelta(seconds=interval)
+            )
+
+
+def due_products(now=None):
+    """Товари, яким настав час повторного обходу, від найбільш прострочених."""
+    now = now or timezone.now()
+    return Product.objects.filter(next_crawl_at__lte=now).exclude(link=None).order_by("next_crawl_at")
+
+
+def claim_due(limit=1000, lease=CLAIM_LEASE):
+    """
+    Бере до limit прострочених товарів і відкладає їх на lease, щоб
+    паралельний планувальник не видав їх удруге (на PostgreSQL — через
+    SELECT ... FOR UPDATE SKIP LOCKED). Повертає список посилань.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        qs = due_products(now)
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        rows = list(qs.values_list("pk", "link")[:limit])
+        if rows:
+            Product.objects.filter(pk__in=[pk for pk, _ in rows]).update(next_crawl_at=now + lease)
+    urls = [link for _, link in rows]
+    print(f"[SCHEDULE] До повторного обходу взято {len(urls)} товарів")
+    return urls
+
+
+def report(now=None):
+    """Скільки товарів прострочено і як розподілені інтервали обходу."""
+    now = now or timezone.now()
+    due = due_products(now).count()
+    intervals = dict(
+        Product.objects.exclude(next_crawl_at=None).values_list("recrawl_interval")
+        .order_by("recrawl_interval").annotate(n=Count("pk"))
+    )
+    buckets = ", ".join(f"{interval / 3600:g} год: {n}" for interval, n in intervals.items())
+    print(f"[SCHEDULE] Прострочено {due}; інтервали: {buckets or '—'}")
+    return {"due": due, "intervals": intervals}
@@ -0,0 +1,173 @@
+"""
+specs.py
+Нормалізоване сховище характеристик товарів.
+
+Product.specifications зберігає характеристики одним JSON на товар, і
+фільтр "Виробник = Apple" означав би розбір JSON кожного рядка. Тому
+характеристики додатково розкладаються на таблиці:
+- AttributeKey — назви характеристик;
+- AttributeValue — унікальні пари (ключ, значення);
+- ProductAttribute — зв'язок товару зі значенням, індекс (value, product).
+
+Фільтри й підрахунок фасетів спершу знаходять потрібні значення в малій
+таблиці AttributeValue, а товари — по індексу зв'язків.
+
+Приклад:
+    phones = filter_by_attributes(Product.objects.all(), {"Виробник": "Apple"},
+                                  contains={"Безпека": "FaceID"})
+    attribute_counts("Виробник", phones)  # [("Apple", 42), ...]
+"""
+from django.db.models import Count
+
+from .models import AttributeKey, AttributeValue, Product, ProductAttribute
+
+# Розмір IN (...) та bulk_create за один запит
+CHUNK_SIZE = 1000
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _specification_pairs(specifications, key_length, value_length):
+    """Пари (ключ, значення) зі словника характеристик; надто довгі (описи) лишаються лише в JSON."""
+    pairs = set()
+    for key, value in (specifications or {}).items():
+        if not key or value in (None, ""):
+            continue
+        value = str(value)
+        if len(key) <= key_length and len(value) <= value_length:
+            pairs.add((key, value))
+    return pairs
+
+
+def _intern_keys(names, Key):
+    names = set(names)
+    ids = {}
+    for chunk in _chunks(names):
+        ids.update(Key.objects.filter(name__in=chunk).values_list("name", "id"))
+    missing = names - ids.keys()
+    if missing:
+        Key.objects.bulk_create([Key(name=name) for name in missing], batch_size=CHUNK_SIZE,
+                                ignore_conflicts=True)
+        for chunk in _chunks(missing):
+            ids.update(Key.objects.filter(name__in=chunk).values_list("name", "id"))
+    return ids
+
+
+def _intern_values(pairs, Value):
+    """pairs — множина (key_id, value); повертає {(key_id, value): id}."""
+    def fetch(wanted):
+        found = {}
+        for chunk in _chunks(wanted):
+            rows = Value.objects.filter(key_id__in={key_id for key_id, _ in chunk},
+                                        value__in={value for _, value in chunk})
+            # IN по ключах і по значеннях окремо може повернути зайві комбінації
+            found.update(((key_id, value), pk) for pk, key_id, value in rows.values_list("id", "key_id", "value")
+                         if (key_id, value) in wanted)
+        return found
+
+    ids = fetch(pairs)
+    missing = pairs - ids.keys()
+    if missing:
+        Value.objects.bulk_create([Value(key_id=key_id, value=value) for key_id, value in missing],
+                                  batch_size=CHUNK_SIZE, ignore_conflicts=True)
+        ids.update(fetch(missing))
+    return ids
+
+
+def _insert_links(Link, pairs):
+    """
+    Додає зв'язки (product_id, value_id). Конфлікти (паралельний запис
+    того самого товару) ігноруються — ON CONFLICT DO NOTHING.
+    """
+    Link.objects.bulk_create(
+        [Link(product_id=product_id, value_id=value_id) for product_id, value_id in pairs],
+        batch_size=CHUNK_SIZE, ignore_conflicts=True,
+    )
+
+
+def sync_specifications(items):
+    """
+    Оновлює нормалізовані характеристики для items — ітерованого
+    (product_id, specifications). Ключі та значення додаються пакетно,
+    зв'язки товару приводяться до нового набору: зайві видаляються,
+    нові додаються, незмінені не чіпаються.
+    Повертає {"added": ..., "removed": ...}.
+    """
+    Key, Value, Link = AttributeKey, AttributeValue, ProductAttribute
+    key_length = Key._meta.get_field("name").max_length
+    value_length = Value._meta.get_field("value").max_length
+
+    wanted_pairs = {
+        product_id: _specification_pairs(specifications, key_length, value_length)
+        for product_id, specifications in items
+    }
+    counts = {"added": 0, "removed": 0}
+    if not wanted_pairs:
+        return counts
+
+    key_ids = _intern_keys({key for pairs in wanted_pairs.values() for key, _ in pairs}, Key)
+    value_ids = _intern_values({(key_ids[key], value) for pairs in wanted_pairs.values() for key, value in pairs},
+                               Value)
+    wanted = {
+        (product_id, value_ids[key_ids[key], value])
+        for product_id, pairs in wanted_pairs.items()
+        for key, value in pairs
+    }
+
+    existing = {}
+    for chunk in _chunks(wanted_pairs):
+        existing.update(((product_id, value_id), pk) for pk, product_id, value_id
+                        in Link.objects.filter(product_id__in=chunk).values_list("id", "product_id", "value_id"))
+
+    stale = [pk for link, pk in existing.items() if link not in wanted]
+    for chunk in _chunks(stale):
+        Link.objects.filter(id__in=chunk).delete()
+    new = list(wanted - existing.keys())
+    if new:
+        _insert_links(Link, new)
+
+    counts["added"] = len(new)
+    counts["removed"] = len(stale)
+    return counts
+
+
+def _value_ids(key, value, lookup):
+    return AttributeValue.objects.filter(key__name=key, **{f"value__{lookup}": value}).values("id")
+
+
+def filter_by_attributes(queryset=None, exact=None, contains=None):
+    """
+    Товари, що мають усі задані характеристики:
+    - exact: {ключ: значення} або {ключ: [значення, ...]} (будь-яке з них);
+    - contains: {ключ: підрядок} — пошук без урахування регістру
+      серед значень цього ключа.
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    for key, value in (exact or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            value_ids = _value_ids(key, list(value), "in")
+        else:
+            value_ids = _value_ids(key, value, "exact")
+        queryset = queryset.filter(pk__in=ProductAttribute.objects.filter(value__in=value_ids).values("product_id"))
+    for key, value in (contains or {}).items():
+        value_ids = _value_ids(key, value, "icontains")
+        queryset = queryset.filter(pk__in=ProductAttribute.objects.filter(value__in=value_ids).values("product_id"))
+    return queryset
+
+
+def attribute_counts(key, queryset=None, limit=None):
+    """
+    Фасет: [(значення, кількість товарів), ...] для характеристики key,
+    від найчастішого. queryset — обмежити підрахунок вибраними товарами.
+    """
+    links = ProductAttribute.objects.filter(value__key__name=key)
+    if queryset is not None:
+        links = links.filter(product_id__in=queryset.values("pk"))
+    rows = links.values_list("value__value").annotate(count=Count("product_id")).order_by("-count", "value__value")
+    if limit:
+        rows = rows[:limit]
+    return list(rows)
@@ -1,3 +1,122 @@
+import csv
+import importlib
+import io
+import json
+import sys
+import tempfile
+from datetime import timedelta
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from .bulk import SCHEDULE_FIELDS, ProductBulkWriter, _insert_value, _model_fields, prepare_product_values
+from .export import DUMP_COLUMNS
+from .models import Product
+from .recrawl import mark_seen, mark_unchanged
+
+DUMP_PATH = Path(settings.BASE_DIR) / "db" / "parser_app_product.csv"
+MODULES_DIR = Path(settings.BASE_DIR) / "modules"
+FIXTURES_DIR = MODULES_DIR / "fixtures"
+
+
+class ImportExportCommandTests(TestCase):
+    """Команди import_products / export_products на дампі db/parser_app_product.csv."""
+
+    def _call(self, *args):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            call_command(*args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_no_header_export_is_reimportable(self):
+        self._call("import_products", str(DUMP_PATH))
+        before = {p.code: (p.title, p.price, p.specifications) for p in Product.objects.all()}
+        self.assertTrue(before)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "dump.csv"
+            self._call("export_products", "--no-header", "-o", str(path))
+            with open(path, encoding="utf-8", newline="") as f:
+                rows = list(csv.reader(f))
+            self.assertEqual({len(row) for row in rows}, {len(DUMP_COLUMNS)})
+
+            Product.objects.all().delete()
+            output = self._call("import_products", str(path), "--strict")
+
+        self.assertIn("пропущено некоректних 0", output)
+        after = {p.code: (p.title, p.price, p.specifications) for p in Product.objects.all()}
+        self.assertEqual(after, before)
+
+    def test_import_does_not_touch_recrawl_schedule(self):
+        self._call("import_products", str(DUMP_PATH))
+        self._call("import_products", str(DUMP_PATH))
+        schedule = set(Product.objects.values_list("last_seen_at", "recrawl_interval", "next_crawl_at"))
+        self.assertEqual(schedule, {(None, Product._meta.get_field("recrawl_interval").default, None)})
+
+
+class RecrawlScheduleTests(TestCase):
+    """Розклад повторного обходу (parser_app.recrawl)."""
+
+    def test_unchanged_page_is_marked_seen_by_link(self):
+        link = "https://brain.com.ua/ukr/Test-p1.html"
+        product = Product.objects.create(code="T1", link=link)
+        mark_seen(["T1"])
+        product.refresh_from_db()
+        first_seen, interval = product.last_seen_at, product.recrawl_interval
+
+        mark_unchanged([link, "https://brain.com.ua/ukr/Other-p2.html"])
+        product.refresh_from_db()
+        self.assertGreater(product.last_seen_at, first_seen)
+        self.assertEqual(product.recrawl_interval, interval * 2)
+        self.assertEqual(product.next_crawl_at - product.last_seen_at, timedelta(seconds=interval * 2))
+
+
+class ExtractProductGoldenTests(TestCase):
+    """
+    extract_product парсера requests + bs4 на збережених сторінках modules/fixtures
+    проти еталонів <сторінка>.json — у звичайному (html.parser) і швидкому (lxml) режимах.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Парсери — скрипти в modules/, імпортуються так само, як при запуску звідти
+        if str(MODULES_DIR) not in sys.path:
+            sys.path.insert(0, str(MODULES_DIR))
+        cls.parser = importlib.import_module("3_parser_requests_bs4")
+
+    def test_fixtures_match_golden(self):
+        pages = sorted(FIXTURES_DIR.glob("*.html"))
+        self.assertTrue(pages)
+        for path in pages:
+            html = path.read_text(encoding="utf-8")
+            url = f"https://brain.com.ua/ukr/{path.name}"
+            golden = path.with_suffix(".json").read_text(encoding="utf-8")
+            for mode, fast in (("html.parser", False), ("lxml", True)):
+                with self.subTest(page=path.name, mode=mode):
+                    result = self.parser.extract_product(html, url, fast=fast)
+                    self.assertEqual(json.dumps(result, ensure_ascii=False, indent=2, sort_keys=True, default=str),
+                                     golden)
+
+
+class BulkUpsertSqlTests(TestCase):
+    """
+    Сирий INSERT ... ON CONFLICT ProductBulkWriter виконується лише на PostgreSQL,
+    тож тут перевіряються його вхідні дані, які не залежать від БД.
+    """
+
+    def test_insert_has_value_for_every_not_null_column(self):
+        values = prepare_product_values({"code": "T1", "title": "Товар"})
+        missing = [f.name for f in _model_fields().values() if not f.null and _insert_value(f, values) is None]
+        self.assertEqual(missing, [])
+
+    def test_conflict_update_keeps_recrawl_schedule(self):
+        fields = list(_model_fields().values())
+        sql = ProductBulkWriter()._conflict_sql(fields)
+        assignments = sql.split(" DO UPDATE SET ", 1)[1].split(" WHERE ", 1)[0]
+        for name in SCHEDULE_FIELDS:
+            column = Product._meta.get_field(name).column
+            self.assertNotIn(f"{column}\" = ", assignments)